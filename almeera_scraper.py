@@ -4,21 +4,28 @@ Shelfie - استخراج‌کننده اطلاعات محصولات از وب‌
 """
 
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import re
 import random
 import logging
+import threading
 import math
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException
 from datetime import datetime
 import argparse
+from shelfie_concurrent import scrape_pages_concurrently
+from shelfie_driver_pool import create_driver
+from shelfie_checkpoint import ScrapeCheckpoint
+from shelfie_async_fetcher import AsyncPageFetcher
+from shelfie_waits import wait_for_dom_stable
+from shelfie_parsing import compile_selector, parse_html
+from shelfie_structured_data import DEFAULT_STRUCTURED_DATA, extract_structured_products
+from shelfie_page_yield import PageYieldExpectations
+from shelfie_postprocess import normalize_products
+from shelfie_sinks import write_products
 
 # تنظیم لاگینگ
 logging.basicConfig(
@@ -31,18 +38,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# سلکتورهای صفحه محصولات، یک بار در زمان import کامپایل می‌شوند
+ANY_PRODUCT_SELECTOR = compile_selector("li.product-cell, div.product, div.product-cell, div[class*='product-item']")
+PRODUCT_SELECTOR = compile_selector("li.product-cell.box-product, div.product")
+FALLBACK_PRODUCT_SELECTOR = compile_selector("div.product-cell, div[class*='product-item']")
+PRODUCT_NAME_SELECTOR = compile_selector("h5.product-name a, a.product-name, a.fn, a[class*='name']")
+PRODUCT_PRICE_SELECTOR = compile_selector("span.price.product-price, div.product-price span, [class*='price']")
+PRODUCT_IMAGE_SELECTOR = compile_selector("img.photo, img[class*='product']")
+PAGE_LINK_SELECTOR = compile_selector("li.item a[title], a.item[title], a[title*='Page'], a[title^='Go to page'], li.last-page a, li.item.last-page a")
+NEXT_PAGE_SELECTOR = compile_selector("li.next-page a, a.next, a[rel='next'], a[title*='next'], a[class*='next']")
+
+# استخراج محصولات با JavaScript وقتی HTML صفحه محصولی نداشته باشد. محصولات سایدبار یک بار
+# برای کل سند با یک querySelectorAll علامت‌گذاری می‌شوند، نه با پیمایش والدین هر محصول
+FALLBACK_PRODUCTS_SCRIPT = """
+var productSelector = '.product, .product-cell, [class*="product-item"]';
+var sidebarSelector = '#sidebar-first, [class*="sidebar"]';
+var sidebarProducts = new Set(document.querySelectorAll(
+    ':is(' + sidebarSelector + ') :is(' + productSelector + '), ' +
+    ':is(' + productSelector + '):is(' + sidebarSelector + ')'
+));
+return Array.from(document.querySelectorAll(productSelector))
+    .filter(el => !sidebarProducts.has(el))
+    .map(el => {
+        let nameEl = el.querySelector('h5 a, a.product-name, a.fn, a[class*="name"], .product-name a');
+        let priceEl = el.querySelector('span.price, [class*="price"]');
+        let imgEl = el.querySelector('img');
+        
+        return {
+            name: nameEl ? nameEl.textContent.trim() : '',
+            url: nameEl ? nameEl.href : '',
+            price: priceEl ? priceEl.textContent.trim() : '',
+            image: imgEl ? imgEl.src : ''
+        };
+    }).filter(item => item.name && item.name.length > 0);
+"""
+
+# کلاس‌های میکروفرمت محصولات Al Meera برای استخراج تک‌عبوری (محصولات سایدبار کنار گذاشته می‌شوند)
+STRUCTURED_DATA_PROFILE = {
+    'root_classes': {'hproduct', 'h-product', 'product-cell', 'product'},
+    'name_classes': {'fn', 'p-name', 'product-name'},
+    'price_classes': {'price', 'p-price', 'product-price'},
+    'photo_classes': {'photo', 'u-photo'},
+    'exclude_ids': {'sidebar-first'},
+    'exclude_classes': {'sidebar'}
+}
+
 class AlmeeraMultiPageScraper:
     """
     کلاس اصلی برای استخراج اطلاعات محصولات از وب‌سایت Al Meera
     """
-    def __init__(self, base_url, max_pages=None):
+    def __init__(self, base_url, max_pages=None, driver_pool=None, workers=1, cancel_event=None, http_engine=None,
+                 html_parser=None, structured_data=DEFAULT_STRUCTURED_DATA, sink=None,
+                 checkpoint=None):
         self.base_url = base_url.rstrip("/?pageId=")  # حذف pageId از انتهای URL در صورت وجود
-        self.products = []
+        self.raw_products = []  # فیلدهای خام محصولات در طول استخراج
+        self.products = []  # محصولات پس‌پردازش شده پس از پایان استخراج
         self.total_pages = 1
         self.max_pages = max_pages  # تعداد صفحات تعیین شده توسط کاربر
+        self.driver_pool = driver_pool  # مخزن مشترک درایورها (اختیاری)
+        self.workers = workers  # تعداد مرورگرهای همزمان برای استخراج صفحات
+        self.cancel_event = cancel_event  # رویداد لغو استخراج (اختیاری)
+        self.http_engine = http_engine  # موتور HTTP برای استخراج بدون مرورگر (اختیاری)
+        self.html_parser = html_parser  # پارسر HTML (None یعنی سریع‌ترین پارسر نصب شده)
+        self.structured_data = structured_data  # استخراج تک‌عبوری از میکروفرمت‌ها پیش از سلکتورها
+        self.sink = sink  # نوشتن جریانی محصولات هر صفحه به محض استخراج (اختیاری)
+        self.checkpoint = checkpoint  # ذخیره محصولات هر صفحه برای ادامه استخراج قطع شده (اختیاری)
+        self.restored_product_count = 0  # تعداد محصولات خام ابتدای raw_products که از checkpoint خوانده شده‌اند
+        self.page_yield = PageYieldExpectations()  # انتظار تعداد محصولات هر صفحه برای کنترل fallback‌ها
+        self._http_disabled = False  # غیرفعال شدن مسیر HTTP وقتی محصولات فقط با Selenium پیدا شوند
+        self._prefetched_html = {}  # HTML صفحاتی که قبلاً با HTTP دریافت شده‌اند
+        self._fallback_local = threading.local()  # درایور fallback هر thread
+        self._fallback_drivers = []
+        self._fallback_lock = threading.Lock()
         
     def get_total_products_and_pages(self, driver):
         """استخراج تعداد کل محصولات و محاسبه تعداد صفحات"""
+        if driver is None:
+            total_pages = self._get_total_pages_http()
+            if total_pages is not None:
+                return total_pages
+            
+            # صفحه‌بندی در HTML اولیه مشخص نبود، استفاده از Selenium
+            logger.info("استفاده از Selenium برای استخراج تعداد صفحات...")
+            driver = self._get_fallback_driver()
+            driver.get(self.base_url)
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.TAG_NAME, "body"))
+            )
+        
         try:
             # استخراج آخرین شماره صفحه بر اساس الگوی داده شده در almeera.txt
             try:
@@ -235,155 +318,240 @@ class AlmeeraMultiPageScraper:
             logger.info(f"استفاده از تعداد صفحات پیش‌فرض: {default_pages}")
             return default_pages
     
+    def _get_total_pages_http(self):
+        """استخراج تعداد صفحات از HTML اولیه صفحه اول بدون مرورگر (None یعنی نیاز به Selenium)"""
+        try:
+            html_content = self.http_engine.fetch(self.base_url)
+        except Exception as e:
+            logger.warning(f"خطا در دریافت صفحه اول با HTTP: {e}")
+            return None
+        
+        soup = parse_html(html_content, self.html_parser)
+        if not ANY_PRODUCT_SELECTOR.select_one(soup):
+            logger.info("محصولی در HTML اولیه صفحه اول یافت نشد")
+            return None
+        
+        # نگه داشتن HTML صفحه اول برای استخراج محصولات آن
+        self._prefetched_html[self.base_url] = html_content
+        
+        highest_page = 1
+        page_links = PAGE_LINK_SELECTOR.select(soup)
+        for link in page_links:
+            candidates = [link.get('title', ''), link.get_text(strip=True)]
+            for candidate in candidates:
+                digits = ''.join(filter(str.isdigit, candidate))
+                if digits and int(digits) > highest_page:
+                    highest_page = int(digits)
+            
+            page_id_match = re.search(r'pageId=(\d+)', link.get('href', ''))
+            if page_id_match and int(page_id_match.group(1)) > highest_page:
+                highest_page = int(page_id_match.group(1))
+        
+        if highest_page == 1 and NEXT_PAGE_SELECTOR.select_one(soup):
+            # دکمه صفحه بعد وجود دارد اما تعداد صفحات مشخص نیست
+            logger.info("دکمه صفحه بعد یافت شد، اما تعداد کل صفحات در HTML اولیه مشخص نیست.")
+            return None
+        
+        self.total_pages = highest_page
+        logger.info(f"تعداد کل صفحات تشخیص داده شده (HTTP): {self.total_pages}")
+        
+        if self.max_pages is not None:
+            logger.info(f"محدود کردن تعداد صفحات به حداکثر {self.max_pages} (تعیین شده توسط کاربر)")
+            self.total_pages = min(self.total_pages, self.max_pages)
+        
+        return self.total_pages
+    
     def scrape_page(self, driver, page_url):
-        """استخراج محصولات از یک صفحه خاص"""
+        """
+        استخراج محصولات از یک صفحه خاص
+        
+        در حالت HTTP ابتدا صفحه بدون مرورگر دریافت می‌شود و اگر محصولی پیدا نشد،
+        به صورت خودکار از Selenium استفاده می‌شود.
+        """
+        if self.http_engine is not None and not self._http_disabled:
+            page_products = self._scrape_page_http(page_url)
+            if page_products or not self.page_yield.is_under_extracted(self._page_number(page_url), 0):
+                return page_products
+            
+            logger.info(f"مسیر HTTP محصولی در صفحه {page_url} پیدا نکرد، استفاده از Selenium...")
+            page_products = self.page_yield.run_fallback(
+                'selenium', page_url, self._scrape_page_selenium, driver or self._get_fallback_driver(), page_url
+            )
+            if page_products:
+                logger.warning("Selenium محصولاتی یافت که در HTML اولیه نبودند، مسیر HTTP برای بقیه صفحات غیرفعال شد")
+                self._http_disabled = True
+            return page_products
+        
+        return self._scrape_page_selenium(driver or self._get_fallback_driver(), page_url)
+    
+    def _scrape_page_http(self, page_url):
+        """استخراج محصولات یک صفحه با HTTP و BeautifulSoup"""
+        try:
+            html_content = self._prefetched_html.pop(page_url, None)
+            if html_content is None:
+                html_content = self.http_engine.fetch(page_url)
+        except Exception as e:
+            logger.warning(f"خطا در دریافت صفحه {page_url} با HTTP: {e}")
+            return []
+        
+        try:
+            page_products = self._extract_products_from_html(html_content, page_url, set())
+        except Exception as e:
+            logger.error(f"خطا در استخراج محصولات از صفحه {page_url}: {e}")
+            return []
+        
+        logger.info(f"تعداد کل محصولات استخراج شده از صفحه {page_url} با HTTP: {len(page_products)}")
+        return page_products
+    
+    def _extract_products_from_html(self, html_content, page_url, product_names_seen):
+        """استخراج محصولات از HTML صفحه (مشترک بین مسیر Selenium و مسیر HTTP)"""
+        if self.structured_data:
+            page_products = self._extract_structured_products(html_content, page_url, product_names_seen)
+            if page_products:
+                return page_products
+        
+        soup = parse_html(html_content, self.html_parser)
+        
+        # علامت‌گذاری محصولات سایدبار، یک بار برای کل سند
+        sidebar_products = self._find_sidebar_products(soup)
+        
+        # یافتن همه محصولات با سلکتورهای مختلف
+        all_product_elements = PRODUCT_SELECTOR.select(soup)
+        
+        if not all_product_elements:
+            # سلکتور جایگزین اگر محصولی یافت نشد
+            all_product_elements = FALLBACK_PRODUCT_SELECTOR.select(soup)
+        
+        # جدا کردن محصولات اصلی از محصولات سایدبار
+        product_elements = [elem for elem in all_product_elements if id(elem) not in sidebar_products]
+        
+        logger.info(f"تعداد محصولات یافت شده در صفحه (به جز سایدبار): {len(product_elements)}")
+        
+        page_products = []
+        
+        # استخراج محصولات
+        for product_elem in product_elements:
+            try:
+                # استخراج نام محصول
+                product_name_elem = PRODUCT_NAME_SELECTOR.select_one(product_elem)
+                if not product_name_elem:
+                    continue
+                    
+                product_name = product_name_elem.text.strip()
+                
+                # اگر این محصول قبلاً دیده شده است، آن را نادیده می‌گیریم
+                if product_name in product_names_seen:
+                    logger.info(f"محصول تکراری نادیده گرفته شد: {product_name}")
+                    continue
+                
+                # افزودن نام محصول به لیست محصولات دیده شده
+                product_names_seen.add(product_name)
+                
+                product_url = product_name_elem.get('href', '')
+                if product_url and not product_url.startswith('http'):
+                    product_url = 'https://almeera.online/' + product_url
+                
+                # استخراج قیمت
+                price_elem = PRODUCT_PRICE_SELECTOR.select_one(product_elem)
+                price = price_elem.text.strip() if price_elem else "N/A"
+                
+                # استخراج تصویر محصول
+                img_elem = PRODUCT_IMAGE_SELECTOR.select_one(product_elem)
+                img_url = ""
+                if img_elem:
+                    img_url = img_elem.get('src', '')
+                    if img_url and not img_url.startswith('http'):
+                        if img_url.startswith('//'):
+                            img_url = 'https:' + img_url
+                        else:
+                            img_url = 'https://almeera.online/' + img_url
+                
+                # اضافه کردن به لیست محصولات صفحه
+                product = self._build_product(product_name, price, product_url, page_url)
+                page_products.append(product)
+                
+                logger.info(f"محصول استخراج شد: {product_name} - {product['price']}")
+            except Exception as e:
+                logger.error(f"خطا در استخراج محصول: {e}")
+        
+        return page_products
+    
+    def _find_sidebar_products(self, soup):
+        """شناسه (id) همه محصولات داخل سایدبار با یک پیمایش سند، به جای بررسی والدین هر محصول"""
+        sidebar_products = set()
+        for tag in soup.descendants:
+            if tag.name is None:
+                continue
+            if tag.get('id') == 'sidebar-first' or 'sidebar' in tag.get('class', ()):
+                sidebar_products.add(id(tag))
+                sidebar_products.update(id(elem) for elem in ANY_PRODUCT_SELECTOR.select(tag))
+        return sidebar_products
+    
+    def _extract_structured_products(self, html_content, page_url, product_names_seen):
+        """استخراج محصولات از میکروفرمت‌ها و JSON-LD صفحه در یک عبور"""
+        try:
+            structured_products = extract_structured_products(html_content, STRUCTURED_DATA_PROFILE)
+        except Exception as e:
+            logger.warning(f"خطا در استخراج داده‌های ساخت‌یافته: {e}")
+            return []
+        
+        page_products = []
+        for structured_product in structured_products:
+            product_name = structured_product['name']
+            
+            # اگر این محصول قبلاً دیده شده است، آن را نادیده می‌گیریم
+            if product_name in product_names_seen:
+                continue
+            product_names_seen.add(product_name)
+            
+            product_url = structured_product.get('url') or ''
+            if product_url and not product_url.startswith('http'):
+                product_url = 'https://almeera.online/' + product_url
+            
+            page_products.append(
+                self._build_product(product_name, structured_product.get('price') or "N/A", product_url, page_url)
+            )
+        
+        logger.info(f"تعداد محصولات استخراج شده از داده‌های ساخت‌یافته: {len(page_products)}")
+        return page_products
+    
+    def _build_product(self, product_name, price, product_url, page_url):
+        """ساخت رکورد خام محصول (پاکسازی نام، برند، وزن و قیمت در postprocess انجام می‌شود)"""
+        return {
+            'name': product_name,
+            'price': price,
+            'url': product_url,
+            'page': page_url
+        }
+    
+    def _scrape_page_selenium(self, driver, page_url):
+        """استخراج محصولات از یک صفحه خاص با Selenium"""
         try:
             logger.info(f"استخراج محصولات از صفحه: {page_url}")
             
             # بارگذاری صفحه
             driver.get(page_url)
             
-            # انتظار برای بارگذاری محصولات
-            try:
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "li.product-cell, div.product"))
-                )
-            except TimeoutException:
-                logger.warning(f"بارگذاری محصولات در صفحه {page_url} با تایم‌اوت مواجه شد")
-            
-            # اسکرول به پایین برای بارگذاری همه محصولات
-            total_height = driver.execute_script("return document.body.scrollHeight")
-            for i in range(1, 10):  # اسکرول تا 10 بار برای بارگذاری محتوای بیشتر
-                driver.execute_script(f"window.scrollTo(0, {i * total_height / 10});")
-                time.sleep(0.5)
+            # انتظار برای بارگذاری محصولات: اسکرول تدریجی تا پایدار شدن تعداد محصولات و DOM
+            product_count = wait_for_dom_stable(driver, "li.product-cell, div.product", cancel_event=self.cancel_event)
+            if product_count == 0:
+                logger.warning(f"محصولی در صفحه {page_url} بارگذاری نشد")
             
             # استخراج HTML صفحه
             html_content = driver.page_source
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # یافتن همه محصولات با سلکتورهای مختلف، به جز آنهایی که در سایدبار هستند
-            product_elements = []
-            
-            # ابتدا همه محصولات را پیدا می‌کنیم
-            all_product_elements = soup.select("li.product-cell.box-product, div.product")
-            
-            if not all_product_elements:
-                # سلکتور جایگزین اگر محصولی یافت نشد
-                all_product_elements = soup.select("div.product-cell, div[class*='product-item']")
-            
-            # جدا کردن محصولات اصلی از محصولات سایدبار
-            for elem in all_product_elements:
-                # بررسی اینکه آیا این محصول در سایدبار قرار دارد یا خیر
-                is_in_sidebar = False
-                parent = elem
-                # بررسی همه والدین تا رسیدن به بدنه سند
-                for _ in range(10):  # حداکثر 10 سطح بالاتر را بررسی می‌کنیم
-                    if parent is None:
-                        break
-                    if parent.get('id') == 'sidebar-first' or 'sidebar' in parent.get('class', []):
-                        is_in_sidebar = True
-                        break
-                    parent = parent.parent
-                
-                if not is_in_sidebar:
-                    product_elements.append(elem)
-            
-            logger.info(f"تعداد محصولات یافت شده در صفحه (به جز سایدبار): {len(product_elements)}")
-            
-            page_products = []
             # لیست برای ذخیره نام محصولات برای جلوگیری از تکرار
             product_names_seen = set()
+            page_products = self._extract_products_from_html(html_content, page_url, product_names_seen)
             
-            # استخراج محصولات
-            for product_elem in product_elements:
-                try:
-                    # استخراج نام محصول
-                    product_name_elem = product_elem.select_one("h5.product-name a, a.product-name, a.fn, a[class*='name']")
-                    if not product_name_elem:
-                        continue
-                        
-                    product_name = product_name_elem.text.strip()
-                    
-                    # اگر این محصول قبلاً دیده شده است، آن را نادیده می‌گیریم
-                    if product_name in product_names_seen:
-                        logger.info(f"محصول تکراری نادیده گرفته شد: {product_name}")
-                        continue
-                    
-                    # افزودن نام محصول به لیست محصولات دیده شده
-                    product_names_seen.add(product_name)
-                    
-                    product_url = product_name_elem.get('href', '')
-                    if product_url and not product_url.startswith('http'):
-                        product_url = 'https://almeera.online/' + product_url
-                    
-                    # استخراج قیمت
-                    price_elem = product_elem.select_one("span.price.product-price, div.product-price span, [class*='price']")
-                    price = price_elem.text.strip() if price_elem else "N/A"
-                    
-                    # استخراج وزن از نام محصول
-                    weight_match = re.search(r'\b\d+\s*(?:g|kg|ml|l|pcs)\b', product_name, re.IGNORECASE)
-                    weight = weight_match.group(0) if weight_match else "N/A"
-                    
-                    # استخراج تصویر محصول
-                    img_elem = product_elem.select_one("img.photo, img[class*='product']")
-                    img_url = ""
-                    if img_elem:
-                        img_url = img_elem.get('src', '')
-                        if img_url and not img_url.startswith('http'):
-                            if img_url.startswith('//'):
-                                img_url = 'https:' + img_url
-                            else:
-                                img_url = 'https://almeera.online/' + img_url
-                    
-                    # تمیز کردن قیمت
-                    price = re.sub(r'[^\d\.,]', '', price).strip()
-                    
-                    # اضافه کردن به لیست محصولات صفحه
-                    page_products.append({
-                        'product': self._clean_product_name(product_name),
-                        'brand': self._extract_brand(product_name),
-                        'price': price,
-                        'weight': weight,
-                        'url': product_url,
-                        'page': page_url
-                    })
-                    
-                    logger.info(f"محصول استخراج شد: {product_name} - {price}")
-                except Exception as e:
-                    logger.error(f"خطا در استخراج محصول: {e}")
-            
-            # اگر هیچ محصولی پیدا نشد، سعی کنید با روش JavaScript محصولات را پیدا کنید
-            if len(page_products) == 0:
+            # اگر صفحه کمتر از انتظار محصول داشت، سعی کنید با روش JavaScript محصولات را پیدا کنید
+            # (صفحات بعد از انتهای واقعی دسته‌بندی خالی انتظار می‌روند و fallback ندارند)
+            if self.page_yield.is_under_extracted(self._page_number(page_url), len(page_products)):
                 logger.info("تلاش برای استخراج محصولات با JavaScript...")
                 try:
                     # استخراج همه المنت‌های محصول با کوئری‌سلکتور، به جز آنهایی که در سایدبار هستند
-                    product_elements_js = driver.execute_script("""
-                        return Array.from(document.querySelectorAll('.product, .product-cell, [class*="product-item"]'))
-                        .filter(el => {
-                            // بررسی اینکه آیا المان در سایدبار قرار دارد یا خیر
-                            let parent = el;
-                            while (parent) {
-                                if (parent.id === 'sidebar-first' || 
-                                    (parent.className && parent.className.includes('sidebar'))) {
-                                    return false;
-                                }
-                                parent = parent.parentElement;
-                            }
-                            return true;
-                        })
-                        .map(el => {
-                            let nameEl = el.querySelector('h5 a, a.product-name, a.fn, a[class*="name"], .product-name a');
-                            let priceEl = el.querySelector('span.price, [class*="price"]');
-                            let imgEl = el.querySelector('img');
-                            
-                            return {
-                                name: nameEl ? nameEl.textContent.trim() : '',
-                                url: nameEl ? nameEl.href : '',
-                                price: priceEl ? priceEl.textContent.trim() : '',
-                                image: imgEl ? imgEl.src : ''
-                            };
-                        }).filter(item => item.name && item.name.length > 0);
-                    """)
+                    product_elements_js = self.page_yield.run_fallback(
+                        'javascript', page_url, driver.execute_script, FALLBACK_PRODUCTS_SCRIPT
+                    ) or []
                     
                     for product_data in product_elements_js:
                         if product_data.get('name'):
@@ -400,24 +568,11 @@ class AlmeeraMultiPageScraper:
                             product_url = product_data.get('url', '')
                             price = product_data.get('price', 'N/A')
                             
-                            # استخراج وزن از نام محصول
-                            weight_match = re.search(r'\b\d+\s*(?:g|kg|ml|l|pcs)\b', product_name, re.IGNORECASE)
-                            weight = weight_match.group(0) if weight_match else "N/A"
-                            
-                            # تمیز کردن قیمت
-                            price = re.sub(r'[^\d\.,]', '', price).strip()
-                            
                             # اضافه کردن به لیست محصولات صفحه
-                            page_products.append({
-                                'product': self._clean_product_name(product_name),
-                                'brand': self._extract_brand(product_name),
-                                'price': price,
-                                'weight': weight,
-                                'url': product_url,
-                                'page': page_url
-                            })
+                            product = self._build_product(product_name, price, product_url, page_url)
+                            page_products.append(product)
                             
-                            logger.info(f"محصول استخراج شد با JavaScript: {product_name} - {price}")
+                            logger.info(f"محصول استخراج شد با JavaScript: {product_name} - {product['price']}")
                 except Exception as e:
                     logger.error(f"خطا در استخراج محصولات با JavaScript: {e}")
             
@@ -431,158 +586,224 @@ class AlmeeraMultiPageScraper:
     
     def scrape_all_pages(self):
         """استخراج محصولات از تمام صفحات"""
-        # تنظیم Selenium
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-notifications")
-        chrome_options.add_argument("--disable-infobars")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36")
-        
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # در حالت HTTP مرورگر فقط در صورت نیاز به fallback گرفته می‌شود
+        driver = None if self.http_engine is not None else self._acquire_driver()
         
         try:
             # ابتدا صفحه اول را بارگذاری می‌کنیم تا تعداد کل صفحات را مشخص کنیم
             first_page_url = f"{self.base_url}"
             logger.info(f"بارگذاری صفحه اول: {first_page_url}")
-            driver.get(first_page_url)
-            
-            # انتظار برای بارگذاری صفحه
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            if driver is not None:
+                driver.get(first_page_url)
+                
+                # انتظار برای بارگذاری صفحه
+                WebDriverWait(driver, 20).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                )
             
             # استخراج تعداد کل صفحات
             total_pages = self.get_total_products_and_pages(driver)
+            self.page_yield.set_total_pages(total_pages)
             logger.info(f"تعداد کل صفحات برای استخراج: {total_pages}")
             
-            # استخراج محصولات از هر صفحه
-            for page_num in range(1, total_pages + 1):
-                if page_num == 1:
-                    page_url = f"{self.base_url}"
-                else:
-                    page_url = f"{self.base_url}/?pageId={page_num}"
-                
-                # اطمینان از اینکه URL صحیح است
-                if "frozen-foo" in page_url and "frozen-food" not in page_url:
-                    page_url = page_url.replace("frozen-foo", "frozen-food")
-                
-                logger.info(f"استخراج صفحه {page_num} از {total_pages}: {page_url}")
-                page_products = self.scrape_page(driver, page_url)
-                
-                # بررسی نتیجه استخراج
-                if not page_products:
-                    logger.warning(f"هیچ محصولی در صفحه {page_num} یافت نشد: {page_url}")
-                    # آیا باید یک تلاش مجدد انجام دهیم؟
-                    logger.info("تلاش مجدد برای استخراج صفحه...")
-                    time.sleep(3)  # تاخیر کوتاه قبل از تلاش مجدد
-                    page_products = self.scrape_page(driver, page_url)
+            # صفحات کامل شده در اجرای قبلی از checkpoint خوانده و دوباره دریافت نمی‌شوند
+            done_pages = self._restore_checkpoint(total_pages)
+            
+            if self.http_engine is not None:
+                # دریافت همه صفحات در یک انفجار همزمان، استخراج از HTML دریافت شده انجام می‌شود
+                self._prefetch_pages([self._get_page_url(page_num) for page_num in range(1, total_pages + 1)
+                                      if page_num not in done_pages])
+            
+            if self.workers > 1:
+                # حالت همزمان: تقسیم صفحات بین چند مرورگر و ادغام نتایج به ترتیب صفحه
+                pages = [(page_num, self._get_page_url(page_num)) for page_num in range(1, total_pages + 1)
+                         if page_num not in done_pages]
+                scrape_pages_concurrently(
+                    self._scrape_page_with_retry, pages, self.workers,
+                    driver=driver,
+                    driver_pool=self.driver_pool,
+                    driver_factory=self._acquire_driver,
+                    page_delay=None if self.http_engine is not None else (2, 5),
+                    use_drivers=self.http_engine is None,
+                    on_page=lambda page_num, page_url, page_products: self._collect_page(page_products, page_num),
+                    cancel_event=self.cancel_event
+                )
+            else:
+                # استخراج محصولات از هر صفحه
+                for page_num in range(1, total_pages + 1):
+                    if page_num in done_pages:
+                        continue
+                    if self._is_cancelled():
+                        logger.info(f"استخراج به درخواست کاربر پیش از صفحه {page_num} متوقف شد")
+                        break
                     
-                    if not page_products:
-                        logger.warning(f"تلاش مجدد هم ناموفق بود. ادامه به صفحه بعد...")
-                
-                # افزودن محصولات این صفحه به لیست کلی
-                self.products.extend(page_products)
-                logger.info(f"تعداد محصولات استخراج شده تا کنون: {len(self.products)}")
-                
-                # اضافه کردن تاخیر بین صفحات برای جلوگیری از مسدود شدن
-                if page_num < total_pages:
-                    sleep_time = random.uniform(2, 5)
-                    logger.info(f"صبر کردن به مدت {sleep_time:.2f} ثانیه قبل از استخراج صفحه بعدی...")
-                    time.sleep(sleep_time)
-            
-            logger.info(f"استخراج تمام صفحات به پایان رسید. تعداد کل محصولات استخراج شده: {len(self.products)}")
+                    page_url = self._get_page_url(page_num)
+                    
+                    logger.info(f"استخراج صفحه {page_num} از {total_pages}: {page_url}")
+                    page_products = self._scrape_page_with_retry(driver, page_url)
+                    
+                    # افزودن محصولات این صفحه به لیست کلی
+                    self._collect_page(page_products, page_num)
+                    logger.info(f"تعداد محصولات استخراج شده تا کنون: {len(self.raw_products)}")
+                    
+                    # اضافه کردن تاخیر بین صفحات برای جلوگیری از مسدود شدن (صفحات دریافت شده با HTTP نیازی به تاخیر ندارند)
+                    if page_num < total_pages and self._get_page_url(page_num + 1) not in self._prefetched_html:
+                        sleep_time = random.uniform(2, 5)
+                        logger.info(f"صبر کردن به مدت {sleep_time:.2f} ثانیه قبل از استخراج صفحه بعدی...")
+                        time.sleep(sleep_time)
+            
+            # صفحات خالی پس از استخراج کامل (مثلاً صفحات تخمینی اضافه) در اجرای بعدی دوباره دریافت نمی‌شوند
+            if self.checkpoint is not None and not self._is_cancelled():
+                self.checkpoint.finish()
+            logger.info(f"استخراج تمام صفحات به پایان رسید. تعداد کل محصولات استخراج شده: {len(self.raw_products)}")
+            self.page_yield.log_summary()
             
         except Exception as e:
             logger.error(f"خطا در استخراج تمام صفحات: {e}")
         
         finally:
-            driver.quit()
+            if driver is not None:
+                self._release_driver(driver)
+            self._release_fallback_drivers()
+            self.postprocess()
     
-    def _extract_brand(self, product_name):
-        """استخراج برند از نام محصول"""
-        common_brands = ["WATTIES", "Al Alali", "American Garden", "Ardo", "Betty Crocker", "Birds Eye", 
-                         "Findus", "Frigo", "Haagen-Dazs", "Iceland", "Kellogg's", "Lurpak", "McCain",
-                         "Pillsbury", "Sara Lee", "Sadia", "Farm Fresh", "Iglo", "Green Isle", "Americana", 
-                         "Green Giant", "Kiri", "La Vache Qui Rit", "Philadelphia", "Galbani", "Doux", 
-                         "Almarai", "Quorn", "Beyond Meat", "Baskin Robbins", "London Dairy"]
-        
-        for brand in common_brands:
-            if brand.upper() in product_name.upper():
-                return brand
-        
-        # اگر نام محصول با کلمه حروف بزرگ شروع می‌شود، احتمالاً برند است
-        parts = product_name.split()
-        if len(parts) > 1 and parts[0].isupper() and not re.search(r'\d', parts[0]):
-            return parts[0]
-            
-        return "N/A"
+    def _prefetch_pages(self, page_urls):
+        """دریافت همزمان HTML صفحات با asyncio و نگه داشتن آن‌ها برای scrape_page"""
+        page_urls = [page_url for page_url in page_urls if page_url not in self._prefetched_html]
+        if not page_urls or self._is_cancelled():
+            return
+        
+        logger.info(f"دریافت همزمان {len(page_urls)} صفحه با HTTP...")
+        fetcher = AsyncPageFetcher(http_engine=self.http_engine)
+        self._prefetched_html.update(fetcher.fetch_pages(page_urls, cancel_event=self.cancel_event))
     
-    def _clean_product_name(self, product_name):
-        """حذف برند و وزن از نام محصول"""
-        # حذف برند از ابتدای نام
-        brand = self._extract_brand(product_name)
-        if brand != "N/A":
-            # حذف برند از ابتدای نام محصول با اطمینان بیشتر
-            if product_name.upper().startswith(brand.upper()):
-                clean_name = product_name[len(brand):].strip()
-            else:
-                # جستجوی دقیق برند و حذف آن
-                clean_name = re.sub(rf'\b{re.escape(brand)}\b', '', product_name, flags=re.IGNORECASE).strip()
-            
-            # حذف کاراکترهای اضافی مثل - یا : بعد از حذف برند
-            clean_name = re.sub(r'^[\s\-:]+', '', clean_name)
+    def _get_page_url(self, page_num):
+        """ساخت آدرس یک صفحه از دسته‌بندی"""
+        if page_num == 1:
+            page_url = f"{self.base_url}"
         else:
-            clean_name = product_name
-            
-        # حذف وزن و اندازه از انتهای نام
-        weight_pattern = r'\b\d+\s*(?:g|kg|ml|l|pcs|pieces|pack|x)\b.*$'
-        clean_name = re.sub(weight_pattern, '', clean_name, flags=re.IGNORECASE).strip()
+            page_url = f"{self.base_url}/?pageId={page_num}"
         
-        # حذف whitespace اضافی
-        clean_name = re.sub(r'\s+', ' ', clean_name).strip()
+        # اطمینان از اینکه URL صحیح است
+        if "frozen-foo" in page_url and "frozen-food" not in page_url:
+            page_url = page_url.replace("frozen-foo", "frozen-food")
         
-        return clean_name
+        return page_url
+    
+    def _scrape_page_with_retry(self, driver, page_url):
+        """استخراج یک صفحه و یک تلاش مجدد در صورت خالی بودن نتیجه"""
+        page_num = self._page_number(page_url)
+        page_products = self.scrape_page(driver, page_url)
+        
+        # بررسی نتیجه استخراج (صفحاتی که خالی انتظار می‌روند دوباره تلاش نمی‌شوند)
+        if not page_products and not self._is_cancelled() and self.page_yield.is_under_extracted(page_num, 0):
+            logger.warning(f"هیچ محصولی در صفحه یافت نشد: {page_url}")
+            # آیا باید یک تلاش مجدد انجام دهیم؟
+            logger.info("تلاش مجدد برای استخراج صفحه...")
+            time.sleep(3)  # تاخیر کوتاه قبل از تلاش مجدد
+            page_products = self.page_yield.run_fallback('retry', page_url, self.scrape_page, driver, page_url)
+            
+            if not page_products:
+                logger.warning(f"تلاش مجدد هم ناموفق بود. ادامه به صفحه بعد...")
+                self.page_yield.mark_empty(page_num)
+        
+        if page_products:
+            self.page_yield.record(page_num, len(page_products))
+        return page_products
+    
+    def _page_number(self, page_url):
+        """شماره صفحه از پارامتر pageId آدرس (صفحه اول pageId ندارد)"""
+        page_match = re.search(r'pageId=(\d+)', page_url)
+        return int(page_match.group(1)) if page_match else 1
+    
+    def _is_cancelled(self):
+        """بررسی درخواست لغو استخراج"""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def _acquire_driver(self):
+        """گرفتن درایور از مخزن مشترک یا راه‌اندازی یک درایور اختصاصی"""
+        if self.driver_pool is not None:
+            return self.driver_pool.acquire()
+        
+        # درایور اختصاصی با همان تنظیمات مشترک مخزن
+        return create_driver()
+    
+    def _get_fallback_driver(self):
+        """گرفتن درایور Selenium برای fallback مسیر HTTP (یک درایور برای هر thread)"""
+        driver = getattr(self._fallback_local, 'driver', None)
+        if driver is None:
+            driver = self._acquire_driver()
+            self._fallback_local.driver = driver
+            with self._fallback_lock:
+                self._fallback_drivers.append(driver)
+        return driver
+    
+    def _release_fallback_drivers(self):
+        """برگرداندن همه درایورهای fallback پس از پایان استخراج"""
+        with self._fallback_lock:
+            drivers = self._fallback_drivers
+            self._fallback_drivers = []
+            self._fallback_local = threading.local()
+        for driver in drivers:
+            self._release_driver(driver)
+    
+    def _release_driver(self, driver):
+        """برگرداندن درایور به مخزن یا بستن درایور اختصاصی"""
+        if self.driver_pool is not None:
+            self.driver_pool.release(driver)
+        else:
+            driver.quit()
+    
+    def _collect_page(self, page_products, page_num=None):
+        """افزودن محصولات خام یک صفحه، نوشتن نسخه پس‌پردازش شده آن در sink و ذخیره صفحه در checkpoint (در صورت وجود)"""
+        self.raw_products.extend(page_products)
+        if self.sink is not None and page_products:
+            self.sink.write_rows(normalize_products(page_products, 'almeera').to_dict('records'))
+        if self.checkpoint is not None and page_num is not None:
+            self.checkpoint.record_page(page_num, page_products)
+    
+    def _restore_checkpoint(self, total_pages):
+        """افزودن محصولات صفحات ذخیره شده در checkpoint بدون دریافت دوباره و برگرداندن شماره آن صفحات"""
+        if self.checkpoint is None:
+            return set()
+        self.checkpoint.start(total_pages)
+        done_pages = self.checkpoint.done_pages(total_pages)
+        # صفحات بازیابی شده قبلاً در sinkهای اجرای قبلی نوشته شده‌اند و فقط به محصولات خام اضافه می‌شوند
+        for page_num in sorted(done_pages):
+            if self.checkpoint.is_done(page_num):
+                self.raw_products.extend(self.checkpoint.load_page(page_num))
+        self.restored_product_count = len(self.raw_products)
+        if done_pages:
+            logger.info(f"{len(done_pages)} صفحه از {total_pages} صفحه از checkpoint {self.checkpoint.path} بازیابی شد")
+        return done_pages
+    
+    def postprocess(self):
+        """یکسان‌سازی ستونی محصولات خام جمع‌آوری شده و قرار دادن نتیجه در self.products"""
+        self.products = normalize_products(self.raw_products, 'almeera').to_dict('records')
+        return self.products
     
     def save_to_excel(self):
-        """ذخیره داده‌ها در فایل اکسل"""
+        """ذخیره داده‌ها در فایل اکسل (ردیف به ردیف، بدون ساخت DataFrame)"""
         try:
-            # تبدیل لیست محصولات به دیتافریم
-            df = pd.DataFrame(self.products)
+            if not self.products:
+                logger.warning("محصولی برای ذخیره در فایل اکسل وجود ندارد")
+                return None
             
             # حذف ستون‌های image_url و website اگر وجود داشته باشند
-            columns_to_drop = []
-            if 'image_url' in df.columns:
-                columns_to_drop.append('image_url')
-            if 'website' in df.columns:
-                columns_to_drop.append('website')
-            
-            if columns_to_drop:
-                df = df.drop(columns=columns_to_drop)
-                logger.info(f"ستون‌های حذف شده از خروجی: {', '.join(columns_to_drop)}")
+            columns = [column for column in self.products[0] if column not in ('image_url', 'website')]
             
             # حذف ردیف‌های تکراری بر اساس نام محصول
-            df = df.drop_duplicates(subset=['product'])
-            logger.info(f"تعداد محصولات پس از حذف موارد تکراری: {len(df)}")
+            seen = set()
+            unique_products = []
+            for product in self.products:
+                if product['product'] not in seen:
+                    seen.add(product['product'])
+                    unique_products.append(product)
+            logger.info(f"تعداد محصولات پس از حذف موارد تکراری: {len(unique_products)}")
             
             current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"shelfie_almeera_products_{current_datetime}.xlsx"
-            writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-            df.to_excel(writer, index=False, sheet_name='Products')
-            
-            # تنظیم عرض ستون‌ها
-            workbook = writer.book
-            worksheet = writer.sheets['Products']
-            for i, col in enumerate(df.columns):
-                column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, column_width)
-            
-            writer.close()
+            write_products(filename, unique_products, columns)
             logger.info(f"داده‌ها در فایل {filename} ذخیره شدند")
             return filename
         except Exception as e:
@@ -597,6 +818,8 @@ if __name__ == "__main__":
                         help='آدرس URL دسته‌بندی محصولات برای استخراج')
     parser.add_argument('--pages', type=int, 
                         help='تعداد صفحاتی که می‌خواهید استخراج کنید (اختیاری، پیش‌فرض: همه صفحات)')
+    parser.add_argument('--checkpoint', type=str,
+                        help='پوشه checkpoint؛ اجرای دوباره با همان پوشه از اولین صفحه استخراج نشده ادامه می‌دهد (اختیاری)')
     
     # پارس کردن آرگومان‌ها
     args = parser.parse_args()
@@ -608,7 +831,8 @@ if __name__ == "__main__":
         logger.info(f"شروع استخراج تمام صفحات از {args.url}")
     
     # ایجاد اسکریپر با پارامترهای مشخص شده
-    scraper = AlmeeraMultiPageScraper(args.url, args.pages)
+    checkpoint = ScrapeCheckpoint(args.checkpoint, args.url) if args.checkpoint else None
+    scraper = AlmeeraMultiPageScraper(args.url, args.pages, checkpoint=checkpoint)
     scraper.scrape_all_pages()
     
     # ذخیره داده‌ها در فایل اکسل
@@ -0,0 +1,164 @@
+"""
+Shelfie - دریافت همزمان صفحات با asyncio
+همه صفحات یک دسته‌بندی در یک انفجار همزمان دریافت می‌شوند، با سقف تعداد درخواست‌های
+همزمان برای هر host، تایم‌اوت برای هر درخواست و امکان لغو. استخراج محصولات از HTML
+همچنان توسط منطق اختصاصی هر فروشگاه انجام می‌شود.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlparse
+import requests
+from shelfie_http_engine import DEFAULT_HEADERS
+
+try:
+    import aiohttp
+except ImportError:  # بدون aiohttp درخواست‌ها در threadهای asyncio با requests ارسال می‌شوند
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+# حداکثر تعداد درخواست‌های همزمان به یک host (قابل تنظیم با متغیر محیطی)
+DEFAULT_PER_HOST_LIMIT = int(os.environ.get('SHELFIE_ASYNC_PER_HOST_LIMIT', 8))
+
+# حداکثر زمان هر درخواست بر حسب ثانیه (قابل تنظیم با متغیر محیطی)
+DEFAULT_FETCH_TIMEOUT = float(os.environ.get('SHELFIE_ASYNC_FETCH_TIMEOUT', 30))
+
+# فاصله بررسی رویداد لغو بر حسب ثانیه
+CANCEL_POLL_INTERVAL = 0.2
+
+
+class AsyncPageFetcher:
+    """
+    دریافت همزمان مجموعه‌ای از صفحات با asyncio
+    """
+
+    def __init__(self, http_engine=None, per_host_limit=DEFAULT_PER_HOST_LIMIT,
+                 timeout=DEFAULT_FETCH_TIMEOUT, retries=1, headers=None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            http_engine (HttpFetchEngine, optional): موتور HTTP برای ارسال درخواست‌ها وقتی aiohttp نصب نیست
+            per_host_limit (int): حداکثر درخواست‌های همزمان برای هر host
+            timeout (float): حداکثر زمان هر درخواست (ثانیه)
+            retries (int): تعداد تلاش مجدد برای هر صفحه
+            headers (dict, optional): هدرهای اضافی درخواست‌ها
+        """
+        self.http_engine = http_engine
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+
+    def fetch_pages(self, urls, cancel_event=None):
+        """
+        دریافت همزمان صفحات (فراخوانی از کد همگام)
+
+        Args:
+            urls (list): لیست آدرس صفحات
+            cancel_event (threading.Event, optional): با فعال شدن آن درخواست‌های باقی‌مانده لغو می‌شوند
+
+        Returns:
+            dict: نگاشت آدرس به متن HTML برای صفحاتی که با موفقیت دریافت شدند
+        """
+        if not urls:
+            return {}
+        return asyncio.run(self.fetch_all(urls, cancel_event))
+
+    async def fetch_all(self, urls, cancel_event=None):
+        """
+        دریافت همزمان صفحات
+
+        Args:
+            urls (list): لیست آدرس صفحات
+            cancel_event (threading.Event, optional): رویداد لغو
+
+        Returns:
+            dict: نگاشت آدرس به متن HTML برای صفحاتی که با موفقیت دریافت شدند
+        """
+        start_time = time.time()
+        semaphores = {}
+        for url in urls:
+            host = urlparse(url).netloc
+            if host not in semaphores:
+                semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+
+        session = None
+        if aiohttp is not None:
+            session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit_per_host=self.per_host_limit)
+            )
+
+        try:
+            tasks = [
+                asyncio.create_task(self._fetch_one(session, semaphores[urlparse(url).netloc], url))
+                for url in urls
+            ]
+            watcher = asyncio.create_task(self._watch_cancel(cancel_event, tasks)) if cancel_event is not None else None
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if watcher is not None:
+                watcher.cancel()
+        finally:
+            if session is not None:
+                await session.close()
+
+        pages = {}
+        for url, result in zip(urls, results):
+            if isinstance(result, asyncio.CancelledError):
+                logger.info(f"دریافت صفحه {url} لغو شد")
+            elif isinstance(result, BaseException):
+                logger.warning(f"خطا در دریافت صفحه {url}: {result}")
+            else:
+                pages[url] = result
+
+        logger.info(f"{len(pages)} از {len(urls)} صفحه در {time.time() - start_time:.2f} ثانیه به صورت همزمان دریافت شد")
+        return pages
+
+    async def _watch_cancel(self, cancel_event, tasks):
+        """لغو همه درخواست‌های باقی‌مانده با فعال شدن رویداد لغو"""
+        while not all(task.done() for task in tasks):
+            if cancel_event.is_set():
+                logger.info("دریافت همزمان صفحات به درخواست کاربر لغو شد")
+                for task in tasks:
+                    task.cancel()
+                return
+            await asyncio.sleep(CANCEL_POLL_INTERVAL)
+
+    async def _fetch_one(self, session, semaphore, url):
+        """دریافت یک صفحه با رعایت سقف host، تایم‌اوت و تلاش مجدد"""
+        async with semaphore:
+            last_error = None
+            for attempt in range(self.retries + 1):
+                try:
+                    return await asyncio.wait_for(self._get(session, url), self.timeout)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    last_error = TimeoutError(f"تایم‌اوت پس از {self.timeout} ثانیه")
+                except Exception as e:
+                    last_error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+            raise last_error
+
+    async def _get(self, session, url):
+        """ارسال یک درخواست GET و برگرداندن متن پاسخ"""
+        if session is not None:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.text()
+        return await asyncio.to_thread(self._get_blocking, url)
+
+    def _get_blocking(self, url):
+        """ارسال درخواست با requests وقتی aiohttp در دسترس نیست"""
+        if self.http_engine is not None:
+            return self.http_engine.fetch(url)
+        response = requests.get(url, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
@@ -0,0 +1,184 @@
+"""
+Shelfie - فهرست مشترک برندها برای همه فروشگاه‌ها
+برندها یک بار از فایل قابل ویرایش brands.txt (هر خط یک برند) خوانده می‌شوند و در یک
+ماشین Aho-Corasick بدون حساسیت به حروف بزرگ و کوچک قرار می‌گیرند، بنابراین پیدا کردن
+برند یک نام فقط یک پیمایش روی حروف آن است، حتی با هزاران برند. اگر چند برند در نام
+باشند، طولانی‌ترین تطابق (و در تساوی، اولین) انتخاب می‌شود؛ تطابق فقط روی مرز کلمه
+پذیرفته می‌شود تا برندهای کوتاه داخل کلمات دیگر پیدا نشوند.
+"""
+
+import logging
+import os
+import threading
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# فایل پیش‌فرض برندها (قابل تغییر با متغیر محیطی)
+DEFAULT_BRANDS_FILE = os.environ.get(
+    'SHELFIE_BRANDS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'brands.txt')
+)
+
+# برند یافت شده و محدوده آن در نام محصول
+BrandMatch = namedtuple('BrandMatch', ['brand', 'start', 'end'])
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class BrandIndex:
+    """
+    ماشین Aho-Corasick روی نام برندها
+    """
+
+    def __init__(self, brands):
+        """
+        ساخت ماشین از لیست برندها
+
+        Args:
+            brands (list): نام برندها با املای مورد نظر برای خروجی
+        """
+        self.brands = []
+        # هر گره: انتقال‌ها، پیوند شکست و طول/شماره برندهایی که در این گره تمام می‌شوند
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        seen = set()
+        for brand in brands:
+            key = brand.strip().lower()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            self._add(key, len(self.brands))
+            self.brands.append(brand.strip())
+        self._build_fail_links()
+
+    def _add(self, key, brand_id):
+        """افزودن یک برند به درخت پیشوندی"""
+        node = 0
+        for char in key:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(key), brand_id))
+
+    def _build_fail_links(self):
+        """محاسبه پیوندهای شکست با پیمایش سطح به سطح"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                # برندهای پسوندی هم در این گره تمام می‌شوند
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, product_name):
+        """
+        یافتن برند در نام محصول با یک پیمایش
+
+        Args:
+            product_name (str): نام محصول
+
+        Returns:
+            BrandMatch: برند و محدوده آن در نام، یا None اگر برندی پیدا نشود
+        """
+        if not product_name:
+            return None
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        best = None
+        # موقعیت هر حرف کوچک شده در نام اصلی (lower ممکن است طول حرف را تغییر دهد)
+        origins = []
+        for index, original_char in enumerate(product_name):
+            for char in original_char.lower():
+                origins.append(index)
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+                for length, brand_id in output[node]:
+                    start = origins[len(origins) - length]
+                    end = index + 1
+                    if best is not None and (end - start < best.end - best.start or
+                                             (end - start == best.end - best.start and start >= best.start)):
+                        continue
+                    if not self._on_word_boundary(product_name, start, end):
+                        continue
+                    best = BrandMatch(self.brands[brand_id], start, end)
+        return best
+
+    def _on_word_boundary(self, product_name, start, end):
+        """آیا تطابق یک کلمه کامل است (نه بخشی از کلمه‌ای دیگر)"""
+        if start > 0 and product_name[start - 1].isalnum() and product_name[start].isalnum():
+            return False
+        if end < len(product_name) and product_name[end].isalnum() and product_name[end - 1].isalnum():
+            return False
+        return True
+
+
+def load_brands(path=None):
+    """
+    خواندن لیست برندها از فایل (خطوط خالی و خطوط شروع شده با # نادیده گرفته می‌شوند)
+
+    Args:
+        path (str, optional): مسیر فایل. اگر None باشد، فایل پیش‌فرض استفاده می‌شود
+
+    Returns:
+        list: نام برندها
+    """
+    path = path or DEFAULT_BRANDS_FILE
+    brands = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    brands.append(line)
+    except OSError as e:
+        logger.warning(f"فایل برندها خوانده نشد ({path}): {e}")
+    return brands
+
+
+def get_brand_index(path=None):
+    """
+    فهرست برندهای یک فایل (فقط یک بار برای هر فایل ساخته می‌شود)
+
+    Args:
+        path (str, optional): مسیر فایل. اگر None باشد، فایل پیش‌فرض استفاده می‌شود
+
+    Returns:
+        BrandIndex: فهرست آماده جستجو
+    """
+    path = path or DEFAULT_BRANDS_FILE
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = BrandIndex(load_brands(path))
+            _indexes[path] = index
+            logger.info(f"{len(index.brands)} برند از {path} بارگذاری شد")
+    return index
+
+
+def find_brand(product_name):
+    """یافتن برند در نام محصول با فهرست پیش‌فرض"""
+    return get_brand_index().find(product_name)
+
+
+def remove_brand(product_name, match):
+    """حذف محدوده برند از نام محصول و کاراکترهای جداکننده بعد از آن"""
+    clean_name = (product_name[:match.start] + ' ' + product_name[match.end:]).strip()
+    return clean_name.lstrip(' -:').strip()
@@ -0,0 +1,295 @@
+"""
+Shelfie - ذخیره پیشرفت استخراج صفحه به صفحه و ادامه کارهای قطع شده
+محصولات خام هر صفحه کامل شده در یک فایل JSON جداگانه (page_0037.json) و اطلاعات استخراج
+(آدرس، تعداد کل صفحات و در صورت وجود حالت استخراج و اندازه صفحه) در manifest.json ذخیره می‌شوند. هر فایل ابتدا در یک فایل موقت نوشته
+و سپس با os.replace جایگزین می‌شود، بنابراین قطع شدن برنامه یا مرورگر هیچ‌وقت فایل نیمه‌کاره‌ای
+باقی نمی‌گذارد. اجرای دوباره با همان checkpoint صفحات کامل شده را از دیسک می‌خواند و فقط
+صفحات باقی‌مانده را استخراج می‌کند.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# پوشه پیش‌فرض checkpointها (خالی یا 0 برای غیرفعال کردن)
+DEFAULT_CHECKPOINT_DIR = os.environ.get('SHELFIE_CHECKPOINT_DIR', 'checkpoints')
+
+_PAGE_FILE_PATTERN = re.compile(r'page_(\d+)\.json$')
+
+
+def checkpoint_root(root=None):
+    """پوشه checkpointها (None اگر با مقدار خالی یا 0 غیرفعال شده باشد)"""
+    root = DEFAULT_CHECKPOINT_DIR if root is None else root
+    if not root or root == '0':
+        return None
+    return root
+
+
+def write_json_atomically(path, data):
+    """نوشتن فایل JSON در یک فایل موقت کنار مقصد و جایگزینی آن"""
+    directory, filename = os.path.split(path)
+    temp_path = os.path.join(directory, f".{filename}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as temp_file:
+            json.dump(data, temp_file, ensure_ascii=False, default=str)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def read_json(path):
+    """خواندن فایل JSON (None اگر وجود نداشته یا خراب باشد)"""
+    try:
+        with open(path, encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+class ScrapeCheckpoint:
+    """
+    checkpoint استخراج یک دسته‌بندی: محصولات خام صفحات کامل شده روی دیسک
+    (امن برای استفاده همزمان از چند worker)
+    """
+
+    def __init__(self, path, url=None):
+        """
+        باز کردن یا ساختن پوشه checkpoint
+
+        Args:
+            path (str): پوشه checkpoint
+            url (str, optional): آدرس دسته‌بندی (برای ثبت در manifest)
+        """
+        self.path = path
+        self.url = url
+        self.total_pages = None
+        # حالت استخراج (مثلاً api یا browser) و تعداد محصولات هر صفحه؛ صفحات ذخیره شده فقط با همین مقادیر معتبرند
+        self.mode = None
+        self.page_size = None
+        # استخراج بدون لغو یا خطا تا انتها رسیده است (صفحات خالی انتهای دسته‌بندی دیگر باقی‌مانده نیستند)
+        self.complete = False
+        self._pages = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        manifest = read_json(os.path.join(path, 'manifest.json')) or {}
+        self.url = url or manifest.get('url')
+        self.total_pages = manifest.get('total_pages')
+        self.mode = manifest.get('mode')
+        self.page_size = manifest.get('page_size')
+        self.complete = bool(manifest.get('complete'))
+        for page_path in glob.glob(os.path.join(path, 'page_*.json')):
+            match = _PAGE_FILE_PATTERN.search(page_path)
+            if match:
+                self._pages[int(match.group(1))] = page_path
+        if self._pages:
+            logger.info(f"{len(self._pages)} صفحه کامل شده از checkpoint {path} بازیابی شد")
+
+    def start(self, total_pages, mode=None, page_size=None):
+        """
+        ثبت تعداد کل صفحات در manifest (تغییر تعداد صفحات، استخراج کامل شده را دوباره ناتمام می‌کند)
+
+        اگر mode داده شود و حالت استخراج یا اندازه صفحه با مقادیر ثبت شده یکی نباشد، شماره صفحات
+        ذخیره شده به صفحات دیگری اشاره دارند و همه آن‌ها دور ریخته می‌شوند.
+
+        Args:
+            total_pages (int): تعداد کل صفحات دسته‌بندی
+            mode (str, optional): حالت استخراج (مثلاً api یا browser)
+            page_size (int, optional): تعداد محصولات هر صفحه در این حالت
+        """
+        with self._lock:
+            if mode is not None and (mode, page_size) != (self.mode, self.page_size):
+                if self._pages:
+                    logger.warning(f"checkpoint {self.path} با حالت {self.mode} و اندازه صفحه {self.page_size} "
+                                   f"ذخیره شده است؛ {len(self._pages)} صفحه ذخیره شده دور ریخته می‌شود")
+                self._discard_pages()
+                self.mode = mode
+                self.page_size = page_size
+            if total_pages != self.total_pages:
+                self.complete = False
+            self.total_pages = total_pages
+            self._write_manifest()
+
+    def _discard_pages(self):
+        """حذف فایل‌های صفحات ذخیره شده (قفل باید در دست باشد)"""
+        for page_path in self._pages.values():
+            try:
+                os.remove(page_path)
+            except OSError:
+                pass
+        self._pages = {}
+        self.complete = False
+
+    def finish(self):
+        """ثبت پایان استخراج بدون لغو یا خطا (صفحات بدون محصول انتهای دسته‌بندی هستند، نه صفحات باقی‌مانده)"""
+        with self._lock:
+            self.complete = True
+            self._write_manifest()
+
+    def _write_manifest(self):
+        """ذخیره اطلاعات استخراج در manifest.json"""
+        write_json_atomically(os.path.join(self.path, 'manifest.json'), {
+            'url': self.url,
+            'total_pages': self.total_pages,
+            'mode': self.mode,
+            'page_size': self.page_size,
+            'complete': self.complete,
+            'updated_at': datetime.now().isoformat()
+        })
+
+    def is_done(self, page_num):
+        """آیا محصولات این صفحه قبلاً ذخیره شده‌اند"""
+        return page_num in self._pages
+
+    def completed_pages(self):
+        """شماره صفحات کامل شده به ترتیب"""
+        return sorted(self._pages)
+
+    def done_pages(self, total_pages):
+        """
+        صفحاتی که نیازی به استخراج دوباره ندارند
+
+        Args:
+            total_pages (int): تعداد کل صفحات برای استخراج
+
+        Returns:
+            set: همه صفحات اگر استخراج قبلاً کامل شده باشد، وگرنه صفحات ذخیره شده
+        """
+        if self.complete:
+            return set(range(1, total_pages + 1))
+        return {page_num for page_num in self._pages if page_num <= total_pages}
+
+    def missing_pages(self):
+        """شماره صفحاتی از 1 تا total_pages که هنوز محصولی برای آن‌ها ذخیره نشده است (خالی اگر استخراج کامل شده باشد)"""
+        if not self.total_pages or self.complete:
+            return []
+        return [page_num for page_num in range(1, self.total_pages + 1) if page_num not in self._pages]
+
+    def record_page(self, page_num, page_products):
+        """
+        ذخیره محصولات خام یک صفحه (صفحات خالی ذخیره نمی‌شوند تا در اجرای بعدی دوباره امتحان شوند)
+
+        Args:
+            page_num (int): شماره صفحه
+            page_products (list): محصولات خام صفحه
+        """
+        if not page_products:
+            return
+        page_path = os.path.join(self.path, f"page_{page_num:04d}.json")
+        try:
+            write_json_atomically(page_path, page_products)
+        except OSError as e:
+            logger.warning(f"ذخیره checkpoint صفحه {page_num} ممکن نشد: {e}")
+            return
+        with self._lock:
+            self._pages[page_num] = page_path
+
+    def load_page(self, page_num):
+        """محصولات خام ذخیره شده یک صفحه"""
+        return read_json(self._pages[page_num]) or []
+
+    def remove(self):
+        """حذف پوشه checkpoint پس از پایان کامل استخراج"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def checkpoint_key(url):
+    """نام پوشه checkpoint یک دسته‌بندی در checkpoint یک کار"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+
+class JobCheckpoint:
+    """
+    checkpoint یک کار: پارامترهای کار در job.json و یک ScrapeCheckpoint برای هر دسته‌بندی
+    """
+
+    def __init__(self, checkpoint_id, root=None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            checkpoint_id (str): شناسه checkpoint (شناسه کاری که آن را ساخته)
+            root (str, optional): پوشه checkpointها. اگر None باشد، SHELFIE_CHECKPOINT_DIR
+        """
+        self.checkpoint_id = checkpoint_id
+        self.path = os.path.join(checkpoint_root(root) or DEFAULT_CHECKPOINT_DIR, checkpoint_id)
+        self._scrapes = {}
+        self._lock = threading.Lock()
+
+    def save_params(self, params):
+        """ذخیره پارامترهای کار برای ادامه آن پس از راه‌اندازی دوباره برنامه"""
+        os.makedirs(self.path, exist_ok=True)
+        write_json_atomically(os.path.join(self.path, 'job.json'), dict(params, updated_at=datetime.now().isoformat()))
+
+    def for_url(self, url):
+        """checkpoint استخراج یک دسته‌بندی از این کار"""
+        with self._lock:
+            scrape_checkpoint = self._scrapes.get(url)
+            if scrape_checkpoint is None:
+                scrape_checkpoint = ScrapeCheckpoint(os.path.join(self.path, checkpoint_key(url)), url)
+                self._scrapes[url] = scrape_checkpoint
+            return scrape_checkpoint
+
+    def is_complete(self):
+        """آیا همه دسته‌بندی‌های استفاده شده در این اجرا تا انتها استخراج شده‌اند"""
+        with self._lock:
+            scrapes = list(self._scrapes.values())
+        return all(scrape.complete for scrape in scrapes)
+
+    def missing_pages(self):
+        """صفحات باقی‌مانده همه دسته‌بندی‌های استفاده شده در این اجرا: {آدرس: [شماره صفحات]}"""
+        with self._lock:
+            scrapes = list(self._scrapes.values())
+        missing_pages = {}
+        for scrape in scrapes:
+            pages = scrape.missing_pages()
+            if pages:
+                missing_pages[scrape.url] = pages
+        return missing_pages
+
+    def remove(self):
+        """حذف checkpoint کار"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def list_checkpoints(root=None):
+    """
+    checkpointهای کارهای ناتمام
+
+    Args:
+        root (str, optional): پوشه checkpointها
+
+    Returns:
+        list: دیکشنری‌های پارامترهای کار همراه با checkpoint_id، به ترتیب آخرین به‌روزرسانی
+    """
+    root = checkpoint_root(root)
+    if root is None:
+        return []
+    checkpoints = []
+    for params_path in glob.glob(os.path.join(root, '*', 'job.json')):
+        params = read_json(params_path)
+        if params is not None:
+            params['checkpoint_id'] = os.path.basename(os.path.dirname(params_path))
+            checkpoints.append(params)
+    return sorted(checkpoints, key=lambda params: params.get('updated_at', ''), reverse=True)
+
+
+def load_checkpoint_params(checkpoint_id, root=None):
+    """پارامترهای کار ذخیره شده در یک checkpoint (None اگر وجود نداشته باشد)"""
+    root = checkpoint_root(root)
+    # شناسه‌ها hex هستند؛ هر مقدار دیگری (مثلاً ../) رد می‌شود
+    if root is None or not re.fullmatch(r'[0-9a-f]+', checkpoint_id or ''):
+        return None
+    return read_json(os.path.join(root, checkpoint_id, 'job.json'))
@@ -0,0 +1,147 @@
+"""
+Shelfie - استخراج همزمان صفحات با چند مرورگر
+آدرس صفحات بین چند worker (هر کدام با مرورگر خودش) تقسیم می‌شود و نتایج
+به ترتیب شماره صفحه ادغام می‌شوند.
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from shelfie_driver_pool import ChromeDriverPool, create_driver
+
+logger = logging.getLogger(__name__)
+
+# تعداد پیش‌فرض workerها برای هر استخراج (1 یعنی حالت ترتیبی قبلی)
+DEFAULT_PAGE_WORKERS = int(os.environ.get('SHELFIE_PAGE_WORKERS', 1))
+
+
+def scrape_pages_concurrently(scrape_page, pages, workers, driver=None, driver_pool=None,
+                              driver_factory=None, page_delay=None, on_page=None, cancel_event=None,
+                              use_drivers=True):
+    """
+    استخراج همزمان مجموعه‌ای از صفحات با چند مرورگر
+
+    Args:
+        scrape_page (callable): تابع استخراج یک صفحه با امضای (driver, page_url)
+        pages (list): لیست (شماره صفحه، آدرس صفحه) به ترتیب
+        workers (int): تعداد مرورگرهای همزمان
+        driver (webdriver, optional): درایوری که فراخواننده در اختیار دارد و به عنوان اولین worker استفاده می‌شود
+        driver_pool (ChromeDriverPool, optional): مخزن مشترک برای گرفتن درایورهای اضافه
+        driver_factory (callable, optional): سازنده درایور در صورت نبود مخزن مشترک
+        page_delay (tuple, optional): بازه (حداقل، حداکثر) تاخیر هر worker بین دو صفحه بر حسب ثانیه
+        on_page (callable, optional): تابعی با امضای (page_num, page_url, page_products) که به ترتیب صفحات فراخوانی می‌شود
+        cancel_event (threading.Event, optional): با فعال شدن آن workerها صفحه جدیدی شروع نمی‌کنند
+        use_drivers (bool): اگر False باشد workerها بدون مرورگر اجرا می‌شوند (برای موتور HTTP) و driver=None به scrape_page داده می‌شود
+
+    Returns:
+        list: لیست محصولات هر صفحه به ترتیب ورودی
+    """
+    if not pages:
+        return []
+
+    workers = max(1, min(int(workers), len(pages)))
+    if not use_drivers:
+        driver = None
+        driver_pool = None
+    elif driver_pool is not None and workers > driver_pool.size:
+        logger.info(f"تعداد workerها به اندازه مخزن درایور ({driver_pool.size}) محدود شد")
+        workers = driver_pool.size
+    extra_workers = workers - (1 if driver is not None else 0)
+
+    # اگر مخزن مشترکی داده نشده، یک مخزن موقت برای همین استخراج ساخته می‌شود
+    own_pool = None
+    if use_drivers and extra_workers > 0 and driver_pool is None:
+        own_pool = ChromeDriverPool(size=extra_workers, driver_factory=driver_factory or create_driver)
+        driver_pool = own_pool
+
+    if use_drivers:
+        logger.info(f"استخراج همزمان {len(pages)} صفحه با {workers} مرورگر")
+    else:
+        logger.info(f"استخراج همزمان {len(pages)} صفحه با {workers} worker بدون مرورگر")
+
+    work_queue = queue.Queue()
+    for index, (page_num, page_url) in enumerate(pages):
+        work_queue.put((index, page_num, page_url))
+
+    results = [None] * len(pages)
+    lock = threading.Lock()
+    next_index = [0]
+
+    def flush_in_order():
+        # تحویل نتایج به ترتیب صفحه به محض کامل شدن پیشوند پیوسته
+        while next_index[0] < len(pages) and results[next_index[0]] is not None:
+            index = next_index[0]
+            if on_page is not None:
+                page_num, page_url = pages[index]
+                try:
+                    on_page(page_num, page_url, results[index])
+                except Exception as e:
+                    logger.error(f"خطا در پردازش نتیجه صفحه {page_num}: {e}")
+            next_index[0] += 1
+
+    def worker(worker_driver, from_pool):
+        try:
+            if worker_driver is None and use_drivers:
+                try:
+                    worker_driver = driver_pool.acquire()
+                except Exception as e:
+                    logger.error(f"worker نتوانست مرورگر دریافت کند: {e}")
+                    return
+                from_pool = True
+
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                try:
+                    index, page_num, page_url = work_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                try:
+                    page_products = scrape_page(worker_driver, page_url) or []
+                except Exception as e:
+                    logger.error(f"خطا در استخراج صفحه {page_num}: {e}")
+                    page_products = []
+
+                with lock:
+                    results[index] = page_products
+                    flush_in_order()
+
+                if page_delay and not work_queue.empty():
+                    if cancel_event is not None:
+                        cancel_event.wait(random.uniform(*page_delay))
+                    else:
+                        time.sleep(random.uniform(*page_delay))
+        finally:
+            if from_pool and worker_driver is not None:
+                driver_pool.release(worker_driver)
+
+    threads = []
+    if driver is not None:
+        threads.append(threading.Thread(target=worker, args=(driver, False), daemon=True))
+    for _ in range(extra_workers):
+        threads.append(threading.Thread(target=worker, args=(None, False), daemon=True))
+
+    start_time = time.time()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+    # صفحاتی که هیچ workerی به آن‌ها نرسیده (لغو یا نبود مرورگر) خالی در نظر گرفته می‌شوند
+    with lock:
+        for index in range(len(pages)):
+            if results[index] is None:
+                logger.warning(f"صفحه {pages[index][0]} استخراج نشد")
+                results[index] = []
+        flush_in_order()
+
+    logger.info(f"استخراج همزمان {len(pages)} صفحه در {time.time() - start_time:.2f} ثانیه به پایان رسید")
+    return results
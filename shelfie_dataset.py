@@ -0,0 +1,246 @@
+"""
+Shelfie - طرح یکسان و تایپ شده محصولات همه فروشگاه‌ها و خروجی Parquet
+خروجی هر اسکرپر (با ستون‌های name/store یا product/website) به یک DataFrame با ستون‌ها و
+نوع‌های ثابت تبدیل می‌شود: قیمت و مقدار عددی و متن‌ها (نام، برند، آدرس محصول و صفحه) با نوع string.
+فایل‌های Parquet به تفکیک فروشگاه و تاریخ استخراج (store=.../scrape_date=...) ذخیره
+می‌شوند تا کوئری‌های چند هفته‌ای فقط ستون‌ها و پارتیشن‌های لازم را بخوانند.
+"""
+
+import argparse
+import logging
+import os
+import uuid
+from datetime import datetime
+import pandas as pd
+from shelfie_units import parse_quantities
+from shelfie_postprocess import read_raw_products
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# پوشه پیش‌فرض دیتاست Parquet (خالی یا 0 برای غیرفعال کردن)
+DEFAULT_DATASET_DIR = os.environ.get('SHELFIE_DATASET_DIR', 'shelfie_dataset')
+
+# ستون‌های طرح یکسان و نوع pandas هر کدام
+UNIFIED_DTYPES = {
+    'store': 'string',
+    'scrape_date': 'string',
+    'scraped_at': 'datetime64[ns]',
+    'product': 'string',
+    'brand': 'string',
+    'price': 'float64',
+    'currency': 'string',
+    'price_text': 'string',
+    'weight': 'string',
+    'quantity': 'float64',
+    'unit': 'string',
+    'base_unit': 'string',
+    'base_quantity': 'float64',
+    'pack_count': 'Int64',
+    'total_base_quantity': 'float64',
+    'url': 'string',
+    'page': 'string'
+}
+
+UNIFIED_COLUMNS = list(UNIFIED_DTYPES)
+
+# ستون‌های پارتیشن‌بندی فایل‌های Parquet
+PARTITION_COLUMNS = ['store', 'scrape_date']
+
+# واحد پول هر فروشگاه وقتی متن قیمت واحد پول ندارد
+STORE_CURRENCIES = {
+    'lulu': 'AED',
+    'almeera': 'QAR',
+    'spinneys': 'AED',
+    'unioncoop': 'AED'
+}
+
+# نام ستون نام محصول در خروجی هر فروشگاه
+_NAME_COLUMNS = ('product', 'name')
+
+
+def _parse_prices(prices):
+    """
+    تبدیل متن قیمت‌ها به عدد و واحد پول
+
+    Args:
+        prices (pandas.Series): متن قیمت‌ها (مثل "AED 12.50"، "6.50 AED" یا "1,250")
+
+    Returns:
+        tuple: (قیمت عددی float64، واحد پول یا NA)
+    """
+    text = prices.astype('string').str.strip()
+    amounts = text.str.extract(r'(\d[\d,]*(?:\.\d+)?)')[0].str.replace(',', '', regex=False)
+    currencies = text.str.extract(r'\b([A-Za-z]{3})\b')[0].str.upper()
+    return pd.to_numeric(amounts, errors='coerce').astype('float64'), currencies
+
+
+def to_unified(products, store, scraped_at=None):
+    """
+    تبدیل محصولات خروجی یک اسکرپر به طرح یکسان
+
+    Args:
+        products (list | pandas.DataFrame): محصولات پس‌پردازش شده (خروجی normalize_products یا scraper.products)
+        store (str): نام فروشگاه (lulu، almeera، spinneys یا unioncoop)
+        scraped_at (datetime, optional): زمان استخراج. اگر None باشد، زمان فعلی استفاده می‌شود
+
+    Returns:
+        pandas.DataFrame: محصولات با ستون‌ها و نوع‌های UNIFIED_DTYPES
+    """
+    frame = products if isinstance(products, pd.DataFrame) else pd.DataFrame(list(products))
+    scraped_at = scraped_at or datetime.now()
+    if frame.empty:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in UNIFIED_DTYPES.items()})
+
+    frame = frame.reset_index(drop=True)
+    names = next((frame[column] for column in _NAME_COLUMNS if column in frame.columns),
+                 pd.Series(None, index=frame.index, dtype=object))
+    price_text = frame['price'] if 'price' in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+    price_text = price_text.astype('string').str.strip().replace({'N/A': pd.NA, '': pd.NA})
+    prices, currencies = _parse_prices(price_text)
+    weights = frame['weight'] if 'weight' in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+    quantities = parse_quantities(weights)
+
+    unified = pd.DataFrame({
+        'store': store,
+        'scrape_date': scraped_at.strftime('%Y-%m-%d'),
+        'scraped_at': pd.Timestamp(scraped_at),
+        'product': names,
+        'brand': frame.get('brand'),
+        'price': prices,
+        'currency': currencies.fillna(STORE_CURRENCIES.get(store)).where(prices.notna()),
+        'price_text': price_text,
+        'weight': weights,
+        'quantity': quantities['quantity'],
+        'unit': quantities['unit'],
+        'base_unit': quantities['base_unit'],
+        'base_quantity': quantities['base_quantity'],
+        'pack_count': quantities['pack_count'],
+        'total_base_quantity': quantities['total_base_quantity'],
+        'url': frame.get('url'),
+        'page': frame.get('page')
+    }, index=frame.index)
+    return unified.astype(UNIFIED_DTYPES)[UNIFIED_COLUMNS]
+
+
+def parquet_schema():
+    """طرح Arrow ثابت دیتاست تا همه پارتیشن‌ها (حتی با ستون‌های کاملاً خالی) نوع یکسان داشته باشند"""
+    return pa.schema([
+        ('product', pa.string()),
+        ('brand', pa.string()),
+        ('price', pa.float64()),
+        ('currency', pa.string()),
+        ('price_text', pa.string()),
+        ('weight', pa.string()),
+        ('quantity', pa.float64()),
+        ('unit', pa.string()),
+        ('base_unit', pa.string()),
+        ('base_quantity', pa.float64()),
+        ('pack_count', pa.int64()),
+        ('total_base_quantity', pa.float64()),
+        ('url', pa.string()),
+        ('page', pa.string()),
+        ('scraped_at', pa.timestamp('us')),
+        ('store', pa.string()),
+        ('scrape_date', pa.string())
+    ])
+
+
+def write_dataset(unified, root=None, basename=None):
+    """
+    افزودن محصولات طرح یکسان به دیتاست Parquet پارتیشن‌بندی شده (store=.../scrape_date=...)
+
+    Args:
+        unified (pandas.DataFrame): خروجی to_unified
+        root (str, optional): پوشه دیتاست. اگر None باشد، SHELFIE_DATASET_DIR استفاده می‌شود
+        basename (str, optional): پیشوند نام فایل‌ها (مثلاً شناسه کار). اگر None باشد، یک شناسه تصادفی
+
+    Returns:
+        str: پوشه دیتاست، یا None اگر محصولی وجود نداشته باشد
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet output (pip install pyarrow)")
+    root = root or DEFAULT_DATASET_DIR
+    if unified.empty:
+        return None
+
+    table = pa.Table.from_pandas(unified, schema=parquet_schema(), preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root_path=root,
+        partition_cols=PARTITION_COLUMNS,
+        basename_template=f"{basename or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    logger.info(f"{len(unified)} محصول در دیتاست {root} ذخیره شد")
+    return root
+
+
+def read_dataset(root=None, columns=None, stores=None, since=None, until=None):
+    """
+    خواندن بخشی از دیتاست؛ فقط ستون‌ها و پارتیشن‌های لازم از دیسک خوانده می‌شوند
+
+    Args:
+        root (str, optional): پوشه دیتاست. اگر None باشد، SHELFIE_DATASET_DIR استفاده می‌شود
+        columns (list, optional): ستون‌های مورد نیاز. اگر None باشد، همه ستون‌ها
+        stores (list, optional): فروشگاه‌ها
+        since (str, optional): اولین تاریخ استخراج (YYYY-MM-DD)
+        until (str, optional): آخرین تاریخ استخراج (YYYY-MM-DD)
+
+    Returns:
+        pandas.DataFrame: محصولات
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet output (pip install pyarrow)")
+    filters = []
+    if stores:
+        filters.append(('store', 'in', list(stores)))
+    if since:
+        filters.append(('scrape_date', '>=', since))
+    if until:
+        filters.append(('scrape_date', '<=', until))
+    return pd.read_parquet(root or DEFAULT_DATASET_DIR, engine='pyarrow', columns=columns, filters=filters or None)
+
+
+def export_products(products, store, scraped_at=None, basename=None, root=None):
+    """
+    تبدیل محصولات یک کار به طرح یکسان و افزودن آن‌ها به دیتاست (در صورت فعال بودن)
+
+    Args:
+        products (list | pandas.DataFrame): محصولات پس‌پردازش شده
+        store (str): نام فروشگاه
+        scraped_at (datetime, optional): زمان استخراج
+        basename (str, optional): پیشوند نام فایل‌ها
+        root (str, optional): پوشه دیتاست
+
+    Returns:
+        str: پوشه دیتاست، یا None اگر دیتاست غیرفعال باشد یا pyarrow نصب نباشد
+    """
+    root = DEFAULT_DATASET_DIR if root is None else root
+    if not root or root == '0':
+        return None
+    if not PYARROW_AVAILABLE:
+        logger.warning("pyarrow نصب نیست؛ خروجی Parquet ذخیره نشد")
+        return None
+    return write_dataset(to_unified(products, store, scraped_at), root, basename)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='افزودن فایل‌های خروجی اسکرپرها به دیتاست Parquet')
+    parser.add_argument('paths', nargs='+', help='فایل‌های خروجی (xlsx، csv، json یا jsonl)')
+    parser.add_argument('--store', choices=sorted(STORE_CURRENCIES), required=True, help='فروشگاه محصولات')
+    parser.add_argument('--date', help='تاریخ استخراج (YYYY-MM-DD). پیش‌فرض زمان تغییر هر فایل')
+    parser.add_argument('--root', default=None, help='پوشه دیتاست')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        scraped_at = (datetime.strptime(args.date, '%Y-%m-%d') if args.date
+                      else datetime.fromtimestamp(os.path.getmtime(path)))
+        write_dataset(to_unified(read_raw_products(path), args.store, scraped_at), args.root)
@@ -0,0 +1,232 @@
+"""
+Shelfie - مخزن مشترک درایورهای Chrome
+این ماژول مجموعه‌ای از مرورگرهای headless را از قبل راه‌اندازی می‌کند تا همه اسکرپرها
+به جای ساختن و بستن یک مرورگر جدید برای هر دسته‌بندی، از آن‌ها استفاده مجدد کنند.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+logger = logging.getLogger(__name__)
+
+# اندازه پیش‌فرض مخزن (قابل تنظیم با متغیر محیطی)
+DEFAULT_POOL_SIZE = int(os.environ.get('SHELFIE_DRIVER_POOL_SIZE', 2))
+
+# حداکثر زمان انتظار برای گرفتن یک درایور آزاد (ثانیه)
+DEFAULT_ACQUIRE_TIMEOUT = int(os.environ.get('SHELFIE_DRIVER_ACQUIRE_TIMEOUT', 300))
+
+# گرم کردن مخزن هنگام راه‌اندازی برنامه (0 برای راه‌اندازی مرورگرها در اولین استفاده)
+DEFAULT_WARM_POOL = os.environ.get('SHELFIE_WARM_DRIVER_POOL', '1') != '0'
+
+
+def build_chrome_options():
+    """
+    ساخت تنظیمات مشترک Chrome برای همه اسکرپرها
+
+    Returns:
+        Options: تنظیمات headless کروم
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-popup-blocking")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36")
+    return chrome_options
+
+
+def create_driver():
+    """
+    راه‌اندازی یک درایور جدید Chrome با تنظیمات مشترک
+
+    Returns:
+        webdriver: آبجکت درایور سلنیوم
+    """
+    driver = webdriver.Chrome(options=build_chrome_options())
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+
+class ChromeDriverPool:
+    """
+    مخزن thread-safe از درایورهای Chrome با بررسی سلامت و اندازه قابل تنظیم
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, driver_factory=create_driver, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        """
+        مقداردهی اولیه مخزن
+
+        Args:
+            size (int): حداکثر تعداد مرورگرهای همزمان
+            driver_factory (callable): تابع سازنده درایور جدید
+            acquire_timeout (int): حداکثر زمان انتظار برای یک درایور آزاد (ثانیه)
+        """
+        self.size = max(1, int(size))
+        self.driver_factory = driver_factory
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        atexit.register(self.shutdown)
+
+    def _create(self):
+        """ساخت یک درایور جدید در صورت وجود ظرفیت خالی"""
+        with self._lock:
+            if self._closed or self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            start_time = time.time()
+            driver = self.driver_factory()
+            logger.info(f"درایور جدید Chrome در {time.time() - start_time:.2f} ثانیه راه‌اندازی شد")
+            return driver
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _discard(self, driver):
+        """بستن درایور خراب و آزاد کردن ظرفیت آن"""
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"خطا در بستن درایور خراب: {e}")
+        with self._lock:
+            self._created -= 1
+
+    @staticmethod
+    def is_healthy(driver):
+        """
+        بررسی سلامت درایور با یک فراخوانی سبک JavaScript
+
+        Args:
+            driver: WebDriver سلنیوم
+
+        Returns:
+            bool: True اگر مرورگر پاسخگو باشد
+        """
+        try:
+            return driver.execute_script("return 1") == 1 and len(driver.window_handles) > 0
+        except Exception:
+            return False
+
+    def warm(self):
+        """راه‌اندازی همزمان همه درایورها پیش از اولین درخواست"""
+        logger.info(f"گرم کردن مخزن درایور با {self.size} مرورگر...")
+        threads = []
+        for _ in range(self.size):
+            thread = threading.Thread(target=self._warm_one, daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        logger.info(f"مخزن درایور آماده است: {self.stats()}")
+
+    def _warm_one(self):
+        try:
+            driver = self._create()
+            if driver is not None:
+                self._idle.put(driver)
+        except Exception as e:
+            logger.error(f"خطا در گرم کردن درایور: {e}")
+
+    def acquire(self, timeout=None):
+        """
+        گرفتن یک درایور سالم از مخزن
+
+        Args:
+            timeout (int, optional): حداکثر زمان انتظار. اگر None باشد از مقدار پیش‌فرض مخزن استفاده می‌شود
+
+        Returns:
+            webdriver: درایور آماده استفاده
+        """
+        if self._closed:
+            raise RuntimeError("مخزن درایور بسته شده است")
+
+        deadline = time.time() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._create()
+                if driver is None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError("هیچ درایور آزادی در مخزن موجود نیست")
+                    try:
+                        driver = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        raise TimeoutError("هیچ درایور آزادی در مخزن موجود نیست")
+
+            if self.is_healthy(driver):
+                return driver
+
+            logger.warning("درایور ناسالم از مخزن حذف شد، جایگزینی با درایور جدید...")
+            self._discard(driver)
+
+    def release(self, driver):
+        """
+        برگرداندن درایور به مخزن پس از پایان کار
+
+        Args:
+            driver: WebDriver سلنیوم
+        """
+        if driver is None:
+            return
+        if self._closed or not self.is_healthy(driver):
+            self._discard(driver)
+            return
+        try:
+            # پاک کردن وضعیت صفحه قبلی تا اسکرپر بعدی از صفحه تمیز شروع کند
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except Exception as e:
+            logger.warning(f"خطا در بازنشانی درایور، درایور حذف می‌شود: {e}")
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """گرفتن یک درایور به صورت context manager و برگرداندن خودکار آن"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def stats(self):
+        """اطلاعات وضعیت فعلی مخزن"""
+        return {
+            'size': self.size,
+            'created': self._created,
+            'idle': self._idle.qsize(),
+            'closed': self._closed
+        }
+
+    def shutdown(self):
+        """بستن همه درایورهای آزاد مخزن"""
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+        logger.info("مخزن درایور بسته شد")
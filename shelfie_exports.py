@@ -0,0 +1,162 @@
+"""
+Shelfie - فایل‌های خروجی کش شده هر کار برای دانلود
+خروجی CSV، NDJSON یا اکسل هر کار فقط یک بار (برای هر تعداد محصول) ساخته و با کلید شناسه
+کار و فرمت نگه داشته می‌شود؛ کلیک‌های بعدی همان فایل را می‌گیرند. نسخه gzip فایل‌های متنی
+هم یک بار ساخته می‌شود. ETag از شناسه کار، تعداد محصولات و اندازه فایل ساخته می‌شود تا
+مرورگر و دانلود ادامه‌دار (Range) نسخه‌های یکسان را تشخیص دهند.
+"""
+
+import glob
+import gzip
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import namedtuple
+from shelfie_sinks import write_products
+
+logger = logging.getLogger(__name__)
+
+# پوشه پیش‌فرض فایل‌های خروجی کش شده
+DEFAULT_EXPORT_DIR = os.environ.get('SHELFIE_EXPORT_DIR', os.path.join('uploads', 'exports'))
+
+# فرمت‌های خروجی و نوع MIME هر کدام
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# فرمت‌هایی که فشرده‌سازی gzip حجم آن‌ها را کم می‌کند (xlsx خودش فشرده است)
+COMPRESSIBLE_FORMATS = ('csv', 'ndjson')
+
+# فایل آماده ارسال
+ExportArtifact = namedtuple('ExportArtifact', ['path', 'download_name', 'mimetype', 'etag', 'encoding'])
+
+
+def _replace_atomically(path, write):
+    """نوشتن فایل در یک فایل موقت کنار مقصد و جایگزینی آن تا فایل نیمه‌کاره هیچ‌وقت ارسال نشود"""
+    directory, filename = os.path.split(path)
+    temp_path = os.path.join(directory, f"tmp-{uuid.uuid4().hex}-{filename}")
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _gzip_file(source, destination):
+    """فشرده‌سازی یک فایل به صورت جریانی"""
+    with open(source, 'rb') as source_file, gzip.open(destination, 'wb', compresslevel=6) as gzip_file:
+        shutil.copyfileobj(source_file, gzip_file, 1024 * 1024)
+
+
+class ExportCache:
+    """
+    کش فایل‌های خروجی کارها روی دیسک
+    (امن برای استفاده همزمان از چند thread؛ هر فایل فقط یک بار ساخته می‌شود)
+    """
+
+    def __init__(self, root=DEFAULT_EXPORT_DIR):
+        """
+        مقداردهی اولیه
+
+        Args:
+            root (str): پوشه فایل‌های خروجی (برای هر کار یک زیرپوشه)
+        """
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _job_lock(self, job_id):
+        """قفل ساخت فایل‌های یک کار"""
+        with self._locks_lock:
+            return self._locks.setdefault(job_id, threading.Lock())
+
+    def get(self, job, export_format, compress=False, download_prefix='shelfie_products'):
+        """
+        فایل خروجی کار در فرمت خواسته شده (ساخت آن در اولین درخواست)
+        فایل برگردانده شده ممکن است با رسیدن محصولات جدید حذف شود؛ برای ارسال آن از send استفاده کنید.
+
+        Args:
+            job (ScrapeJob): کار استخراج
+            export_format (str): csv، ndjson یا xlsx
+            compress (bool): نسخه gzip فایل (فقط برای csv و ndjson)
+            download_prefix (str): پیشوند نام فایل دانلود شده
+
+        Returns:
+            ExportArtifact: فایل آماده ارسال، یا None اگر کار محصولی نداشته باشد
+        """
+        with self._job_lock(job.id):
+            return self._build(job, export_format, compress, download_prefix)
+
+    def send(self, job, export_format, send, compress=False, download_prefix='shelfie_products'):
+        """
+        ساخت فایل خروجی کار و باز کردن آن برای ارسال پیش از آزاد کردن قفل کار، تا درخواست دیگری
+        که خروجی جدیدتری می‌سازد فایل را پیش از باز شدن حذف نکند (فایل باز شده حتی پس از حذف
+        کامل خوانده می‌شود)
+
+        Args:
+            job (ScrapeJob): کار استخراج
+            export_format (str): csv، ndjson یا xlsx
+            send (callable): تابعی با امضای (artifact) که فایل را باز می‌کند و پاسخ را برمی‌گرداند
+            compress (bool): نسخه gzip فایل (فقط برای csv و ndjson)
+            download_prefix (str): پیشوند نام فایل دانلود شده
+
+        Returns:
+            خروجی send، یا None اگر کار محصولی نداشته باشد
+        """
+        with self._job_lock(job.id):
+            artifact = self._build(job, export_format, compress, download_prefix)
+            return send(artifact) if artifact is not None else None
+
+    def _build(self, job, export_format, compress, download_prefix):
+        """ساخت فایل خروجی در صورت نبود آن (فراخواننده قفل کار را در اختیار دارد)"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        products = list(job.products)
+        if not products:
+            return None
+        compress = compress and export_format in COMPRESSIBLE_FORMATS
+
+        job_dir = os.path.join(self.root, job.id)
+        # تعداد محصولات جزء نام فایل است تا خروجی کار در حال اجرا با رسیدن محصولات جدید ساخته شود
+        path = os.path.join(job_dir, f"products-{len(products)}.{export_format}")
+        os.makedirs(job_dir, exist_ok=True)
+        if not os.path.exists(path):
+            _replace_atomically(path, lambda temp_path: write_products(temp_path, products))
+            # نسخه‌های قدیمی فقط پس از ساخت نسخه جدید حذف می‌شوند
+            self._remove_stale(job_dir, export_format, keep=path)
+            logger.info(f"فایل خروجی {export_format} کار {job.id} ساخته شد: {path}")
+        if compress:
+            if not os.path.exists(f"{path}.gz"):
+                _replace_atomically(f"{path}.gz", lambda temp_path: _gzip_file(path, temp_path))
+            path = f"{path}.gz"
+
+        size = os.path.getsize(path)
+        return ExportArtifact(
+            path=os.path.abspath(path),
+            download_name=f"{download_prefix}_{job.id}.{export_format}",
+            mimetype=EXPORT_FORMATS[export_format],
+            etag=f"{job.id}-{len(products)}-{export_format}{'-gz' if compress else ''}-{size:x}",
+            encoding='gzip' if compress else None
+        )
+
+    def remove(self, job_id):
+        """حذف همه فایل‌های خروجی یک کار (هنگام حذف کار از لیست کارها)"""
+        with self._job_lock(job_id):
+            shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+        with self._locks_lock:
+            self._locks.pop(job_id, None)
+
+    def _remove_stale(self, job_dir, export_format, keep):
+        """حذف خروجی‌های قدیمی‌تر همین فرمت (با تعداد محصولات کمتر) تا دیسک از نسخه‌های تکراری پر نشود"""
+        for stale_path in glob.glob(os.path.join(job_dir, f"products-*.{export_format}*")):
+            if stale_path == keep:
+                continue
+            try:
+                os.remove(stale_path)
+            except OSError as e:
+                logger.warning(f"حذف فایل خروجی قدیمی {stale_path} ممکن نشد: {e}")
@@ -1,14 +1,24 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify, Response
+import json
 import logging
 import os
 import threading
+import time
 import traceback
 from datetime import datetime
 from unioncoop_scraper import UnionCoopMultiPageScraper
 from shelfie_lulu_scraper import ShelfieScraper as LuluMultiPageScraper
 from shelfie_spinneys_scraper import SpinneysMultiPageScraper
 from almeera_scraper import AlmeeraMultiPageScraper
+from shelfie_driver_pool import ChromeDriverPool, DEFAULT_POOL_SIZE, DEFAULT_WARM_POOL
+from shelfie_concurrent import DEFAULT_PAGE_WORKERS
+from shelfie_jobs import JobManager, DEFAULT_MAX_CONCURRENT_JOBS, FINISHED_STATUSES
+from shelfie_http_engine import HttpFetchEngine, DEFAULT_HTTP_STORES, HTTP_CAPABLE_STORES
+from shelfie_sinks import CsvSink, NdjsonSink, SinkGroup, write_products
+from shelfie_dataset import export_products
+from shelfie_product_store import ProductStoreSink, category_from_url, get_product_store
+from shelfie_exports import EXPORT_FORMATS, ExportCache
+from shelfie_checkpoint import JobCheckpoint, checkpoint_root, list_checkpoints, load_checkpoint_params
 
 # تنظیم لاگر
 logging.basicConfig(
@@ -23,20 +33,14 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# وضعیت کلی برنامه
-class ScraperState:
-    def __init__(self):
-        self.scraper_running = False
-        self.progress = 0
-        self.total_pages = 0
-        self.current_page = 0
-        self.products = []
-        self.log_messages = []
-        self.output_file = None
-        self.notification_message = ""
-        self.show_notification = False
-
-state = ScraperState()
+# مخزن مشترک مرورگرهای Chrome برای همه اسکرپرها
+driver_pool = ChromeDriverPool(size=DEFAULT_POOL_SIZE)
+
+# موتور HTTP مشترک (Session با اتصال‌های keep-alive) برای فروشگاه‌هایی که بدون مرورگر استخراج می‌شوند
+http_engine = HttpFetchEngine()
+
+# فاصله پیام‌های keep-alive جریان رویدادها (ثانیه) تا پراکسی‌ها اتصال بیکار را نبندند
+SSE_KEEPALIVE_INTERVAL = 15
 
 # مسیر ذخیره فایل‌ها
 UPLOAD_FOLDER = 'uploads'
@@ -44,264 +48,620 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# فایل‌های خروجی هر کار که یک بار ساخته و برای دانلودهای بعدی نگه داشته می‌شوند
+export_cache = ExportCache()
+
+# آدرس پایه دسته‌بندی‌ها برای هر فروشگاه در حالت چند دسته‌بندی (Lulu از URL فرم استفاده می‌کند)
+CATEGORY_BASE_URLS = {
+    "Spinneys": "https://www.spinneys.com/en-ae/catalogue/category",
+    "Union Coop": "https://www.unioncoop.ae/frozen-food-sea-food-butter-ice-cream.html",
+    "Almeera": "https://almeera.online"
+}
+
+# پارامترهای کار که در checkpoint ذخیره می‌شوند تا کار پس از راه‌اندازی دوباره برنامه هم قابل ادامه باشد
+CHECKPOINT_JOB_PARAMS = ('store_type', 'url', 'max_pages', 'categories', 'workers')
+
+# پیشوند نام فایل خروجی برای هر فروشگاه
+STORE_PREFIXES = {
+    "Lulu Hypermarket": "lulu",
+    "Spinneys": "spinneys",
+    "Union Coop": "unioncoop",
+    "Almeera": "almeera"
+}
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def parse_job_params(data, categories):
+    """
+    خواندن پارامترهای کار از فرم یا بدنه JSON درخواست
+
+    Args:
+        data (dict): داده‌های فرم یا JSON
+        categories (list): لیست دسته‌بندی‌های انتخاب شده
+
+    Returns:
+        dict: پارامترهای ساخت کار
+    """
+    use_max_pages = str(data.get('use_max_pages', 'false')).lower() == 'true'
+    max_pages = int(data.get('max_pages', 1)) if use_max_pages else None
+    use_multi_category = str(data.get('use_multi_category', 'false')).lower() == 'true'
+
+    return {
+        'store_type': data.get('store_type') or "Lulu Hypermarket",
+        'url': data.get('url'),
+        'max_pages': max_pages,
+        'categories': categories if use_multi_category else None,
+        'workers': max(1, int(data.get('workers', DEFAULT_PAGE_WORKERS)))
+    }
+
+def get_request_job_params():
+    """پارامترهای کار از درخواست فعلی (JSON یا فرم)"""
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        return parse_job_params(data, data.get('categories') or [])
+    return parse_job_params(request.form, request.form.getlist('categories[]'))
+
+def get_requested_job():
+    """کار مشخص شده با پارامتر job_id یا آخرین کار ساخته شده"""
+    job_id = request.args.get('job_id')
+    if job_id:
+        return job_manager.get(job_id)
+    return job_manager.latest()
+
 @app.route('/start_scraping', methods=['POST'])
 def start_scraping():
-    if state.scraper_running:
-        return jsonify({'status': 'error', 'message': 'یک فرآیند استخراج در حال اجراست'})
-    
     try:
-        store_type = request.form.get('store_type')
-        url = request.form.get('url')
-        use_max_pages = request.form.get('use_max_pages') == 'true'
-        max_pages = int(request.form.get('max_pages', 1)) if use_max_pages else None
-        use_multi_category = request.form.get('use_multi_category') == 'true'
-        
-        # اگر چندین دسته‌بندی انتخاب شده است
-        categories = None
-        if use_multi_category:
-            categories = request.form.getlist('categories[]')
-        
-        # راه‌اندازی Thread جدید برای استخراج
-        thread = threading.Thread(
-            target=run_scraper, 
-            args=(url, max_pages, categories, store_type)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return jsonify({'status': 'success', 'message': 'استخراج آغاز شد'})
-    
+        job = job_manager.create_job(**get_request_job_params())
+        return jsonify({'status': 'success', 'message': 'استخراج آغاز شد', 'job_id': job.id})
+
     except Exception as e:
         logger.error(f"خطا در شروع استخراج: {e}")
         logger.error(traceback.format_exc())
         return jsonify({'status': 'error', 'message': f'خطا: {str(e)}'})
 
-@app.route('/status')
-def get_status():
-    """ارائه وضعیت فعلی اسکرپر به صورت JSON"""
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """ساخت یک کار استخراج جدید"""
+    try:
+        job = job_manager.create_job(**get_request_job_params())
+        return jsonify({'status': 'success', 'job': job.to_dict()}), 201
+    except Exception as e:
+        logger.error(f"خطا در ساخت کار: {e}")
+        return jsonify({'status': 'error', 'message': f'خطا: {str(e)}'}), 400
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """لیست همه کارها بدون لاگ‌ها"""
     return jsonify({
-        'scraper_running': state.scraper_running,
-        'progress': state.progress,
-        'total_pages': state.total_pages,
-        'current_page': state.current_page,
-        'product_count': len(state.products),
-        'logs': state.log_messages[-50:] if state.log_messages else [],
-        'output_file': state.output_file,
-        'notification_message': state.notification_message,
-        'show_notification': state.show_notification
+        'status': 'success',
+        'max_concurrent': job_manager.max_concurrent,
+        'running': job_manager.running_count(),
+        'jobs': [job.to_dict(log_limit=0) for job in job_manager.list()]
     })
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """وضعیت یک کار"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'کار یافت نشد'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """لغو یک کار در صف یا در حال اجرا"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'کار یافت نشد'}), 404
+    if not job_manager.cancel(job_id):
+        return jsonify({'status': 'error', 'message': 'این کار قبلاً به پایان رسیده است'}), 409
+    return jsonify({'status': 'success', 'job': job.to_dict(log_limit=0)})
+
+def resume_from_checkpoint(checkpoint_id):
+    """
+    ساخت کار جدیدی که یک کار قطع شده را از صفحات استخراج نشده آن ادامه می‌دهد
+
+    Args:
+        checkpoint_id (str): شناسه checkpoint
+
+    Returns:
+        tuple: پاسخ JSON و کد وضعیت HTTP
+    """
+    params = load_checkpoint_params(checkpoint_id)
+    if params is None:
+        return jsonify({'status': 'error', 'message': 'checkpointی برای ادامه این کار وجود ندارد'}), 404
+    active_job = job_manager.active_job_for_checkpoint(checkpoint_id)
+    if active_job is not None:
+        return jsonify({'status': 'error', 'message': f'کار {active_job.id} در حال ادامه این checkpoint است'}), 409
+    job = job_manager.create_job(checkpoint_id=checkpoint_id, **{key: params.get(key) for key in CHECKPOINT_JOB_PARAMS})
+    return jsonify({'status': 'success', 'job': job.to_dict()}), 201
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """ادامه یک کار لغو شده یا ناموفق بدون دریافت دوباره صفحات کامل شده"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'کار یافت نشد'}), 404
+    if job.status not in FINISHED_STATUSES:
+        return jsonify({'status': 'error', 'message': 'این کار هنوز به پایان نرسیده است'}), 409
+    return resume_from_checkpoint(job.checkpoint_id)
+
+@app.route('/checkpoints', methods=['GET'])
+def list_job_checkpoints():
+    """checkpointهای کارهای ناتمام (از جمله کارهای اجراهای قبلی برنامه)"""
+    return jsonify({'status': 'success', 'checkpoints': list_checkpoints()})
+
+@app.route('/checkpoints/<checkpoint_id>/resume', methods=['POST'])
+def resume_checkpoint(checkpoint_id):
+    """ادامه کار ذخیره شده در یک checkpoint (مثلاً پس از راه‌اندازی دوباره برنامه)"""
+    return resume_from_checkpoint(checkpoint_id)
+
+def parse_cursor(value):
+    """خواندن cursor لاگ‌ها از پارامتر درخواست (None اگر وجود نداشته یا نامعتبر باشد)"""
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+def sse_message(event, data, event_id=None):
+    """قالب‌بندی یک رویداد Server-Sent Events"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+def job_event_stream(job, cursor):
+    """
+    جریان رویدادهای یک کار: status فقط وقتی وضعیت تغییر کند و log فقط برای لاگ‌های جدید
+
+    Args:
+        job (ScrapeJob): کار استخراج
+        cursor (int): cursor آخرین لاگ دریافت شده توسط مرورگر
+
+    Yields:
+        str: رویدادهای SSE تا پایان کار
+    """
+    last_status = None
+    last_sent = time.monotonic()
+    while True:
+        finished = job.status in FINISHED_STATUSES
+        logs, cursor = job.logs_since(cursor)
+        status = job.to_dict(log_limit=0)
+        # لاگ‌ها جداگانه ارسال می‌شوند و تغییر cursor به تنهایی رویداد status نمی‌سازد
+        del status['logs'], status['log_cursor']
+        messages = []
+        if logs:
+            messages.append(sse_message('log', {'logs': logs, 'log_cursor': cursor}, event_id=cursor))
+        if status != last_status:
+            messages.append(sse_message('status', status))
+            last_status = status
+        if messages:
+            yield ''.join(messages)
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= SSE_KEEPALIVE_INTERVAL:
+            yield ': keep-alive\n\n'
+            last_sent = time.monotonic()
+
+        if finished:
+            yield sse_message('end', {'status': job.status})
+            return
+        job.wait_for_update(timeout=1)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """جریان Server-Sent Events پیشرفت و لاگ‌های جدید یک کار"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'کار یافت نشد'}), 404
+    # مرورگر هنگام اتصال دوباره آخرین id دریافت شده را در Last-Event-ID می‌فرستد
+    cursor = parse_cursor(request.headers.get('Last-Event-ID'))
+    if cursor is None:
+        cursor = parse_cursor(request.args.get('since')) or 0
+    response = Response(job_event_stream(job, cursor), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/jobs/<job_id>/logs')
+def job_logs(job_id):
+    """دانلود لاگ کامل یک کار (لاگ‌های منتقل شده به دیسک و لاگ‌های درون حافظه)"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'کار یافت نشد'}), 404
+    response = Response((f"{line}\n" for line in job.logs.lines()), mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename=shelfie_job_{job.id}.log'
+    return response
+
+@app.route('/status')
+def get_status():
+    """ارائه وضعیت فعلی اسکرپر به صورت JSON (با since=<cursor> فقط لاگ‌های جدید)"""
+    job = get_requested_job()
+    if job is None:
+        return jsonify({
+            'scraper_running': False,
+            'progress': 0,
+            'total_pages': 0,
+            'current_page': 0,
+            'product_count': 0,
+            'logs': [],
+            'log_cursor': 0,
+            'output_file': None,
+            'notification_message': "",
+            'show_notification': False
+        })
+    return jsonify(job.to_dict(since=parse_cursor(request.args.get('since'))))
+
+def find_output_job(filename):
+    """کاری که فایل اکسل خروجی آن filename است (کار job_id درخواست یا هر کار دیگر)"""
+    requested = request.args.get('job_id')
+    jobs = [job_manager.get(requested)] if requested else reversed(job_manager.list())
+    for job in jobs:
+        if job is not None and job.output_file and os.path.basename(job.output_file) == filename:
+            return job
+    return None
+
+def send_export(artifact):
+    """
+    ارسال جریانی فایل خروجی با ETag و پشتیبانی از Range (دانلود ادامه‌دار)
+
+    Args:
+        artifact (ExportArtifact): فایل آماده ارسال
+
+    Returns:
+        Response: پاسخ Flask
+    """
+    response = send_file(artifact.path, mimetype=artifact.mimetype, as_attachment=True,
+                         download_name=artifact.download_name, etag=artifact.etag, conditional=True)
+    if artifact.encoding:
+        response.headers['Content-Encoding'] = artifact.encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def wants_gzip():
+    """فشرده‌سازی پاسخ وقتی مرورگر gzip را می‌پذیرد و با gzip=0 غیرفعال نشده باشد"""
+    return request.args.get('gzip', '1') != '0' and 'gzip' in request.accept_encodings
+
+def export_job(job, export_format):
+    """پاسخ دانلود خروجی کش شده یک کار"""
+    store_prefix = STORE_PREFIXES.get(job.store_type, "almeera")
+    # فایل پیش از آزاد شدن قفل کار باز می‌شود تا خروجی جدیدتر آن را پیش از ارسال حذف نکند
+    response = export_cache.send(job, export_format, send_export, compress=wants_gzip(),
+                                 download_prefix=f"shelfie_{store_prefix}_products")
+    if response is None:
+        return jsonify({'status': 'error', 'message': 'هیچ محصولی برای دانلود وجود ندارد'}), 404
+    return response
+
 @app.route('/download/<filename>')
 def download_file(filename):
-    """دانلود فایل اکسل"""
+    """دانلود فایل اکسل خروجی یک کار (فقط فایل‌های خروجی کارها قابل دانلود هستند)"""
     try:
-        return send_file(filename, as_attachment=True)
+        job = find_output_job(filename)
+        if job is None or not os.path.isfile(job.output_file):
+            return jsonify({'status': 'error', 'message': 'فایل یافت نشد'}), 404
+        return send_file(os.path.abspath(job.output_file), as_attachment=True, conditional=True)
     except Exception as e:
         logger.error(f"خطا در دانلود فایل: {e}")
         return jsonify({'status': 'error', 'message': f'خطا در دانلود فایل: {str(e)}'})
 
 @app.route('/download_csv')
 def download_csv():
-    """تبدیل به CSV و دانلود"""
+    """دانلود CSV کش شده کار"""
     try:
-        if not state.products:
+        job = get_requested_job()
+        if job is None or not job.products:
             return jsonify({'status': 'error', 'message': 'هیچ محصولی برای دانلود وجود ندارد'})
-        
-        df = pd.DataFrame(state.products)
-        csv_filename = f"shelfie_products_export_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
-        csv_path = os.path.join(app.config['UPLOAD_FOLDER'], csv_filename)
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        
-        return send_file(csv_path, as_attachment=True)
+        return export_job(job, 'csv')
     except Exception as e:
         logger.error(f"خطا در تبدیل به CSV: {e}")
         return jsonify({'status': 'error', 'message': f'خطا در تبدیل به CSV: {str(e)}'})
 
+@app.route('/jobs/<job_id>/export/<export_format>')
+def download_job_export(job_id, export_format):
+    """دانلود خروجی کش شده یک کار (csv، ndjson یا xlsx)"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'کار یافت نشد'}), 404
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'فرمت پشتیبانی نمی‌شود: {export_format}'}), 404
+    try:
+        return export_job(job, export_format)
+    except Exception as e:
+        logger.error(f"خطا در ساخت فایل خروجی: {e}")
+        return jsonify({'status': 'error', 'message': f'خطا در ساخت فایل خروجی: {str(e)}'}), 500
+
 @app.route('/clear_logs', methods=['POST'])
 def clear_logs():
     """پاک کردن لاگ‌ها"""
-    state.log_messages = []
+    job = get_requested_job()
+    if job is not None:
+        job.clear_logs()
     return jsonify({'status': 'success'})
 
-def run_scraper(url, max_pages=None, categories=None, store_type="Lulu Hypermarket"):
-    """اجرای اسکرپر در thread جداگانه"""
-    try:
-        # تنظیم وضعیت اولیه
-        state.scraper_running = True
-        state.progress = 0
-        state.products = []
-        state.current_page = 0
-        state.log_messages = []
-        state.output_file = None
-        state.show_notification = False
-        
-        # اضافه کردن لاگ‌های شروع
-        logger.info("شروع فرآیند استخراج محصولات...")
-        state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - شروع فرآیند استخراج محصولات...")
-        
-        logger.info(f"فروشگاه: {store_type}")
-        state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - فروشگاه: {store_type}")
-        
-        logger.info(f"URL استخراج: {url}")
-        state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - URL استخراج: {url}")
-        
-        if max_pages:
-            logger.info(f"تعداد صفحات برای استخراج: {max_pages}")
-            state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - تعداد صفحات برای استخراج: {max_pages}")
-        else:
-            logger.info("استخراج تمام صفحات موجود")
-            state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - استخراج تمام صفحات موجود")
-        
-        # اگر چندین دسته‌بندی انتخاب شده باشد
-        if categories and len(categories) > 0:
-            all_products = []
-            state.total_pages = 0
-            
-            for i, category in enumerate(categories):
-                logger.info(f"شروع استخراج دسته‌بندی {i+1} از {len(categories)}: {category}")
-                state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - شروع استخراج دسته‌بندی {i+1} از {len(categories)}: {category}")
-                
-                if store_type == "Lulu Hypermarket":
-                    category_url = f"{url}/{category}"
-                    scraper = LuluMultiPageScraper(category_url, max_pages)
-                elif store_type == "Spinneys":
-                    category_base_url = "https://www.spinneys.com/en-ae/catalogue/category"
-                    category_url = f"{category_base_url}/{category}"
-                    scraper = SpinneysMultiPageScraper(category_url, max_pages)
-                elif store_type == "Union Coop":
-                    category_base_url = "https://www.unioncoop.ae/frozen-food-sea-food-butter-ice-cream.html"
-                    category_url = f"{category_base_url}/{category}"
-                    scraper = UnionCoopMultiPageScraper(category_url, max_pages)
-                else:  # Almeera
-                    category_base_url = "https://almeera.online"
-                    category_url = f"{category_base_url}/{category}"
-                    scraper = AlmeeraMultiPageScraper(category_url, max_pages)
-                
-                # Monkey patching برای نمایش پیشرفت
-                original_scrape_page = scraper.scrape_page
-                def scrape_page_with_progress(driver, page_url):
-                    state.current_page += 1
-                    state.progress = min(95, int((state.current_page / state.total_pages) * 100))
-                    log_msg = f"استخراج صفحه {state.current_page} از {state.total_pages}"
-                    state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - {log_msg}")
-                    return original_scrape_page(driver, page_url)
-                scraper.scrape_page = scrape_page_with_progress
-                
-                # Monkey patching برای دریافت تعداد صفحات
-                original_get_total_pages = scraper.get_total_products_and_pages
-                def get_total_pages_with_update(driver):
-                    total_pages = original_get_total_pages(driver)
-                    state.total_pages += total_pages
-                    log_msg = f"تعداد کل صفحات: {state.total_pages}"
-                    state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - {log_msg}")
-                    return total_pages
-                scraper.get_total_products_and_pages = get_total_pages_with_update
-                
-                scraper.scrape_all_pages()
-                all_products.extend(scraper.products)
-                
-                if i < len(categories) - 1:
-                    import time
-                    time.sleep(5)
-            
-            # ذخیره همه محصولات در یک فایل
-            if all_products:
-                df = pd.DataFrame(all_products)
-                try:
-                    current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                    store_prefix = "lulu" if store_type == "Lulu Hypermarket" else ("spinneys" if store_type == "Spinneys" else ("unioncoop" if store_type == "Union Coop" else "almeera"))
-                    filename = f"shelfie_{store_prefix}_multi_category_{current_datetime}.xlsx"
-                    
-                    # ذخیره به اکسل
-                    writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-                    df.to_excel(writer, index=False, sheet_name='Products')
-                    
-                    # تنظیم عرض ستون‌ها
-                    workbook = writer.book
-                    worksheet = writer.sheets['Products']
-                    for i, col in enumerate(df.columns):
-                        column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                        worksheet.set_column(i, i, column_width)
-                    
-                    writer.close()
-                    
-                    state.output_file = filename
-                    log_msg = f"تمام محصولات در فایل {filename} ذخیره شدند"
-                    logger.info(log_msg)
-                    state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - {log_msg}")
-                    
-                    # نمایش اعلان موفقیت
-                    state.notification_message = f"فایل اکسل با موفقیت ذخیره شد: {filename}"
-                    state.show_notification = True
-                    
-                except Exception as e:
-                    error_msg = f"خطا در ذخیره فایل: {e}"
-                    logger.error(error_msg)
-                    state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - خطا: {error_msg}")
-            
-            state.products = all_products
-            state.progress = 100
-            
+def create_scraper(job, url, sink=None, checkpoint=None):
+    """
+    ساخت اسکرپر مناسب فروشگاه کار
+
+    Args:
+        job (ScrapeJob): کار استخراج
+        url (str): آدرس دسته‌بندی
+        sink (SinkGroup, optional): مقصد نوشتن جریانی محصولات هر صفحه
+        checkpoint (JobCheckpoint, optional): checkpoint کار برای ذخیره و بازیابی صفحات کامل شده
+
+    Returns:
+        اسکرپر فروشگاه
+    """
+    if job.store_type == "Lulu Hypermarket":
+        scraper_class = LuluMultiPageScraper
+    elif job.store_type == "Spinneys":
+        scraper_class = SpinneysMultiPageScraper
+    elif job.store_type == "Union Coop":
+        scraper_class = UnionCoopMultiPageScraper
+    else:  # Almeera
+        scraper_class = AlmeeraMultiPageScraper
+
+    kwargs = {'sink': sink, 'checkpoint': checkpoint.for_url(url) if checkpoint is not None else None}
+    if job.store_type in DEFAULT_HTTP_STORES and job.store_type in HTTP_CAPABLE_STORES:
+        # استخراج بدون مرورگر با fallback خودکار به Selenium
+        kwargs['http_engine'] = http_engine
+
+    return scraper_class(url, job.max_pages, driver_pool=driver_pool, workers=job.workers,
+                         cancel_event=job.cancel_event, **kwargs)
+
+def attach_progress(job, scraper, accumulate_pages):
+    """
+    اتصال گزارش پیشرفت کار به اسکرپر
+
+    Args:
+        job (ScrapeJob): کار استخراج
+        scraper: اسکرپر فروشگاه
+        accumulate_pages (bool): در حالت چند دسته‌بندی تعداد صفحات همه دسته‌ها جمع می‌شود
+    """
+    # Monkey patching برای نمایش پیشرفت
+    original_scrape_page = scraper.scrape_page
+    def scrape_page_with_progress(driver, page_url):
+        # صفحاتی که پس از لغو کار باقی مانده‌اند بارگذاری نمی‌شوند
+        if job.cancelled:
+            return []
+        with job.lock:
+            job.current_page += 1
+            job.progress = min(95, int((job.current_page / max(job.total_pages, 1)) * 100))
+            job.log(f"استخراج صفحه {job.current_page} از {job.total_pages}")
+        return original_scrape_page(driver, page_url)
+    scraper.scrape_page = scrape_page_with_progress
+
+    # Monkey patching برای دریافت تعداد صفحات
+    original_get_total_pages = scraper.get_total_products_and_pages
+    def get_total_pages_with_update(driver):
+        total_pages = original_get_total_pages(driver)
+        if accumulate_pages:
+            job.total_pages += total_pages
         else:
-            # استخراج از یک URL
-            if store_type == "Lulu Hypermarket":
-                scraper = LuluMultiPageScraper(url, max_pages)
-            elif store_type == "Spinneys":
-                scraper = SpinneysMultiPageScraper(url, max_pages)
-            elif store_type == "Union Coop":
-                scraper = UnionCoopMultiPageScraper(url, max_pages)
-            else:  # Almeera
-                scraper = AlmeeraMultiPageScraper(url, max_pages)
-            
-            # Monkey patching برای نمایش پیشرفت
-            original_scrape_page = scraper.scrape_page
-            def scrape_page_with_progress(driver, page_url):
-                state.current_page += 1
-                state.progress = min(95, int((state.current_page / state.total_pages) * 100))
-                log_msg = f"استخراج صفحه {state.current_page} از {state.total_pages}"
-                state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - {log_msg}")
-                return original_scrape_page(driver, page_url)
-            scraper.scrape_page = scrape_page_with_progress
-            
-            # Monkey patching برای دریافت تعداد صفحات
-            original_get_total_pages = scraper.get_total_products_and_pages
-            def get_total_pages_with_update(driver):
-                total_pages = original_get_total_pages(driver)
-                state.total_pages = total_pages
-                log_msg = f"تعداد کل صفحات: {state.total_pages}"
-                state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - {log_msg}")
-                return total_pages
-            scraper.get_total_products_and_pages = get_total_pages_with_update
-            
-            scraper.scrape_all_pages()
-            state.products = scraper.products
-            
-            # ذخیره نتایج در اکسل
-            output_file = scraper.save_to_excel()
-            state.output_file = output_file
-            
-            # نمایش اعلان موفقیت
-            if output_file:
-                state.notification_message = f"فایل اکسل با موفقیت ذخیره شد: {output_file}"
-                state.show_notification = True
-            
-            state.progress = 100
-        
-        log_msg = f"استخراج با موفقیت به پایان رسید. تعداد محصولات استخراج شده: {len(state.products)}"
-        logger.info(log_msg)
-        state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - {log_msg}")
-        
-    except Exception as e:
-        error_msg = f"خطا در استخراج محصولات: {e}"
-        logger.error(error_msg)
-        logger.error(traceback.format_exc())
-        state.log_messages.append(f"{datetime.now().strftime('%H:%M:%S')} - خطا: {error_msg}")
+            job.total_pages = total_pages
+        job.log(f"تعداد کل صفحات: {job.total_pages}")
+        return total_pages
+    scraper.get_total_products_and_pages = get_total_pages_with_update
+
+    # صفحات بازیابی شده از checkpoint هم در پیشرفت کار شمرده می‌شوند
+    original_restore_checkpoint = scraper._restore_checkpoint
+    def restore_checkpoint_with_progress(total_pages):
+        done_pages = original_restore_checkpoint(total_pages)
+        if done_pages:
+            with job.lock:
+                job.current_page += len(done_pages)
+            job.log(f"{len(done_pages)} صفحه کامل شده از checkpoint بازیابی شد و دوباره دریافت نمی‌شود")
+        return done_pages
+    scraper._restore_checkpoint = restore_checkpoint_with_progress
+
+def open_stream_sink(job):
+    """
+    ساخت فایل‌های CSV و NDJSON کار (و در صورت فعال بودن، sink پایگاه داده محصولات) که
+    محصولات هر صفحه به محض استخراج به آن‌ها اضافه می‌شوند
+
+    Args:
+        job (ScrapeJob): کار استخراج
+
+    Returns:
+        SinkGroup: مقصد نوشتن جریانی محصولات کار
+    """
+    store_prefix = STORE_PREFIXES.get(job.store_type, "almeera")
+    base_path = os.path.join(app.config['UPLOAD_FOLDER'], f"shelfie_{store_prefix}_{job.id}_stream")
+    sinks = [CsvSink(f"{base_path}.csv"), NdjsonSink(f"{base_path}.ndjson")]
+    product_store = get_product_store()
+    if product_store is not None:
+        # در حالت چند دسته‌بندی، دسته‌بندی هر محصول از آدرس صفحه آن خوانده می‌شود
+        category = None if job.categories else category_from_url(job.url)
+        sinks.append(ProductStoreSink(product_store, store_prefix, category=category, job_id=job.id))
+    return SinkGroup(sinks)
+
+def open_checkpoint(job):
+    """
+    باز کردن checkpoint کار و ذخیره پارامترهای آن
+
+    Args:
+        job (ScrapeJob): کار استخراج
+
+    Returns:
+        JobCheckpoint: checkpoint کار، یا None اگر غیرفعال باشد یا ذخیره آن ممکن نباشد
+    """
+    if checkpoint_root() is None:
+        return None
+    checkpoint = JobCheckpoint(job.checkpoint_id)
+    try:
+        checkpoint.save_params({key: getattr(job, key) for key in CHECKPOINT_JOB_PARAMS})
+    except OSError as e:
+        job.log(f"خطا: ذخیره checkpoint کار ممکن نشد: {e}", logging.ERROR)
+        return None
+    if job.checkpoint_id != job.id:
+        job.log(f"ادامه کار از checkpoint {job.checkpoint_id}")
+    return checkpoint
+
+def finish_checkpoint(job, checkpoint):
+    """حذف checkpoint کاری که همه دسته‌بندی‌هایش بدون لغو یا خطا تمام شده‌اند، وگرنه نگه داشتن آن برای ادامه"""
+    if job.cancelled or not checkpoint.is_complete():
+        missing_count = sum(len(pages) for pages in checkpoint.missing_pages().values())
+        if missing_count:
+            job.log(f"{missing_count} صفحه استخراج نشده باقی ماند")
+        job.log(f"checkpoint کار نگه داشته شد؛ برای ادامه: POST /jobs/{job.id}/resume")
+        return
+    checkpoint.remove()
+
+def run_scraper(job):
+    """اجرای یک کار استخراج در thread جداگانه"""
+    stream_sink = open_stream_sink(job)
+    # کارهای ناموفق checkpoint خود را نگه می‌دارند تا قابل ادامه باشند
+    checkpoint = open_checkpoint(job)
+    try:
+        new_products = scrape_job(job, stream_sink, checkpoint)
+        export_dataset(job, new_products)
+        if checkpoint is not None:
+            finish_checkpoint(job, checkpoint)
     finally:
-        state.scraper_running = False
+        stream_files = stream_sink.close()
+        if stream_files:
+            job.log(f"خروجی جریانی محصولات: {', '.join(stream_files)}")
+
+def export_dataset(job, products):
+    """
+    افزودن محصولات کار به دیتاست Parquet (طرح یکسان، پارتیشن‌بندی بر اساس فروشگاه و تاریخ)
+
+    Args:
+        job (ScrapeJob): کار استخراج
+        products (list): محصولات استخراج شده در همین اجرا (بدون صفحات بازیابی شده از checkpoint)
+    """
+    if not products:
+        return
+    try:
+        dataset_root = export_products(products, STORE_PREFIXES.get(job.store_type, "almeera"),
+                                       scraped_at=job.started_at or job.created_at, basename=job.id)
+        if dataset_root:
+            job.log(f"محصولات به دیتاست Parquet در {dataset_root} اضافه شدند")
+    except Exception as e:
+        job.log(f"خطا: خطا در ذخیره دیتاست Parquet: {e}", logging.ERROR)
+
+def scrape_job(job, stream_sink, checkpoint=None):
+    """
+    استخراج محصولات یک کار (یک URL یا چند دسته‌بندی) و ذخیره فایل اکسل
+
+    Args:
+        job (ScrapeJob): کار استخراج
+        stream_sink (SinkGroup): مقصد نوشتن جریانی محصولات هر صفحه
+        checkpoint (JobCheckpoint, optional): checkpoint کار برای ذخیره و بازیابی صفحات کامل شده
+
+    Returns:
+        list: محصولاتی که در همین اجرا استخراج شده‌اند (صفحات بازیابی شده از checkpoint در اجرای قبلی ذخیره شده‌اند)
+    """
+    job.log("شروع فرآیند استخراج محصولات...")
+    job.log(f"فروشگاه: {job.store_type}")
+    job.log(f"URL استخراج: {job.url}")
+
+    if job.max_pages:
+        job.log(f"تعداد صفحات برای استخراج: {job.max_pages}")
+    else:
+        job.log("استخراج تمام صفحات موجود")
+
+    # اگر چندین دسته‌بندی انتخاب شده باشد
+    new_products = []
+    if job.categories:
+        all_products = []
+        job.total_pages = 0
+
+        for i, category in enumerate(job.categories):
+            if job.cancelled:
+                break
+
+            job.log(f"شروع استخراج دسته‌بندی {i+1} از {len(job.categories)}: {category}")
+
+            category_base_url = CATEGORY_BASE_URLS.get(job.store_type, job.url)
+            scraper = create_scraper(job, f"{category_base_url}/{category}", sink=stream_sink, checkpoint=checkpoint)
+            attach_progress(job, scraper, accumulate_pages=True)
+
+            scraper.scrape_all_pages()
+            all_products.extend(scraper.products)
+            new_products.extend(scraper.products[scraper.restored_product_count:])
+            job.products = all_products
+
+            if i < len(job.categories) - 1:
+                job.cancel_event.wait(5)
+
+        # ذخیره همه محصولات در یک فایل
+        if all_products:
+            try:
+                current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+                store_prefix = STORE_PREFIXES.get(job.store_type, "almeera")
+                filename = f"shelfie_{store_prefix}_multi_category_{current_datetime}.xlsx"
+
+                # ذخیره به اکسل (ردیف به ردیف در حالت constant_memory)
+                write_products(filename, all_products)
+
+                job.output_file = filename
+                job.log(f"تمام محصولات در فایل {filename} ذخیره شدند")
+
+                # نمایش اعلان موفقیت
+                job.notification_message = f"فایل اکسل با موفقیت ذخیره شد: {filename}"
+                job.show_notification = True
+
+            except Exception as e:
+                job.log(f"خطا: خطا در ذخیره فایل: {e}", logging.ERROR)
+
+        job.products = all_products
+
+    else:
+        # استخراج از یک URL
+        scraper = create_scraper(job, job.url, sink=stream_sink, checkpoint=checkpoint)
+        attach_progress(job, scraper, accumulate_pages=False)
+
+        scraper.scrape_all_pages()
+        job.products = scraper.products
+        new_products = scraper.products[scraper.restored_product_count:]
+
+        # ذخیره نتایج در اکسل
+        output_file = scraper.save_to_excel()
+        job.output_file = output_file
+
+        # نمایش اعلان موفقیت
+        if output_file:
+            job.notification_message = f"فایل اکسل با موفقیت ذخیره شد: {output_file}"
+            job.show_notification = True
+
+    if job.cancelled:
+        job.log(f"استخراج لغو شد. تعداد محصولات استخراج شده تا لحظه لغو: {len(job.products)}")
+        return new_products
+
+    job.progress = 100
+    job.log(f"استخراج با موفقیت به پایان رسید. تعداد محصولات استخراج شده: {len(job.products)}")
+    return new_products
+
+def discard_job_files(job):
+    """حذف فایل‌های خروجی کش شده کاری که از لیست کارها حذف شده است"""
+    export_cache.remove(job.id)
+
+# مدیر کارهای استخراج با سقف همزمانی سراسری
+job_manager = JobManager(run_scraper, max_concurrent=DEFAULT_MAX_CONCURRENT_JOBS, on_discard=discard_job_files)
+
+_driver_pool_warm_lock = threading.Lock()
+_driver_pool_warmed = False
+
+def warm_driver_pool():
+    """گرم کردن مخزن درایورها در پس‌زمینه تا اولین استخراج منتظر راه‌اندازی مرورگر نماند (فقط یک بار)"""
+    global _driver_pool_warmed
+    with _driver_pool_warm_lock:
+        if _driver_pool_warmed or not DEFAULT_WARM_POOL:
+            return
+        _driver_pool_warmed = True
+    thread = threading.Thread(target=driver_pool.warm)
+    thread.daemon = True
+    thread.start()
+
+@app.before_request
+def warm_driver_pool_on_first_request():
+    """گرم کردن مخزن با اولین درخواست (flask run یا سرور WSGI)؛ import ماژول هیچ مرورگری راه‌اندازی نمی‌کند"""
+    if not _driver_pool_warmed:
+        warm_driver_pool()
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    # در حالت debug فقط پردازش فرزند reloader (که درخواست‌ها را پاسخ می‌دهد) مخزن را هنگام راه‌اندازی گرم می‌کند
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_driver_pool()
+    app.run(debug=True)
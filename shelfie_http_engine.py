@@ -0,0 +1,88 @@
+"""
+Shelfie - موتور دریافت صفحات بدون Selenium
+برای فروشگاه‌هایی که محصولات در HTML اولیه صفحه وجود دارند (Spinneys و Almeera)،
+صفحات با یک requests.Session مشترک (keep-alive و استفاده مجدد از اتصال‌ها) دریافت
+می‌شوند و دیگر نیازی به اجرای کامل Chrome، اسکرول و انتظار نیست.
+"""
+
+import logging
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# فروشگاه‌هایی که اسکرپر آن‌ها پارامتر http_engine و fallback به Selenium را پشتیبانی می‌کند
+HTTP_CAPABLE_STORES = ('Spinneys', 'Almeera')
+
+# فروشگاه‌هایی که به صورت پیش‌فرض با موتور HTTP استخراج می‌شوند (قابل تنظیم با متغیر محیطی)
+DEFAULT_HTTP_STORES = [
+    store.strip() for store in os.environ.get('SHELFIE_HTTP_STORES', 'Spinneys,Almeera').split(',') if store.strip()
+]
+
+# هدرهای پیش‌فرض مشابه مرورگر برای جلوگیری از مسدود شدن
+DEFAULT_HEADERS = {
+    'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
+    'Accept': "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    'Accept-Language': "en-US,en;q=0.9",
+    'Connection': "keep-alive"
+}
+
+
+class HttpFetchEngine:
+    """
+    دریافت صفحات HTML با یک Session مشترک و مخزن اتصال‌ها
+    """
+
+    def __init__(self, pool_size=10, timeout=20, retries=2, headers=None):
+        """
+        مقداردهی اولیه موتور
+
+        Args:
+            pool_size (int): حداکثر تعداد اتصال‌های باز برای هر host
+            timeout (int): حداکثر زمان انتظار برای هر درخواست (ثانیه)
+            retries (int): تعداد تلاش مجدد برای خطاهای موقت سرور
+            headers (dict, optional): هدرهای اضافی درخواست‌ها
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"]
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self.requests_made = 0
+
+    def fetch(self, url):
+        """
+        دریافت متن HTML یک صفحه
+
+        Args:
+            url (str): آدرس صفحه
+
+        Returns:
+            str: متن HTML صفحه
+        """
+        start_time = time.time()
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        with self._lock:
+            self.requests_made += 1
+        logger.info(f"صفحه {url} با HTTP در {time.time() - start_time:.2f} ثانیه دریافت شد ({len(response.content)} بایت)")
+        return response.text
+
+    def close(self):
+        """بستن همه اتصال‌های Session"""
+        self.session.close()
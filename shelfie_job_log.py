@@ -0,0 +1,149 @@
+"""
+Shelfie - لاگ محدود هر کار با شماره ترتیب
+فقط آخرین لاگ‌های هر کار در یک بافر حلقوی درون حافظه نگه داشته می‌شوند و هر لاگ یک شماره
+ترتیب صعودی دارد که cursor پاسخ‌های /status و جریان رویدادها است. لاگ‌های قدیمی‌تر به صورت
+دسته‌ای به یک فایل gzip روی دیسک اضافه می‌شوند، بنابراین حافظه مصرفی در اجراهای طولانی ثابت
+می‌ماند و لاگ کامل کار همچنان قابل خواندن است.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+from collections import deque
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# حداکثر تعداد لاگ‌های هر کار در حافظه
+DEFAULT_LOG_BUFFER_SIZE = int(os.environ.get('SHELFIE_JOB_LOG_BUFFER', 1000))
+
+# پوشه فایل‌های gzip لاگ‌های قدیمی کارها (خالی برای دور ریختن لاگ‌های قدیمی)
+DEFAULT_LOG_DIR = os.environ.get('SHELFIE_JOB_LOG_DIR', 'job_logs')
+
+
+class JobLog:
+    """
+    بافر حلقوی لاگ‌های یک کار با انتقال لاگ‌های قدیمی به فایل gzip
+    (امن برای استفاده همزمان از چند thread)
+    """
+
+    def __init__(self, spill_path=None, capacity=DEFAULT_LOG_BUFFER_SIZE):
+        """
+        مقداردهی اولیه
+
+        Args:
+            spill_path (str, optional): فایل gzip لاگ‌های قدیمی. اگر None باشد، لاگ‌های قدیمی دور ریخته می‌شوند
+            capacity (int): حداکثر تعداد لاگ‌های نگه داشته شده در حافظه
+        """
+        self.spill_path = spill_path
+        self.capacity = max(1, int(capacity))
+        # لاگ‌ها به صورت دسته‌ای (یک چهارم ظرفیت) منتقل می‌شوند تا فایل برای هر خط باز نشود
+        self._spill_batch = max(1, self.capacity // 4)
+        self._entries = deque()
+        self._next_sequence = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self):
+        """شماره ترتیب لاگ بعدی (تعداد کل لاگ‌های ثبت شده)"""
+        return self._next_sequence
+
+    def append(self, line):
+        """
+        افزودن یک لاگ
+
+        Args:
+            line (str): متن لاگ
+
+        Returns:
+            int: شماره ترتیب لاگ
+        """
+        with self._lock:
+            sequence = self._next_sequence
+            self._entries.append((sequence, line))
+            self._next_sequence += 1
+            if len(self._entries) > self.capacity:
+                self._spill(min(len(self._entries), self._spill_batch + len(self._entries) - self.capacity))
+        return sequence
+
+    def since(self, cursor):
+        """
+        لاگ‌های درون حافظه با شماره ترتیب بزرگ‌تر یا مساوی cursor
+
+        Args:
+            cursor (int): cursor دریافت شده در پاسخ قبلی
+
+        Returns:
+            tuple: (لیست لاگ‌ها، cursor جدید)
+        """
+        with self._lock:
+            if not self._entries or cursor >= self._next_sequence:
+                return [], self._next_sequence
+            start = max(0, cursor - self._entries[0][0])
+            return [line for _, line in islice(self._entries, start, None)], self._next_sequence
+
+    def tail(self, limit):
+        """آخرین limit لاگ درون حافظه"""
+        if not limit:
+            return []
+        with self._lock:
+            start = max(0, len(self._entries) - limit)
+            return [self._entries[index][1] for index in range(start, len(self._entries))]
+
+    def clear(self):
+        """خالی کردن بافر (لاگ‌ها به فایل منتقل می‌شوند و شماره‌های ترتیب ادامه پیدا می‌کنند)"""
+        with self._lock:
+            self._spill(len(self._entries))
+
+    def remove(self):
+        """خالی کردن بافر و حذف فایل gzip لاگ‌های قدیمی (هنگام حذف کار)"""
+        with self._lock:
+            self._entries.clear()
+            if self.spill_path and os.path.exists(self.spill_path):
+                try:
+                    os.remove(self.spill_path)
+                except OSError as e:
+                    logger.warning(f"حذف فایل لاگ {self.spill_path} ممکن نشد: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lines(self):
+        """
+        همه لاگ‌های کار به ترتیب (ابتدا فایل gzip و سپس بافر)
+
+        Yields:
+            str: متن هر لاگ
+        """
+        with self._lock:
+            buffered = list(self._entries)
+            spill_path = self.spill_path if self.spill_path and os.path.exists(self.spill_path) else None
+        # لاگ‌هایی که پس از گرفتن نسخه بافر به فایل منتقل شده‌اند دو بار برگردانده نمی‌شوند
+        first_buffered = buffered[0][0] if buffered else None
+        if spill_path:
+            with gzip.open(spill_path, 'rt', encoding='utf-8') as spill_file:
+                for entry in spill_file:
+                    sequence, line = entry.rstrip('\n').split('\t', 1)
+                    if first_buffered is not None and int(sequence) >= first_buffered:
+                        break
+                    yield json.loads(line)
+        for _, line in buffered:
+            yield line
+
+    def _spill(self, count):
+        """انتقال count لاگ قدیمی به فایل gzip (هر دسته یک عضو gzip جداگانه به انتهای فایل اضافه می‌کند)"""
+        entries = [self._entries.popleft() for _ in range(min(count, len(self._entries)))]
+        if not entries or not self.spill_path:
+            return
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.spill_path, 'at', encoding='utf-8') as spill_file:
+                for sequence, line in entries:
+                    # متن لاگ به صورت رشته JSON نوشته می‌شود تا خطوط چندسطری و \ بدون تغییر برگردند
+                    spill_file.write(f"{sequence}\t{json.dumps(line, ensure_ascii=False)}\n")
+        except OSError as e:
+            logger.warning(f"انتقال لاگ‌ها به فایل {self.spill_path} ممکن نشد: {e}")
@@ -0,0 +1,305 @@
+"""
+Shelfie - مدیریت کارهای استخراج
+هر کار (job) شناسه، پیشرفت، لاگ‌ها و فایل خروجی مخصوص به خود را دارد و چند کار
+با رعایت یک سقف همزمانی سراسری به صورت موازی اجرا می‌شوند.
+"""
+
+import logging
+import os
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from shelfie_job_log import DEFAULT_LOG_DIR, JobLog
+
+logger = logging.getLogger(__name__)
+
+# حداکثر تعداد کارهای همزمان (قابل تنظیم با متغیر محیطی)
+DEFAULT_MAX_CONCURRENT_JOBS = int(os.environ.get('SHELFIE_MAX_CONCURRENT_JOBS', 2))
+
+# تعداد کارهای تمام شده‌ای که در حافظه نگه داشته می‌شوند؛ کارهای قدیمی‌تر همراه با فایل‌هایشان حذف می‌شوند
+DEFAULT_MAX_FINISHED_JOBS = int(os.environ.get('SHELFIE_MAX_FINISHED_JOBS', 50))
+
+# وضعیت‌های ممکن یک کار
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class ScrapeJob:
+    """
+    وضعیت یک کار استخراج
+    """
+
+    def __init__(self, store_type, url, max_pages=None, categories=None, workers=1, checkpoint_id=None):
+        """
+        مقداردهی اولیه کار
+
+        Args:
+            store_type (str): نام فروشگاه
+            url (str): آدرس دسته‌بندی یا آدرس پایه
+            max_pages (int, optional): حداکثر تعداد صفحات
+            categories (list, optional): لیست دسته‌بندی‌ها در حالت چند دسته‌بندی
+            workers (int): تعداد مرورگرهای همزمان
+            checkpoint_id (str, optional): شناسه checkpoint کار قطع شده‌ای که این کار ادامه می‌دهد
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.store_type = store_type
+        self.url = url
+        self.max_pages = max_pages
+        self.categories = categories or []
+        self.workers = workers
+        # صفحات کامل شده در پوشه checkpoint این شناسه ذخیره می‌شوند (کارهای ادامه شده شناسه کار اصلی را دارند)
+        self.checkpoint_id = checkpoint_id or self.id
+
+        self.status = JOB_QUEUED
+        self.progress = 0
+        self.total_pages = 0
+        self.current_page = 0
+        self.products = []
+        # آخرین لاگ‌ها در حافظه و لاگ‌های قدیمی‌تر در فایل gzip
+        self.logs = JobLog(os.path.join(DEFAULT_LOG_DIR, f"{self.id}.log.gz") if DEFAULT_LOG_DIR else None)
+        self.output_file = None
+        self.notification_message = ""
+        self.show_notification = False
+        self.error = None
+
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+        self.cancel_event = threading.Event()
+        # قفل برای به‌روزرسانی پیشرفت از چند worker همزمان
+        self.lock = threading.Lock()
+        # بیدار کردن جریان‌های رویداد (SSE) هنگام ثبت لاگ یا تغییر وضعیت
+        self._updated = threading.Condition()
+
+    @property
+    def scraper_running(self):
+        return self.status == JOB_RUNNING
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def log(self, message, level=logging.INFO):
+        """ثبت یک پیام در لاگ سراسری و لاگ مخصوص این کار"""
+        logger.log(level, f"[{self.id}] {message}")
+        self.logs.append(f"{datetime.now().strftime('%H:%M:%S')} - {message}")
+        self.notify_update()
+
+    def notify_update(self):
+        """اطلاع دادن تغییر وضعیت یا لاگ‌ها به جریان‌های رویداد منتظر"""
+        with self._updated:
+            self._updated.notify_all()
+
+    def wait_for_update(self, timeout):
+        """انتظار برای لاگ یا تغییر وضعیت بعدی (حداکثر timeout ثانیه)"""
+        with self._updated:
+            self._updated.wait(timeout)
+
+    @property
+    def log_cursor(self):
+        """cursor لاگ بعدی (تعداد کل لاگ‌های ثبت شده)"""
+        return self.logs.cursor
+
+    def logs_since(self, cursor):
+        """
+        لاگ‌های ثبت شده پس از یک cursor
+
+        Args:
+            cursor (int): cursor دریافت شده در پاسخ قبلی (0 برای همه لاگ‌ها)
+
+        Returns:
+            tuple: (لیست لاگ‌های جدید، cursor جدید)
+        """
+        return self.logs.since(cursor)
+
+    def clear_logs(self):
+        """پاک کردن لاگ‌های کار بدون بی‌اعتبار کردن cursorهای داده شده"""
+        self.logs.clear()
+
+    def discard(self):
+        """آزاد کردن محصولات و حذف فایل لاگ کاری که از لیست کارها حذف شده است"""
+        self.products = []
+        self.logs.remove()
+
+    def to_dict(self, log_limit=50, since=None):
+        """
+        تبدیل وضعیت کار به دیکشنری قابل ارسال به صورت JSON
+
+        Args:
+            log_limit (int): تعداد آخرین لاگ‌ها برای ارسال
+            since (int, optional): فقط لاگ‌های پس از این cursor ارسال شوند (log_limit نادیده گرفته می‌شود)
+
+        Returns:
+            dict: وضعیت کار
+        """
+        if since is not None:
+            logs, log_cursor = self.logs_since(since)
+        else:
+            logs = self.logs.tail(log_limit)
+            log_cursor = self.log_cursor
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'store_type': self.store_type,
+            'url': self.url,
+            'max_pages': self.max_pages,
+            'categories': self.categories,
+            'workers': self.workers,
+            'checkpoint_id': self.checkpoint_id,
+            'scraper_running': self.scraper_running,
+            'progress': self.progress,
+            'total_pages': self.total_pages,
+            'current_page': self.current_page,
+            'product_count': len(self.products),
+            'logs': logs,
+            'log_cursor': log_cursor,
+            'output_file': self.output_file,
+            'notification_message': self.notification_message,
+            'show_notification': self.show_notification,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobManager:
+    """
+    اجرای کارهای استخراج در threadهای جداگانه با سقف همزمانی سراسری
+    """
+
+    def __init__(self, runner, max_concurrent=DEFAULT_MAX_CONCURRENT_JOBS, max_finished=DEFAULT_MAX_FINISHED_JOBS,
+                 on_discard=None):
+        """
+        مقداردهی اولیه مدیر کارها
+
+        Args:
+            runner (callable): تابع اجرای یک کار با امضای (job)
+            max_concurrent (int): حداکثر تعداد کارهای در حال اجرا به صورت همزمان
+            max_finished (int): تعداد کارهای تمام شده‌ای که نگه داشته می‌شوند (قدیمی‌ترها حذف می‌شوند)
+            on_discard (callable, optional): تابعی با امضای (job) برای حذف فایل‌های کار حذف شده
+        """
+        self.runner = runner
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_finished = max(0, int(max_finished))
+        self.on_discard = on_discard
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_concurrent)
+        # حذف کارهای قدیمی به ترتیب انجام می‌شود، حتی وقتی چند کار همزمان تمام شوند
+        self._discard_lock = threading.Lock()
+
+    def create_job(self, store_type, url, max_pages=None, categories=None, workers=1, checkpoint_id=None):
+        """
+        ساخت یک کار جدید و قرار دادن آن در صف اجرا
+
+        Returns:
+            ScrapeJob: کار ساخته شده
+        """
+        job = ScrapeJob(store_type, url, max_pages, categories, workers, checkpoint_id)
+        with self._lock:
+            self.jobs[job.id] = job
+
+        thread = threading.Thread(target=self._run, args=(job,))
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def _run(self, job):
+        """انتظار برای یک جایگاه خالی و اجرای کار"""
+        job.log(f"کار در صف اجرا قرار گرفت (حداکثر {self.max_concurrent} کار همزمان)")
+        self._slots.acquire()
+        try:
+            if job.cancelled:
+                job.status = JOB_CANCELLED
+                job.finished_at = datetime.now()
+                job.log("کار پیش از شروع لغو شد")
+                job.notify_update()
+                return
+
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now()
+            job.notify_update()
+            try:
+                self.runner(job)
+                job.status = JOB_CANCELLED if job.cancelled else JOB_COMPLETED
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+                job.log(f"خطا: خطا در استخراج محصولات: {e}", logging.ERROR)
+                logger.error(traceback.format_exc())
+            finally:
+                job.finished_at = datetime.now()
+                if job.status == JOB_CANCELLED:
+                    job.log("کار لغو شد")
+                job.notify_update()
+        finally:
+            self._slots.release()
+            self._discard_old_jobs()
+
+    def _discard_old_jobs(self):
+        """حذف قدیمی‌ترین کارهای تمام شده بیش از max_finished همراه با لاگ‌ها و فایل‌های آن‌ها"""
+        with self._discard_lock:
+            with self._lock:
+                finished = [job for job in self.jobs.values() if job.status in FINISHED_STATUSES]
+                discarded = finished[:max(0, len(finished) - self.max_finished)]
+                for job in discarded:
+                    del self.jobs[job.id]
+
+            for job in discarded:
+                logger.info(f"کار {job.id} از لیست کارها حذف شد")
+                try:
+                    job.discard()
+                    if self.on_discard is not None:
+                        self.on_discard(job)
+                except Exception as e:
+                    logger.warning(f"حذف فایل‌های کار {job.id} ممکن نشد: {e}")
+
+    def get(self, job_id):
+        """یافتن کار با شناسه"""
+        return self.jobs.get(job_id)
+
+    def list(self):
+        """لیست همه کارها به ترتیب ایجاد"""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def latest(self):
+        """آخرین کار ساخته شده"""
+        with self._lock:
+            if not self.jobs:
+                return None
+            return next(reversed(self.jobs.values()))
+
+    def active_job_for_checkpoint(self, checkpoint_id):
+        """کار در صف یا در حال اجرایی که از این checkpoint استفاده می‌کند (None اگر وجود نداشته باشد)"""
+        for job in self.list():
+            if job.checkpoint_id == checkpoint_id and job.status not in FINISHED_STATUSES:
+                return job
+        return None
+
+    def running_count(self):
+        """تعداد کارهای در حال اجرا"""
+        return sum(1 for job in self.list() if job.status == JOB_RUNNING)
+
+    def cancel(self, job_id):
+        """
+        درخواست لغو یک کار
+
+        Returns:
+            bool: True اگر کار وجود داشته باشد و هنوز تمام نشده باشد
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return False
+        job.cancel_event.set()
+        job.log("درخواست لغو کار ثبت شد")
+        return True
@@ -0,0 +1,39 @@
+"""
+Shelfie - استخراج محصولات با یک فراخوانی JavaScript
+به جای ده‌ها فراخوانی find_element و get_attribute برای هر محصول (هر کدام یک رفت و
+برگشت HTTP به WebDriver)، همه فیلدهای محصولات صفحه با یک execute_script به صورت
+JSON جمع‌آوری می‌شوند و سپس توسط توابع پاکسازی هر فروشگاه پردازش می‌شوند.
+"""
+
+import logging
+import os
+import time
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# فعال بودن استخراج با JavaScript به صورت پیش‌فرض (0 برای بازگشت به روش find_element)
+DEFAULT_JS_EXTRACTION = os.environ.get('SHELFIE_JS_EXTRACTION', '1') != '0'
+
+
+def run_extraction_script(driver, script, *args):
+    """
+    اجرای اسکریپت استخراج در صفحه
+
+    Args:
+        driver: WebDriver سلنیوم
+        script (str): اسکریپت JavaScript که لیست یا دیکشنری قابل تبدیل به JSON برمی‌گرداند
+        *args: آرگومان‌های اسکریپت (در دسترس با arguments[i])
+
+    Returns:
+        نتیجه اسکریپت یا None در صورت خطا
+    """
+    start_time = time.time()
+    try:
+        result = driver.execute_script(script, *args)
+    except WebDriverException as e:
+        logger.warning(f"خطا در اجرای اسکریپت استخراج: {e}")
+        return None
+
+    logger.info(f"اسکریپت استخراج در {time.time() - start_time:.2f} ثانیه اجرا شد")
+    return result
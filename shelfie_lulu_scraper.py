@@ -4,21 +4,28 @@ Shelfie - استخراج‌کننده اطلاعات محصولات از وب‌
 """
 
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import json
 import time
 import re
 import random
 import logging
 import math
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException
 from datetime import datetime
 import argparse
+import bisect
+from shelfie_concurrent import scrape_pages_concurrently
+from shelfie_driver_pool import create_driver
+from shelfie_checkpoint import ScrapeCheckpoint
+from shelfie_waits import wait_for_dom_stable
+from shelfie_parsing import compile_selector, parse_html
+from shelfie_page_yield import PageYieldExpectations
+from shelfie_units import parse_quantity
+from shelfie_postprocess import normalize_products
+from shelfie_sinks import write_products
 
 # تنظیم لاگینگ
 logging.basicConfig(
@@ -31,18 +38,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# سلکتورهای صفحه محصولات، یک بار در زمان import کامپایل می‌شوند
+PRODUCT_SELECTOR = compile_selector("div.mb-2.flex.max-w-full.flex-col")
+PRODUCT_LINK_SELECTOR = compile_selector("a[data-testid*='-']")
+PRODUCT_PRICE_SELECTOR = compile_selector("span[data-testid='product-price']")
+FALLBACK_CONTAINER_SELECTOR = compile_selector(".product-item, [class*='product-card']")
+FALLBACK_NAME_SELECTOR = compile_selector("a[class*='name'], a[class*='title'], h3, h4")
+FALLBACK_PRICE_SELECTOR = compile_selector("span[class*='price'], div[class*='price']")
+
+# خواندن state هیدراته Next.js بدون انتظار برای رندر صفحه
+NEXT_DATA_SCRIPT = """
+var el = document.getElementById('__NEXT_DATA__');
+if (el) { return el.textContent; }
+return window.__NEXT_DATA__ ? JSON.stringify(window.__NEXT_DATA__) : null;
+"""
+
+# کلیدهای احتمالی فیلدهای محصول در JSON صفحه
+JSON_NAME_KEYS = ('name', 'productName', 'product_name', 'title')
+JSON_PRICE_KEYS = ('price', 'finalPrice', 'sellingPrice', 'salePrice', 'offerPrice', 'prices', 'priceValue')
+JSON_PRICE_VALUE_KEYS = ('formattedValue', 'formatted', 'formattedPrice', 'value', 'amount', 'price', 'final', 'finalPrice', 'sellingPrice')
+JSON_URL_KEYS = ('url', 'href', 'link', 'canonicalUrl', 'seoUrl', 'urlKey', 'slug')
+JSON_TOTAL_PAGES_KEYS = ('totalPages', 'total_pages', 'pageCount', 'numberOfPages', 'lastPage')
+
 class ShelfieScraper:
     """
     کلاس اصلی برای استخراج اطلاعات محصولات از وب‌سایت‌ها
     """
-    def __init__(self, base_url, max_pages=None):
+    def __init__(self, base_url, max_pages=None, driver_pool=None, workers=1, cancel_event=None, html_parser=None,
+                 use_embedded_json=True, sink=None, checkpoint=None):
         self.base_url = base_url.rstrip("/")  # حذف اسلش از انتهای URL در صورت وجود
-        self.products = []
+        self.raw_products = []  # فیلدهای خام محصولات در طول استخراج
+        self.products = []  # محصولات پس‌پردازش شده پس از پایان استخراج
         self.total_pages = 1
         self.max_pages = max_pages  # تعداد صفحات تعیین شده توسط کاربر
+        self.driver_pool = driver_pool  # مخزن مشترک درایورها (اختیاری)
+        self.workers = workers  # تعداد مرورگرهای همزمان برای استخراج صفحات
+        self.cancel_event = cancel_event  # رویداد لغو استخراج (اختیاری)
+        self.html_parser = html_parser  # پارسر HTML (None یعنی سریع‌ترین پارسر نصب شده)
+        self.use_embedded_json = use_embedded_json  # خواندن محصولات از JSON هیدراته صفحه (__NEXT_DATA__)
+        self.sink = sink  # نوشتن جریانی محصولات هر صفحه به محض استخراج (اختیاری)
+        self.checkpoint = checkpoint  # ذخیره محصولات هر صفحه برای ادامه استخراج قطع شده (اختیاری)
+        self.restored_product_count = 0  # تعداد محصولات خام ابتدای raw_products که از checkpoint خوانده شده‌اند
+        self.page_yield = PageYieldExpectations(min_products=5)  # انتظار تعداد محصولات هر صفحه برای جستجوی عمیق
         
     def get_total_products_and_pages(self, driver):
         """استخراج تعداد کل محصولات و محاسبه تعداد صفحات"""
+        if self.use_embedded_json:
+            total_pages = self._total_pages_from_next_data(self._read_next_data(driver))
+            if total_pages:
+                self.total_pages = total_pages
+                if self.max_pages is not None:
+                    self.total_pages = min(self.total_pages, self.max_pages)
+                logger.info(f"تعداد کل صفحات از JSON صفحه: {self.total_pages}")
+                return self.total_pages
+        
         try:
             # روش 1: تلاش برای یافتن تعداد کل محصولات از متن صفحه
             page_text = driver.page_source
@@ -175,7 +224,8 @@ class ShelfieScraper:
                     if last_page_buttons and last_page_buttons[-1].is_displayed() and last_page_buttons[-1].is_enabled():
                         try:
                             last_page_buttons[-1].click()
-                            time.sleep(2)  # صبر برای بارگذاری صفحه جدید
+                            # صبر برای بارگذاری صفحه جدید
+                            wait_for_dom_stable(driver, "div.mb-2.flex.max-w-full.flex-col", budget=5, scroll=False)
                             page_count += 1
                             
                             # دوباره دکمه صفحه بعد را پیدا می‌کنیم
@@ -188,7 +238,7 @@ class ShelfieScraper:
                 
                 # برگشت به صفحه اول
                 driver.get(f"{self.base_url}/?page=1")
-                time.sleep(2)
+                wait_for_dom_stable(driver, "div.mb-2.flex.max-w-full.flex-col", budget=5, scroll=False)
                 
                 # تخمین تعداد کل محصولات بر اساس تعداد صفحات شمارش شده
                 # با فرض اینکه صفحه آخر هم مشابه صفحات دیگر محصول دارد
@@ -229,119 +279,45 @@ class ShelfieScraper:
         """استخراج محصولات از یک صفحه خاص"""
         try:
             logger.info(f"استخراج محصولات از صفحه: {page_url}")
+            page_num = self._page_number(page_url)
             
             # بارگذاری صفحه
             driver.get(page_url)
             
-            # انتظار برای بارگذاری محصولات
-            try:
-                WebDriverWait(driver, 20).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.mb-2.flex.max-w-full.flex-col, a[data-testid*='-']"))
-                )
-            except TimeoutException:
-                logger.warning(f"بارگذاری محصولات در صفحه {page_url} با تایم‌اوت مواجه شد")
-            
-            # اسکرول به پایین برای بارگذاری همه محصولات
-            total_height = driver.execute_script("return document.body.scrollHeight")
-            for i in range(1, 10):  # اسکرول تا 10 بار برای بارگذاری محتوای بیشتر
-                driver.execute_script(f"window.scrollTo(0, {i * total_height / 10});")
-                time.sleep(0.5)
-            
-            # صبر کنید تا همه محصولات بارگذاری شوند
-            time.sleep(2)
+            # مسیر سریع: خواندن محصولات از JSON هیدراته صفحه بدون انتظار و اسکرول
+            if self.use_embedded_json:
+                page_products = self._extract_products_from_next_data(self._read_next_data(driver), page_url)
+                if page_products:
+                    logger.info(f"تعداد کل محصولات استخراج شده از JSON صفحه {page_url}: {len(page_products)}")
+                    self.page_yield.record(page_num, len(page_products))
+                    return page_products
+                logger.info("محصولی در JSON صفحه یافت نشد، استفاده از سلکتورهای DOM...")
+            
+            # انتظار برای بارگذاری محصولات: اسکرول تدریجی تا پایدار شدن تعداد محصولات و DOM
+            product_count = wait_for_dom_stable(
+                driver, "div.mb-2.flex.max-w-full.flex-col, a[data-testid*='-']",
+                cancel_event=self.cancel_event
+            )
+            if product_count == 0:
+                logger.warning(f"محصولی در صفحه {page_url} بارگذاری نشد")
             
             # استخراج HTML صفحه
             html_content = driver.page_source
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # یافتن همه محصولات با الگوی مشخص شده در format.txt
-            product_elements = soup.select("div.mb-2.flex.max-w-full.flex-col")
-            
-            page_products = []
-            
-            logger.info(f"تعداد محصولات یافت شده در صفحه: {len(product_elements)}")
-            
-            # اگر محصولی با الگوی اصلی پیدا نشد، از الگوی جایگزین استفاده کنید
-            if not product_elements:
-                logger.info("الگوی اصلی محصولات یافت نشد، استفاده از الگوی جایگزین...")
-                product_containers = soup.select(".product-item, [class*='product-card']")
-                
-                for container in product_containers:
-                    try:
-                        # استخراج نام محصول
-                        product_name_elem = container.select_one("a[class*='name'], a[class*='title'], h3, h4")
-                        if not product_name_elem:
-                            continue
-                            
-                        product_name = product_name_elem.text.strip()
-                        product_url = product_name_elem.get('href', '')
-                        if product_url and not product_url.startswith('http'):
-                            product_url = 'https://gcc.luluhypermarket.com' + product_url
-                        
-                        # استخراج قیمت
-                        price_elem = container.select_one("span[class*='price'], div[class*='price']")
-                        price = price_elem.text.strip() if price_elem else "N/A"
-                        
-                        # استخراج وزن از نام محصول
-                        weight_match = re.search(r'\b\d+\s*(?:g|kg|ml|l|pcs)\b', product_name, re.IGNORECASE)
-                        weight = weight_match.group(0) if weight_match else "N/A"
-                        
-                        # اضافه کردن به لیست محصولات صفحه
-                        page_products.append({
-                            'product': self._clean_product_name(product_name),
-                            'brand': self._extract_brand(product_name),
-                            'price': price,
-                            'weight': weight,
-                            'website': 'luluhypermarket.com',
-                            'url': product_url,
-                            'page': page_url
-                        })
-                        
-                        logger.info(f"محصول استخراج شد: {product_name} - {price}")
-                    except Exception as e:
-                        logger.error(f"خطا در استخراج محصول با الگوی جایگزین: {e}")
-            else:
-                # استخراج محصولات با الگوی اصلی
-                for product_elem in product_elements:
-                    try:
-                        # استخراج نام محصول (دقیقاً مطابق با فرمت)
-                        product_link = product_elem.select_one("a[data-testid*='-']")
-                        if not product_link:
-                            continue
-                            
-                        product_name = product_link.text.strip()
-                        product_url = product_link.get('href', '')
-                        if product_url and not product_url.startswith('http'):
-                            product_url = 'https://gcc.luluhypermarket.com' + product_url
-                        
-                        # استخراج قیمت
-                        price_elem = product_elem.select_one("span[data-testid='product-price']")
-                        price = price_elem.text.strip() if price_elem else "N/A"
-                        
-                        # استخراج وزن از نام محصول
-                        weight_match = re.search(r'\b\d+\s*(?:g|kg|ml|l|pcs)\b', product_name, re.IGNORECASE)
-                        weight = weight_match.group(0) if weight_match else "N/A"
-                        
-                        # اضافه کردن به لیست محصولات صفحه
-                        page_products.append({
-                            'product': self._clean_product_name(product_name),
-                            'brand': self._extract_brand(product_name),
-                            'price': price,
-                            'weight': weight,
-                            'website': 'luluhypermarket.com',
-                            'url': product_url,
-                            'page': page_url
-                        })
-                        
-                        logger.info(f"محصول استخراج شد: {product_name} - {price}")
-                    except Exception as e:
-                        logger.error(f"خطا در استخراج محصول با الگوی اصلی: {e}")
-            
-            # در صورتی که تعداد محصولات کم باشد، سعی کنید با جستجوی عمیق‌تر
-            if len(page_products) < 5:
-                logger.info("تعداد محصولات کم است، جستجوی عمیق‌تر برای یافتن محصولات...")
-                deep_search_products = self._deep_search_products(driver, page_url)
+            page_products = self._extract_products_from_html(html_content, page_url)
+            
+            # فقط اگر صفحه کمتر از انتظار محصول داشته باشد، جستجوی عمیق‌تر انجام می‌شود
+            # (صفحه آخر کوتاه‌تر است و جستجوی عمیق را فعال نمی‌کند)
+            if self.page_yield.is_under_extracted(page_num, len(page_products)):
+                logger.info(f"تعداد محصولات کمتر از انتظار است ({len(page_products)} از "
+                            f"{self.page_yield.expected(page_num):g})، جستجوی عمیق‌تر برای یافتن محصولات...")
+                deep_search_products = self.page_yield.run_fallback(
+                    'deep_search', page_url, self._deep_search_products, html_content, page_url
+                )
                 page_products.extend(deep_search_products)
+                if not page_products:
+                    self.page_yield.mark_empty(page_num)
+            else:
+                self.page_yield.record(page_num, len(page_products))
             
             logger.info(f"تعداد کل محصولات استخراج شده از صفحه {page_url}: {len(page_products)}")
             
@@ -351,22 +327,204 @@ class ShelfieScraper:
             logger.error(f"خطا در استخراج محصولات از صفحه {page_url}: {e}")
             return []
     
+    def _read_next_data(self, driver):
+        """خواندن و پارس JSON هیدراته Next.js از صفحه فعلی (None در صورت نبود)"""
+        try:
+            raw_json = driver.execute_script(NEXT_DATA_SCRIPT)
+        except Exception as e:
+            logger.warning(f"خطا در خواندن __NEXT_DATA__: {e}")
+            return None
+        
+        if not raw_json:
+            return None
+        try:
+            return json.loads(raw_json)
+        except ValueError as e:
+            logger.warning(f"JSON صفحه قابل پارس نیست: {e}")
+            return None
+    
+    def _extract_products_from_next_data(self, next_data, page_url):
+        """استخراج محصولات از JSON هیدراته صفحه (بزرگترین لیست اشیاء شبیه محصول)"""
+        if not next_data:
+            return []
+        
+        product_list = []
+        # پیمایش غیربازگشتی کل JSON
+        stack = [next_data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                candidates = [item for item in node if self._is_json_product(item)]
+                if len(candidates) > len(product_list):
+                    product_list = candidates
+                stack.extend(node)
+        
+        page_products = []
+        seen = set()
+        for item in product_list:
+            product_name = str(self._first_json_value(item, JSON_NAME_KEYS)).strip()
+            if not product_name or product_name in seen:
+                continue
+            seen.add(product_name)
+            
+            price = self._json_price(self._first_json_value(item, JSON_PRICE_KEYS))
+            
+            product_url = self._first_json_value(item, JSON_URL_KEYS) or ''
+            if not isinstance(product_url, str):
+                product_url = ''
+            if product_url and not product_url.startswith('http'):
+                product_url = 'https://gcc.luluhypermarket.com' + ('' if product_url.startswith('/') else '/') + product_url
+            
+            # برند از JSON در صورت وجود (در غیر این صورت در postprocess از نام محصول)
+            brand = item.get('brand') or item.get('brandName')
+            if isinstance(brand, dict):
+                brand = brand.get('name')
+            
+            page_products.append({
+                'name': product_name,
+                'brand': brand if isinstance(brand, str) else None,
+                'price': price,
+                'url': product_url,
+                'page': page_url
+            })
+        
+        return page_products
+    
+    def _total_pages_from_next_data(self, next_data):
+        """یافتن تعداد کل صفحات در JSON صفحه (None در صورت نبود)"""
+        if not next_data:
+            return None
+        
+        stack = [next_data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for key in JSON_TOTAL_PAGES_KEYS:
+                    value = node.get(key)
+                    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+                        return value
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+        return None
+    
+    def _is_json_product(self, item):
+        """بررسی اینکه آیا یک شیء JSON شبیه محصول است (نام و قیمت دارد)"""
+        if not isinstance(item, dict):
+            return False
+        name = self._first_json_value(item, JSON_NAME_KEYS)
+        if not isinstance(name, str) or not name.strip():
+            return False
+        return any(item.get(key) not in (None, '', [], {}) for key in JSON_PRICE_KEYS)
+    
+    def _first_json_value(self, item, keys):
+        """اولین مقدار غیرخالی از بین کلیدهای داده شده"""
+        for key in keys:
+            value = item.get(key)
+            if value not in (None, '', [], {}):
+                return value
+        return None
+    
+    def _json_price(self, value):
+        """تبدیل قیمت JSON (عدد، رشته، دیکشنری یا لیست) به متن قیمت"""
+        for _ in range(4):
+            if isinstance(value, list):
+                value = value[0] if value else None
+            elif isinstance(value, dict):
+                currency = value.get('currency') or value.get('currencyIso') or value.get('currencyCode') or ''
+                inner = self._first_json_value(value, JSON_PRICE_VALUE_KEYS)
+                if isinstance(inner, (int, float)) and not isinstance(inner, bool):
+                    return f"{currency} {inner:.2f}".strip()
+                value = inner
+            else:
+                break
+        
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f"{value:.2f}"
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+        return "N/A"
+    
+    def _extract_products_from_html(self, html_content, page_url):
+        """استخراج محصولات از HTML صفحه با سلکتورهای از پیش کامپایل شده"""
+        soup = parse_html(html_content, self.html_parser)
+        
+        # یافتن همه محصولات با الگوی مشخص شده در format.txt
+        product_elements = PRODUCT_SELECTOR.select(soup)
+        
+        page_products = []
+        
+        logger.info(f"تعداد محصولات یافت شده در صفحه: {len(product_elements)}")
+        
+        # اگر محصولی با الگوی اصلی پیدا نشد، از الگوی جایگزین استفاده کنید
+        if not product_elements:
+            logger.info("الگوی اصلی محصولات یافت نشد، استفاده از الگوی جایگزین...")
+            product_containers = FALLBACK_CONTAINER_SELECTOR.select(soup)
+            
+            for container in product_containers:
+                try:
+                    # استخراج نام محصول
+                    product_name_elem = FALLBACK_NAME_SELECTOR.select_one(container)
+                    if not product_name_elem:
+                        continue
+                        
+                    product_name = product_name_elem.text.strip()
+                    product_url = product_name_elem.get('href', '')
+                    if product_url and not product_url.startswith('http'):
+                        product_url = 'https://gcc.luluhypermarket.com' + product_url
+                    
+                    # استخراج قیمت
+                    price_elem = FALLBACK_PRICE_SELECTOR.select_one(container)
+                    price = price_elem.text.strip() if price_elem else "N/A"
+                    
+                    # اضافه کردن به لیست محصولات صفحه
+                    page_products.append({
+                        'name': product_name,
+                        'price': price,
+                        'url': product_url,
+                        'page': page_url
+                    })
+                    
+                    logger.info(f"محصول استخراج شد: {product_name} - {price}")
+                except Exception as e:
+                    logger.error(f"خطا در استخراج محصول با الگوی جایگزین: {e}")
+        else:
+            # استخراج محصولات با الگوی اصلی
+            for product_elem in product_elements:
+                try:
+                    # استخراج نام محصول (دقیقاً مطابق با فرمت)
+                    product_link = PRODUCT_LINK_SELECTOR.select_one(product_elem)
+                    if not product_link:
+                        continue
+                        
+                    product_name = product_link.text.strip()
+                    product_url = product_link.get('href', '')
+                    if product_url and not product_url.startswith('http'):
+                        product_url = 'https://gcc.luluhypermarket.com' + product_url
+                    
+                    # استخراج قیمت
+                    price_elem = PRODUCT_PRICE_SELECTOR.select_one(product_elem)
+                    price = price_elem.text.strip() if price_elem else "N/A"
+                    
+                    # اضافه کردن به لیست محصولات صفحه
+                    page_products.append({
+                        'name': product_name,
+                        'price': price,
+                        'url': product_url,
+                        'page': page_url
+                    })
+                    
+                    logger.info(f"محصول استخراج شد: {product_name} - {price}")
+                except Exception as e:
+                    logger.error(f"خطا در استخراج محصول با الگوی اصلی: {e}")
+        
+        return page_products
+    
     def scrape_all_pages(self):
         """استخراج محصولات از تمام صفحات"""
-        # تنظیم Selenium
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-notifications")
-        chrome_options.add_argument("--disable-infobars")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36")
-        
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        driver = self._acquire_driver()
         
         try:
             # ابتدا صفحه اول را بارگذاری می‌کنیم تا تعداد کل صفحات را مشخص کنیم
@@ -380,151 +538,234 @@ class ShelfieScraper:
             
             # استخراج تعداد کل صفحات
             total_pages = self.get_total_products_and_pages(driver)
-            
-            # استخراج محصولات از هر صفحه
-            for page_num in range(1, total_pages + 1):
-                page_url = f"{self.base_url}/?page={page_num}"
-                page_products = self.scrape_page(driver, page_url)
-                self.products.extend(page_products)
-                
-                # بررسی کنیم که آیا به انتهای محصولات رسیده‌ایم یا خیر
-                # اگر 3 صفحه متوالی محصولی نداشت، احتمالاً به انتها رسیده‌ایم
-                if not page_products and page_num > 3:
-                    if not self.scrape_page(driver, f"{self.base_url}/?page={page_num+1}") and \
-                       not self.scrape_page(driver, f"{self.base_url}/?page={page_num+2}"):
-                        logger.info(f"به نظر می‌رسد به انتهای محصولات در صفحه {page_num} رسیده‌ایم. استخراج متوقف می‌شود.")
+            self.page_yield.set_total_pages(total_pages)
+            
+            # صفحات کامل شده در اجرای قبلی از checkpoint خوانده و دوباره دریافت نمی‌شوند
+            done_pages = self._restore_checkpoint(total_pages)
+            
+            if self.workers > 1:
+                # حالت همزمان: تقسیم صفحات بین چند مرورگر و ادغام نتایج به ترتیب صفحه
+                pages = [(page_num, f"{self.base_url}/?page={page_num}") for page_num in range(1, total_pages + 1)
+                         if page_num not in done_pages]
+                scrape_pages_concurrently(
+                    self.scrape_page, pages, self.workers,
+                    driver=driver,
+                    driver_pool=self.driver_pool,
+                    driver_factory=self._acquire_driver,
+                    page_delay=(2, 5),
+                    on_page=lambda page_num, page_url, page_products: self._collect_page(page_products, page_num),
+                    cancel_event=self.cancel_event
+                )
+            else:
+                # استخراج محصولات از هر صفحه
+                for page_num in range(1, total_pages + 1):
+                    if page_num in done_pages:
+                        continue
+                    if self._is_cancelled():
+                        logger.info(f"استخراج به درخواست کاربر پیش از صفحه {page_num} متوقف شد")
                         break
+                    
+                    page_url = f"{self.base_url}/?page={page_num}"
+                    page_products = self.scrape_page(driver, page_url)
+                    self._collect_page(page_products, page_num)
                 
-                # اضافه کردن تاخیر بین صفحات برای جلوگیری از مسدود شدن
-                if page_num < total_pages:
-                    sleep_time = random.uniform(2, 5)
-                    logger.info(f"صبر کردن به مدت {sleep_time:.2f} ثانیه قبل از استخراج صفحه بعدی...")
-                    time.sleep(sleep_time)
-            
-            logger.info(f"استخراج تمام صفحات به پایان رسید. تعداد کل محصولات استخراج شده: {len(self.products)}")
+                    # بررسی کنیم که آیا به انتهای محصولات رسیده‌ایم یا خیر
+                    # اگر 3 صفحه متوالی محصولی نداشت، احتمالاً به انتها رسیده‌ایم
+                    if not page_products and page_num > 3:
+                        if not self.scrape_page(driver, f"{self.base_url}/?page={page_num+1}") and \
+                           not self.scrape_page(driver, f"{self.base_url}/?page={page_num+2}"):
+                            logger.info(f"به نظر می‌رسد به انتهای محصولات در صفحه {page_num} رسیده‌ایم. استخراج متوقف می‌شود.")
+                            break
+                
+                    # اضافه کردن تاخیر بین صفحات برای جلوگیری از مسدود شدن
+                    if page_num < total_pages:
+                        sleep_time = random.uniform(2, 5)
+                        logger.info(f"صبر کردن به مدت {sleep_time:.2f} ثانیه قبل از استخراج صفحه بعدی...")
+                        time.sleep(sleep_time)
+            
+            # صفحات خالی پس از استخراج کامل (مثلاً صفحات تخمینی اضافه) در اجرای بعدی دوباره دریافت نمی‌شوند
+            if self.checkpoint is not None and not self._is_cancelled():
+                self.checkpoint.finish()
+            logger.info(f"استخراج تمام صفحات به پایان رسید. تعداد کل محصولات استخراج شده: {len(self.raw_products)}")
+            self.page_yield.log_summary()
             
         except Exception as e:
             logger.error(f"خطا در استخراج تمام صفحات: {e}")
         
         finally:
-            driver.quit()
+            self._release_driver(driver)
+            self.postprocess()
     
-    def _extract_brand(self, product_name):
-        """استخراج برند از نام محصول"""
-        common_brands = ["Ashoka", "Al Kabeer", "Sadia", "Americana", "Khazan", "Nabil", "Birds Eye", 
-                         "McCain", "Farm Fresh", "Seara", "Mezban", "Almarai", "Haagen-Dazs", "Lurpak",
-                         "Al Ain", "Good Seoul", "LuLu", "Cucina", "Samho", "Quorn", "CJ", "Miratorg",
-                         "Al Areesh", "Haldiram", "Bibigo", "Daim", "Toblerone", "Al Islami", "Amul",
-                         "Eng Bee Tin", "Doux", "Tamoosh", "Beyond Meat", "Goodfella's", "Faani", "Al Karama",
-                         "Lean Cuisine", "New York Bakery"]
-        
-        for brand in common_brands:
-            if brand.lower() in product_name.lower():
-                return brand
+    def _page_number(self, page_url):
+        """شماره صفحه از پارامتر page آدرس"""
+        page_match = re.search(r'[?&]page=(\d+)', page_url)
+        return int(page_match.group(1)) if page_match else 1
+    
+    def _is_cancelled(self):
+        """بررسی درخواست لغو استخراج"""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def _acquire_driver(self):
+        """گرفتن درایور از مخزن مشترک یا راه‌اندازی یک درایور اختصاصی"""
+        if self.driver_pool is not None:
+            return self.driver_pool.acquire()
         
-        # اگر نام محصول با کلمه شروع می‌شود، احتمالاً برند است
-        parts = product_name.split()
-        if len(parts) > 1 and not re.search(r'\d', parts[0]):
-            return parts[0]
-            
-        return "N/A"
+        # درایور اختصاصی با همان تنظیمات مشترک مخزن
+        return create_driver()
+    
+    def _release_driver(self, driver):
+        """برگرداندن درایور به مخزن یا بستن درایور اختصاصی"""
+        if self.driver_pool is not None:
+            self.driver_pool.release(driver)
+        else:
+            driver.quit()
     
-    def _deep_search_products(self, driver, page_url):
-        """جستجوی عمیق‌تر برای یافتن محصولات بیشتر"""
+    def _deep_search_products(self, html_content, page_url):
+        """
+        جستجوی عمیق‌تر برای یافتن محصولات بیشتر روی HTML صفحه (به جای درخواست‌های WebDriver)
+        
+        سند یک بار به ترتیب پیمایش می‌شود و برای هر عنصر بازه موقعیت زیردرختش ثبت می‌شود؛
+        اولین قیمت بعد از عنصر (محور following) و اولین لینک داخل آن با جستجوی دودویی
+        روی موقعیت‌ها پیدا می‌شوند و محصولات تکراری با یک set کنار گذاشته می‌شوند.
+        """
         deep_products = []
         try:
-            # جستجو برای همه عناصری که ممکن است محصول باشند
-            product_elements = driver.find_elements(By.CSS_SELECTOR, "a[href*='/p/'], [class*='product'], [class*='item']")
+            soup = parse_html(html_content, self.html_parser)
             
-            for element in product_elements:
-                try:
-                    text = element.text.strip()
-                    if not text or len(text) < 5:
-                        continue
-                        
-                    # بررسی اینکه آیا این متن شبیه یک نام محصول است
-                    if re.search(r'\b\d+\s*(?:g|kg|ml|l|pcs)\b', text, re.IGNORECASE):
-                        # احتمالاً نام محصول است
-                        product_name = text
-                        
-                        try:
-                            price_element = element.find_element(By.XPATH, "./following::*[contains(@class, 'price') or contains(@data-testid, 'price')][1]")
-                            price = price_element.text.strip()
-                        except:
-                            price = "N/A"
-                            
-                        weight_match = re.search(r'\b\d+\s*(?:g|kg|ml|l|pcs)\b', product_name, re.IGNORECASE)
-                        weight = weight_match.group(0) if weight_match else "N/A"
-                        
-                        # تلاش برای یافتن URL محصول
-                        try:
-                            if element.tag_name == 'a':
-                                product_url = element.get_attribute('href')
-                            else:
-                                link = element.find_element(By.XPATH, "./ancestor::a[1] | ./descendant::a[1]")
-                                product_url = link.get_attribute('href')
-                        except:
-                            product_url = "N/A"
-                            
-                        # اگر این محصول قبلاً اضافه نشده، اضافه کن
-                        if not any(p['product'] == product_name for p in deep_products):
-                            deep_products.append({
-                                'product': self._clean_product_name(product_name),
-                                'brand': self._extract_brand(product_name),
-                                'price': price,
-                                'weight': weight,
-                                'website': 'luluhypermarket.com',
-                                'url': product_url,
-                                'page': page_url
-                            })
-                            
-                            logger.info(f"محصول جدید در جستجوی عمیق: {product_name} - {price}")
-                        
-                except Exception as e:
+            candidates = []
+            price_positions, price_elements = [], []
+            link_positions, link_elements = [], []
+            open_elements = []  # عناصر باز به همراه رکورد کاندید آنها
+            open_links = []
+            position = 0
+            
+            for tag in soup.descendants:
+                if tag.name is None:
+                    continue
+                # بستن عناصری که والد این عنصر نیستند (پایان زیردرخت آنها)
+                while open_elements and open_elements[-1][0] is not tag.parent:
+                    self._close_deep_search_element(open_elements.pop(), open_links, position)
+                
+                position += 1
+                candidate = None
+                if self._is_deep_search_candidate(tag):
+                    candidate = {
+                        'element': tag,
+                        'start': position,
+                        'end': position,
+                        'ancestor_link': open_links[-1] if open_links else None
+                    }
+                    candidates.append(candidate)
+                if tag.name == 'a':
+                    link_positions.append(position)
+                    link_elements.append(tag)
+                    open_links.append(tag)
+                if 'price' in ' '.join(tag.get('class', ())) or 'price' in tag.get('data-testid', ''):
+                    price_positions.append(position)
+                    price_elements.append(tag)
+                open_elements.append((tag, candidate))
+            
+            while open_elements:
+                self._close_deep_search_element(open_elements.pop(), open_links, position)
+            
+            seen_names = set()
+            for candidate in candidates:
+                element = candidate['element']
+                text = element.get_text(" ", strip=True)
+                if not text or len(text) < 5:
                     continue
+                
+                # بررسی اینکه آیا این متن شبیه یک نام محصول است
+                quantity = parse_quantity(text)
+                if not quantity or text in seen_names:
+                    continue
+                seen_names.add(text)
+                product_name = text
+                
+                # اولین عنصر قیمت بعد از پایان زیردرخت این عنصر
+                price_index = bisect.bisect_right(price_positions, candidate['end'])
+                price = price_elements[price_index].get_text(" ", strip=True) if price_index < len(price_elements) else "N/A"
+                
+                # URL محصول: خود لینک، نزدیک‌ترین لینک والد یا اولین لینک داخل عنصر
+                if element.name == 'a':
+                    link = element
+                elif candidate['ancestor_link'] is not None:
+                    link = candidate['ancestor_link']
+                else:
+                    link_index = bisect.bisect_right(link_positions, candidate['start'])
+                    link = None
+                    if link_index < len(link_positions) and link_positions[link_index] <= candidate['end']:
+                        link = link_elements[link_index]
+                product_url = link.get('href') if link is not None else None
+                if not product_url:
+                    product_url = "N/A"
+                elif not product_url.startswith('http'):
+                    product_url = 'https://gcc.luluhypermarket.com' + product_url
+                
+                deep_products.append({
+                    'name': product_name,
+                    'price': price,
+                    'url': product_url,
+                    'page': page_url
+                })
+                
+                logger.info(f"محصول جدید در جستجوی عمیق: {product_name} - {price}")
         except Exception as e:
             logger.error(f"خطا در جستجوی عمیق محصولات در صفحه {page_url}: {e}")
         
         return deep_products
     
-    def _clean_product_name(self, product_name):
-        """حذف برند و وزن از نام محصول"""
-        # حذف برند از ابتدای نام
-        brand = self._extract_brand(product_name)
-        if brand != "N/A":
-            # حذف برند از ابتدای نام محصول
-            clean_name = product_name.replace(brand, '', 1).strip()
-            # حذف کاراکترهای اضافی مثل - یا : بعد از حذف برند
-            clean_name = re.sub(r'^[\s\-:]+', '', clean_name)
-        else:
-            clean_name = product_name
-            
-        # حذف وزن و اندازه از انتهای نام
-        weight_pattern = r'\b\d+\s*(?:g|kg|ml|l|pcs|pieces|pack|x)\b.*$'
-        clean_name = re.sub(weight_pattern, '', clean_name, flags=re.IGNORECASE).strip()
-        
-        # حذف whitespace اضافی
-        clean_name = re.sub(r'\s+', ' ', clean_name).strip()
-        
-        return clean_name
+    def _is_deep_search_candidate(self, tag):
+        """معادل سلکتور a[href*='/p/'], [class*='product'], [class*='item']"""
+        if tag.name == 'a' and '/p/' in tag.get('href', ''):
+            return True
+        class_attr = ' '.join(tag.get('class', ()))
+        return 'product' in class_attr or 'item' in class_attr
+    
+    def _close_deep_search_element(self, open_element, open_links, position):
+        """ثبت پایان زیردرخت یک عنصر در جستجوی عمیق"""
+        tag, candidate = open_element
+        if candidate is not None:
+            candidate['end'] = position
+        if tag.name == 'a' and open_links and open_links[-1] is tag:
+            open_links.pop()
+    
+    def _collect_page(self, page_products, page_num=None):
+        """افزودن محصولات خام یک صفحه، نوشتن نسخه پس‌پردازش شده آن در sink و ذخیره صفحه در checkpoint (در صورت وجود)"""
+        self.raw_products.extend(page_products)
+        if self.sink is not None and page_products:
+            self.sink.write_rows(normalize_products(page_products, 'lulu').to_dict('records'))
+        if self.checkpoint is not None and page_num is not None:
+            self.checkpoint.record_page(page_num, page_products)
+    
+    def _restore_checkpoint(self, total_pages):
+        """افزودن محصولات صفحات ذخیره شده در checkpoint بدون دریافت دوباره و برگرداندن شماره آن صفحات"""
+        if self.checkpoint is None:
+            return set()
+        self.checkpoint.start(total_pages)
+        done_pages = self.checkpoint.done_pages(total_pages)
+        # صفحات بازیابی شده قبلاً در sinkهای اجرای قبلی نوشته شده‌اند و فقط به محصولات خام اضافه می‌شوند
+        for page_num in sorted(done_pages):
+            if self.checkpoint.is_done(page_num):
+                self.raw_products.extend(self.checkpoint.load_page(page_num))
+        self.restored_product_count = len(self.raw_products)
+        if done_pages:
+            logger.info(f"{len(done_pages)} صفحه از {total_pages} صفحه از checkpoint {self.checkpoint.path} بازیابی شد")
+        return done_pages
+    
+    def postprocess(self):
+        """یکسان‌سازی ستونی محصولات خام جمع‌آوری شده و قرار دادن نتیجه در self.products"""
+        self.products = normalize_products(self.raw_products, 'lulu').to_dict('records')
+        return self.products
     
     def save_to_excel(self):
-        """ذخیره داده‌ها در فایل اکسل"""
+        """ذخیره داده‌ها در فایل اکسل (ردیف به ردیف، بدون ساخت DataFrame)"""
         try:
-            df = pd.DataFrame(self.products)
             current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"shelfie_lulu_products_{current_datetime}.xlsx"
-            writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-            df.to_excel(writer, index=False, sheet_name='Products')
-            
-            # تنظیم عرض ستون‌ها
-            workbook = writer.book
-            worksheet = writer.sheets['Products']
-            for i, col in enumerate(df.columns):
-                column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, column_width)
-            
-            writer.close()
+            if not write_products(filename, self.products):
+                logger.warning("محصولی برای ذخیره در فایل اکسل وجود ندارد")
+                return None
             logger.info(f"داده‌ها در فایل {filename} ذخیره شدند")
             return filename
         except Exception as e:
@@ -539,6 +780,8 @@ if __name__ == "__main__":
                         help='آدرس URL دسته‌بندی محصولات برای استخراج')
     parser.add_argument('--pages', type=int, 
                         help='تعداد صفحاتی که می‌خواهید استخراج کنید (اختیاری، پیش‌فرض: همه صفحات)')
+    parser.add_argument('--checkpoint', type=str,
+                        help='پوشه checkpoint؛ اجرای دوباره با همان پوشه از اولین صفحه استخراج نشده ادامه می‌دهد (اختیاری)')
     
     # پارس کردن آرگومان‌ها
     args = parser.parse_args()
@@ -550,7 +793,8 @@ if __name__ == "__main__":
         logger.info(f"شروع استخراج تمام صفحات از {args.url}")
     
     # ایجاد اسکریپر با پارامترهای مشخص شده
-    scraper = ShelfieScraper(args.url, args.pages)
+    checkpoint = ScrapeCheckpoint(args.checkpoint, args.url) if args.checkpoint else None
+    scraper = ShelfieScraper(args.url, args.pages, checkpoint=checkpoint)
     scraper.scrape_all_pages()
     
     # ذخیره داده‌ها در فایل اکسل
@@ -0,0 +1,189 @@
+"""
+Shelfie - حافظه ماندگار نتایج پارس نام محصولات
+نتیجه پارس هر نام (نام تمیز، برند و وزن) با کلید فروشگاه و نام خام در یک فایل SQLite
+نگه داشته می‌شود تا اجراهای روزانه بعدی نام‌های تکراری را دوباره پارس نکنند. جلوی فایل یک
+LRU درون حافظه قرار دارد. نسخه قوانین پارس بخشی از کلید هر ردیف است، بنابراین تغییر فهرست
+برندها یا الگوی وزن کش را باطل می‌کند. ردیف‌های نسخه‌های دیگر فقط وقتی حذف می‌شوند که نسخه
+ثبت شده فایل عوض شود (یا با prune)، نه در هر بار باز شدن فایل.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# فایل پیش‌فرض کش (خالی یا 0 برای غیرفعال کردن)
+DEFAULT_NAME_CACHE_PATH = os.environ.get('SHELFIE_NAME_CACHE', 'shelfie_name_cache.sqlite')
+
+# حداکثر تعداد نام‌های نگه داشته شده در LRU درون حافظه
+DEFAULT_NAME_CACHE_SIZE = int(os.environ.get('SHELFIE_NAME_CACHE_SIZE', 100000))
+
+# حداکثر تعداد پارامترهای یک کوئری SQLite
+_QUERY_CHUNK_SIZE = 500
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class NameParseCache:
+    """
+    کش دو لایه (LRU درون حافظه و SQLite روی دیسک) برای نتایج پارس نام محصولات
+    (امن برای استفاده همزمان از چند thread)
+    """
+
+    def __init__(self, path, version, max_entries=DEFAULT_NAME_CACHE_SIZE):
+        """
+        باز کردن یا ساختن فایل کش
+
+        Args:
+            path (str): مسیر فایل SQLite
+            version (str): نسخه قوانین پارس؛ با تغییر آن ردیف‌های نسخه‌های دیگر حذف می‌شوند
+            max_entries (int): حداکثر تعداد نام‌های LRU درون حافظه
+        """
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._create_tables()
+            row = self._connection.execute("SELECT value FROM cache_meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != version:
+                # تغییر نسخه قوانین پارس: ردیف‌های نسخه‌های قبلی دیگر استفاده نمی‌شوند
+                self._prune()
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('version', ?)", (version,)
+                )
+
+    def _create_tables(self):
+        """ساخت جدول‌های کش (فایل‌های قدیمی که نسخه در کلیدشان نیست از نو ساخته می‌شوند)"""
+        columns = self._connection.execute("PRAGMA table_info(parsed_names)").fetchall()
+        if columns and not any(column[1] == 'version' and column[5] for column in columns):
+            logger.info("جدول کش نام‌ها با کلید قدیمی از نو ساخته می‌شود")
+            self._connection.execute("DROP TABLE parsed_names")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS parsed_names ("
+            "store TEXT NOT NULL, name TEXT NOT NULL, version TEXT NOT NULL, "
+            "product TEXT, brand TEXT, weight TEXT, PRIMARY KEY (store, name, version))"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _prune(self):
+        """حذف ردیف‌های نسخه‌های دیگر قوانین پارس (داخل تراکنش فراخوانی می‌شود)"""
+        stale = self._connection.execute("DELETE FROM parsed_names WHERE version != ?", (self.version,)).rowcount
+        if stale:
+            logger.info(f"{stale} نام با نسخه قدیمی قوانین پارس از کش حذف شد")
+        return stale
+
+    def prune(self):
+        """
+        حذف صریح ردیف‌های نسخه‌های دیگر قوانین پارس
+
+        Returns:
+            int: تعداد ردیف‌های حذف شده
+        """
+        with self._lock:
+            with self._connection:
+                return self._prune()
+
+    def get_many(self, store, names):
+        """
+        نتایج ذخیره شده برای نام‌های یک فروشگاه
+
+        Args:
+            store (str): نام فروشگاه
+            names (iterable): نام‌های خام (یکتا)
+
+        Returns:
+            dict: نام خام -> (نام تمیز، برند، وزن) برای نام‌هایی که در کش هستند
+        """
+        names = list(names)
+        found = {}
+        missing = []
+        with self._lock:
+            for name in names:
+                result = self._memory.get((store, name))
+                if result is None:
+                    missing.append(name)
+                else:
+                    self._memory.move_to_end((store, name))
+                    found[name] = result
+
+            for start in range(0, len(missing), _QUERY_CHUNK_SIZE):
+                chunk = missing[start:start + _QUERY_CHUNK_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT name, product, brand, weight FROM parsed_names "
+                    f"WHERE store = ? AND version = ? AND name IN ({','.join('?' * len(chunk))})",
+                    [store, self.version] + chunk
+                ).fetchall()
+                for name, product, brand, weight in rows:
+                    found[name] = (product, brand, weight)
+                    self._remember((store, name), (product, brand, weight))
+
+            self.hits += len(found)
+            self.misses += len(names) - len(found)
+        return found
+
+    def put_many(self, store, results):
+        """
+        ذخیره نتایج پارس نام‌های جدید یک فروشگاه در یک تراکنش
+
+        Args:
+            store (str): نام فروشگاه
+            results (dict): نام خام -> (نام تمیز، برند، وزن)
+        """
+        if not results:
+            return
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO parsed_names (store, name, version, product, brand, weight) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(store, name, self.version) + tuple(result) for name, result in results.items()]
+                )
+            for name, result in results.items():
+                self._remember((store, name), tuple(result))
+
+    def _remember(self, key, result):
+        """افزودن به LRU و بیرون انداختن قدیمی‌ترین نام‌ها"""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        """بستن فایل کش"""
+        with self._lock:
+            self._connection.close()
+
+
+def get_name_cache(version, path=None):
+    """
+    کش مشترک نتایج پارس نام‌ها (یک نمونه برای هر فایل و نسخه قوانین)
+
+    Args:
+        version (str): نسخه قوانین پارس
+        path (str, optional): مسیر فایل. اگر None باشد، مسیر پیش‌فرض استفاده می‌شود
+
+    Returns:
+        NameParseCache: کش آماده، یا None اگر کش غیرفعال باشد یا فایل باز نشود
+    """
+    path = DEFAULT_NAME_CACHE_PATH if path is None else path
+    if not path or path == '0':
+        return None
+    with _caches_lock:
+        cache = _caches.get((path, version))
+        if cache is None:
+            try:
+                cache = NameParseCache(path, version)
+            except sqlite3.Error as e:
+                logger.warning(f"کش نام‌ها باز نشد ({path}): {e}")
+                return None
+            _caches[(path, version)] = cache
+    return cache
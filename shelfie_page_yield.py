@@ -0,0 +1,134 @@
+"""
+Shelfie - انتظار تعداد محصولات هر صفحه برای کنترل fallback‌های پرهزینه
+fallback‌هایی مثل جستجوی عمیق Lulu یا استخراج JavaScript در Al Meera فقط وقتی اجرا
+می‌شوند که یک صفحه واقعاً کمتر از انتظار محصول داده باشد. انتظار از تعداد محصولات
+صفحات قبلی همان دسته‌بندی یاد گرفته می‌شود و صفحه آخر (که طبیعتاً کوتاه‌تر است) و صفحات
+بعد از انتهای واقعی دسته‌بندی جدا در نظر گرفته می‌شوند. هزینه هر اجرای fallback لاگ می‌شود.
+"""
+
+import logging
+import os
+import statistics
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# صفحه‌ای که کمتر از این نسبت از تعداد معمول محصولات را داشته باشد ناقص استخراج شده است
+DEFAULT_YIELD_RATIO = float(os.environ.get('SHELFIE_FALLBACK_YIELD_RATIO', 0.5))
+
+
+class PageYieldExpectations:
+    """
+    نگهداری تعداد محصولات صفحات یک دسته‌بندی و تصمیم‌گیری درباره اجرای fallback
+    (امن برای استفاده همزمان از چند thread)
+    """
+
+    def __init__(self, min_products=1, ratio=DEFAULT_YIELD_RATIO):
+        """
+        مقداردهی اولیه
+
+        Args:
+            min_products (int): حداقل محصولات مورد انتظار یک صفحه کامل پیش از یادگیری از صفحات قبلی
+            ratio (float): نسبتی از تعداد معمول محصولات که کمتر از آن صفحه ناقص حساب می‌شود
+        """
+        self.min_products = min_products
+        self.ratio = ratio
+        self.total_pages = None
+        self.total_products = None
+        # اولین صفحه‌ای که حتی پس از fallback خالی ماند؛ صفحات بعد از آن خالی انتظار می‌روند
+        self.first_empty_page = None
+        self._page_counts = {}
+        self._fallback_stats = {}
+        self._lock = threading.Lock()
+
+    def set_total_pages(self, total_pages, total_products=None):
+        """ثبت تعداد کل صفحات (و در صورت اطلاع، تعداد کل محصولات) دسته‌بندی"""
+        with self._lock:
+            self.total_pages = total_pages
+            self.total_products = total_products
+
+    def record(self, page_num, count):
+        """ثبت تعداد محصولات یک صفحه کامل برای یادگیری تعداد معمول محصولات هر صفحه"""
+        with self._lock:
+            self._page_counts[page_num] = count
+
+    def mark_empty(self, page_num):
+        """ثبت صفحه‌ای که پس از fallback هم محصولی نداشت (انتهای واقعی دسته‌بندی)"""
+        with self._lock:
+            if page_num > 1 and (self.first_empty_page is None or page_num < self.first_empty_page):
+                self.first_empty_page = page_num
+                logger.info(f"صفحه {page_num} خالی است، صفحات بعدی بدون fallback بررسی می‌شوند")
+
+    def products_per_page(self):
+        """تعداد معمول محصولات یک صفحه کامل از صفحات قبلی (None اگر هنوز صفحه‌ای ثبت نشده)"""
+        with self._lock:
+            counts = [count for page_num, count in self._page_counts.items()
+                      if count > 0 and page_num != self.total_pages]
+        return statistics.median(counts) if counts else None
+
+    def expected(self, page_num):
+        """
+        حداقل تعداد محصولات مورد انتظار یک صفحه
+
+        Args:
+            page_num (int): شماره صفحه
+
+        Returns:
+            float: تعداد مورد انتظار (0 یعنی صفحه می‌تواند خالی باشد)
+        """
+        if self.total_products == 0:
+            return 0
+        if self.first_empty_page is not None and page_num >= self.first_empty_page:
+            return 0
+
+        per_page = self.products_per_page()
+        if page_num == self.total_pages:
+            # صفحه آخر کوتاه‌تر است؛ فقط وقتی تعداد کل محصولات معلوم باشد باقیمانده دقیق است
+            if per_page and self.total_products:
+                return max(min(self.total_products - per_page * (self.total_pages - 1), per_page), 1)
+            return 1
+        return per_page if per_page else self.min_products
+
+    def is_under_extracted(self, page_num, count):
+        """آیا تعداد محصولات استخراج شده از صفحه کمتر از انتظار است"""
+        expected = self.expected(page_num)
+        if expected == 0:
+            return False
+        # پیش از یادگیری، حداقل ثابت فروشگاه بدون اعمال نسبت استفاده می‌شود
+        threshold = expected * self.ratio if self.products_per_page() else expected
+        return count < max(threshold, 1)
+
+    def run_fallback(self, name, page_url, fallback, *args):
+        """
+        اجرای یک fallback و لاگ کردن هزینه آن
+
+        Args:
+            name (str): نام fallback برای لاگ و آمار
+            page_url (str): آدرس صفحه
+            fallback (callable): تابع fallback که لیست محصولات برمی‌گرداند
+            *args: آرگومان‌های تابع
+
+        Returns:
+            list: خروجی fallback
+        """
+        start_time = time.time()
+        products = fallback(*args)
+        elapsed = time.time() - start_time
+
+        with self._lock:
+            stats = self._fallback_stats.setdefault(name, {'runs': 0, 'seconds': 0.0, 'products': 0})
+            stats['runs'] += 1
+            stats['seconds'] += elapsed
+            stats['products'] += len(products)
+
+        logger.info(f"fallback {name} برای صفحه {page_url}: {len(products)} محصول در {elapsed:.2f} ثانیه")
+        return products
+
+    def log_summary(self):
+        """لاگ کردن تعداد اجرا و هزینه کل هر fallback"""
+        with self._lock:
+            stats = dict(self._fallback_stats)
+        for name, item in stats.items():
+            logger.info(f"fallback {name}: {item['runs']} اجرا، {item['products']} محصول، "
+                        f"{item['seconds']:.2f} ثانیه در مجموع")
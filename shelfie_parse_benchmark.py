@@ -0,0 +1,148 @@
+"""
+Shelfie - بنچمارک زمان پارس صفحات ذخیره شده
+زمان ساخت درخت HTML و زمان کامل استخراج محصولات را برای هر پارسر نصب شده روی
+صفحات HTML ذخیره شده (مثلاً خروجی driver.page_source) اندازه‌گیری می‌کند. برای Al Meera و
+Spinneys مسیر تک‌عبوری داده‌های ساخت‌یافته هم زمان‌سنجی و خروجی آن با خروجی سلکتورها مقایسه می‌شود.
+
+مثال:
+    python shelfie_parse_benchmark.py --store lulu saved/lulu_page1.html saved/lulu_page2.html
+"""
+
+import argparse
+import logging
+import statistics
+import time
+from shelfie_parsing import available_parsers, parse_html
+from shelfie_postprocess import normalize_products
+
+# فروشگاه‌هایی که مسیر داده‌های ساخت‌یافته دارند
+STRUCTURED_DATA_STORES = ('almeera', 'spinneys')
+
+
+def load_scraper(store, parser, structured_data=False):
+    """ساخت اسکرپر فروشگاه با پارسر مشخص (structured_data=False یعنی فقط سلکتورها)"""
+    if store == 'lulu':
+        from shelfie_lulu_scraper import ShelfieScraper
+        return ShelfieScraper("https://gcc.luluhypermarket.com", html_parser=parser)
+    if store == 'almeera':
+        from almeera_scraper import AlmeeraMultiPageScraper
+        return AlmeeraMultiPageScraper("https://almeera.online", html_parser=parser,
+                                       structured_data=structured_data)
+    from shelfie_spinneys_scraper import SpinneysMultiPageScraper
+    return SpinneysMultiPageScraper("https://www.spinneys.com", html_parser=parser,
+                                    structured_data=structured_data)
+
+
+def extract(scraper, store, html_content, page_url):
+    """اجرای منطق استخراج فروشگاه روی HTML"""
+    if store == 'almeera':
+        return scraper._extract_products_from_html(html_content, page_url, set())
+    return scraper._extract_products_from_html(html_content, page_url)
+
+
+def extract_structured(scraper, store, html_content, page_url):
+    """اجرای مسیر تک‌عبوری داده‌های ساخت‌یافته فروشگاه روی HTML"""
+    if store == 'almeera':
+        return scraper._extract_structured_products(html_content, page_url, set())
+    return scraper._extract_structured_products(html_content, page_url)
+
+
+def time_call(func, repeat):
+    """میانه زمان اجرای تابع بر حسب میلی‌ثانیه"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return statistics.median(timings), result
+
+
+def product_keys(products, store):
+    """کلیدهای مقایسه خروجی دو مسیر استخراج (پس از پس‌پردازش)"""
+    normalized = normalize_products(products, store, name_cache=False)
+    return list(zip(normalized['product'], normalized['price'], normalized['url']))
+
+
+def run_benchmark(store, paths, repeat):
+    """
+    اجرای بنچمارک برای همه پارسرهای نصب شده
+
+    Args:
+        store (str): نام فروشگاه
+        paths (list): مسیر فایل‌های HTML ذخیره شده
+        repeat (int): تعداد تکرار برای هر صفحه
+
+    Returns:
+        dict: میانگین زمان پارس و استخراج هر پارسر بر حسب میلی‌ثانیه (و ردیف structured برای
+            فروشگاه‌هایی که مسیر داده‌های ساخت‌یافته دارند، همراه با تعداد صفحات مغایر)
+    """
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages.append((path, f.read()))
+
+    results = {}
+    for parser in available_parsers():
+        scraper = load_scraper(store, parser)
+        parse_times = []
+        extract_times = []
+        product_counts = []
+        for path, html_content in pages:
+            parse_ms, _ = time_call(lambda: parse_html(html_content, parser), repeat)
+            extract_ms, products = time_call(lambda: extract(scraper, store, html_content, path), repeat)
+            parse_times.append(parse_ms)
+            extract_times.append(extract_ms)
+            product_counts.append(len(products))
+
+        results[parser] = {
+            'parse_ms': statistics.mean(parse_times),
+            'extract_ms': statistics.mean(extract_times),
+            'products': sum(product_counts)
+        }
+
+    if store in STRUCTURED_DATA_STORES:
+        scraper = load_scraper(store, None, structured_data=True)
+        cascade_scraper = load_scraper(store, None)
+        extract_times = []
+        product_counts = []
+        mismatches = []
+        for path, html_content in pages:
+            extract_ms, products = time_call(lambda: extract_structured(scraper, store, html_content, path), repeat)
+            extract_times.append(extract_ms)
+            product_counts.append(len(products))
+            if product_keys(products, store) != product_keys(extract(cascade_scraper, store, html_content, path), store):
+                mismatches.append(path)
+
+        results['structured'] = {
+            'parse_ms': 0.0,
+            'extract_ms': statistics.mean(extract_times),
+            'products': sum(product_counts),
+            'mismatches': mismatches
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='بنچمارک زمان پارس صفحات ذخیره شده')
+    parser.add_argument('paths', nargs='+', help='مسیر فایل‌های HTML ذخیره شده')
+    parser.add_argument('--store', choices=['lulu', 'almeera', 'spinneys'], required=True,
+                        help='فروشگاهی که صفحات متعلق به آن است')
+    parser.add_argument('--repeat', type=int, default=5, help='تعداد تکرار برای هر صفحه')
+    args = parser.parse_args()
+
+    # لاگ‌های اسکرپرها در زمان‌سنجی دخالت نکنند
+    logging.disable(logging.WARNING)
+
+    results = run_benchmark(args.store, args.paths, args.repeat)
+    baseline = results['html.parser']['extract_ms']
+
+    print(f"{len(args.paths)} صفحه، {args.repeat} تکرار برای هر صفحه (میانگین زمان هر صفحه)")
+    print(f"{'parser':<12} {'parse ms':>10} {'extract ms':>12} {'speedup':>8} {'products':>9}")
+    for parser_name, result in results.items():
+        speedup = baseline / result['extract_ms'] if result['extract_ms'] else 0
+        print(f"{parser_name:<12} {result['parse_ms']:>10.1f} {result['extract_ms']:>12.1f} "
+              f"{speedup:>7.2f}x {result['products']:>9}")
+
+    for path in results.get('structured', {}).get('mismatches', []):
+        print(f"مغایرت خروجی structured با سلکتورها: {path}")
@@ -0,0 +1,82 @@
+"""
+Shelfie - پارسر HTML قابل تعویض و سلکتورهای از پیش کامپایل شده
+درخت HTML با سریع‌ترین پارسر نصب شده ساخته می‌شود (lxml در صورت وجود، در غیر این صورت
+html.parser) و سلکتورهای CSS هر فروشگاه یک بار در زمان import کامپایل می‌شوند تا
+برای هر صفحه دوباره تجزیه نشوند.
+"""
+
+import logging
+import os
+import soupsieve
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    import html5lib
+    HTML5LIB_AVAILABLE = True
+except ImportError:
+    HTML5LIB_AVAILABLE = False
+
+
+def available_parsers():
+    """
+    لیست پارسرهای نصب شده به ترتیب سرعت
+
+    Returns:
+        list: نام پارسرها برای BeautifulSoup
+    """
+    parsers = []
+    if LXML_AVAILABLE:
+        parsers.append('lxml')
+    parsers.append('html.parser')
+    if HTML5LIB_AVAILABLE:
+        parsers.append('html5lib')
+    return parsers
+
+
+def _default_parser():
+    """انتخاب پارسر پیش‌فرض از متغیر محیطی یا سریع‌ترین پارسر نصب شده"""
+    requested = os.environ.get('SHELFIE_HTML_PARSER')
+    if requested:
+        if requested in available_parsers():
+            return requested
+        logger.warning(f"پارسر {requested} نصب نیست، استفاده از {available_parsers()[0]}")
+    return available_parsers()[0]
+
+
+# پارسر پیش‌فرض برای همه اسکرپرها (قابل تنظیم با متغیر محیطی)
+DEFAULT_HTML_PARSER = _default_parser()
+
+
+def parse_html(html_content, parser=None):
+    """
+    ساخت درخت HTML
+
+    Args:
+        html_content (str): متن HTML
+        parser (str, optional): نام پارسر. اگر None باشد، پارسر پیش‌فرض استفاده می‌شود
+
+    Returns:
+        BeautifulSoup: درخت HTML
+    """
+    return BeautifulSoup(html_content, parser or DEFAULT_HTML_PARSER)
+
+
+def compile_selector(selector):
+    """
+    کامپایل یک سلکتور CSS برای استفاده مکرر
+
+    Args:
+        selector (str): سلکتور CSS
+
+    Returns:
+        SoupSieve: سلکتور کامپایل شده با متدهای select، select_one و match
+    """
+    return soupsieve.compile(selector)
@@ -0,0 +1,288 @@
+"""
+Shelfie - پس‌پردازش ستونی محصولات جمع‌آوری شده
+اسکرپرها در حلقه مرورگر فقط فیلدهای خام (نام کامل، متن قیمت، آدرس، صفحه و برند منبع در
+صورت وجود) را ذخیره می‌کنند. پس از پایان استخراج، normalize_products همه محصولات را یک جا
+به DataFrame تبدیل می‌کند و نام، برند، وزن و قیمت را با عملیات رشته‌ای pandas روی کل ستون
+یکسان‌سازی می‌کند؛ جستجوی برند فقط یک بار برای هر نام یکتا انجام می‌شود. به همین دلیل
+داده‌های خام آرشیو شده را هم می‌توان بدون استخراج دوباره با قوانین جدید پردازش کرد.
+
+مثال:
+    python shelfie_postprocess.py --store lulu raw_products.jsonl --output lulu_products.xlsx
+"""
+
+import argparse
+import hashlib
+import logging
+import re
+import time
+import pandas as pd
+from shelfie_brands import find_brand, get_brand_index
+from shelfie_name_cache import get_name_cache
+from shelfie_units import QUANTITY_PATTERN, parse_quantities
+
+logger = logging.getLogger(__name__)
+
+# فیلدهای خامی که اسکرپرها برای هر محصول ذخیره می‌کنند
+RAW_FIELDS = ['name', 'brand', 'price', 'url', 'page']
+
+# نتایج پارس هر نام که در کش نام‌ها نگه داشته می‌شوند
+PARSED_NAME_COLUMNS = ['product', 'brand', 'weight']
+
+# نسخه قوانین پارس نام؛ با هر تغییر در پاکسازی نام، تشخیص برند یا وزن یکی اضافه شود
+NAME_RULES_VERSION = 1
+
+# مقدار و هر چه بعد از آن آمده (وزن انتهای نام)
+QUANTITY_SUFFIX_PATTERN = re.compile(r'(?:' + QUANTITY_PATTERN.pattern + r').*$', re.IGNORECASE | re.DOTALL)
+
+# مقدار همراه با جداکننده‌های چسبیده به آن (خط تیره، پرانتز و کاما)
+QUANTITY_SPAN_PATTERN = re.compile(r'[ \-(,]*(?:' + QUANTITY_PATTERN.pattern + r')[ \-),]*', re.IGNORECASE)
+
+
+def _first_word_brand(names):
+    """کلمه اول نام‌های چندکلمه‌ای که عدد ندارد (Lulu)"""
+    first_word = names.str.split(' ', n=1).str[0].fillna('')
+    found = names.str.contains(' ', regex=False) & ~first_word.str.contains(r'\d')
+    return first_word.where(found)
+
+
+def _uppercase_first_word_brand(names):
+    """کلمه اول تمام حروف بزرگ نام‌های چندکلمه‌ای (Al Meera)"""
+    brands = _first_word_brand(names)
+    return brands.where(brands.fillna('').str.isupper())
+
+
+def _leading_words_brand(names):
+    """کلمات ابتدای نام تا اولین فاصله یا خط تیره (Spinneys)"""
+    brands = names.str.extract(r'^([\w\s]+?)[\s\-]', expand=False).str.strip()
+    return brands.where(brands != '')
+
+
+def _first_two_words_brand(names):
+    """دو کلمه اول نام، یا تنها کلمه نام‌های تک‌کلمه‌ای (Union Coop)"""
+    words = names.str.split(' ', n=2)
+    brands = words.str[:2].str.join(' ')
+    return brands.where(names != '')
+
+
+def _digits_price(prices):
+    """فقط ارقام، نقطه و کاما (Al Meera)"""
+    return prices.fillna('').astype(str).str.replace(r'[^\d\.,]', '', regex=True).str.strip()
+
+
+def _aed_price(prices):
+    """ارقام و نقطه با پسوند AED؛ مبلغ دو رقم اعشاری که دو بار پشت سر هم آمده (12.5012.50) یک بار نگه داشته می‌شود (Union Coop)"""
+    digits = prices.fillna('').astype(str).str.replace(r'[^\d.]', '', regex=True)
+    digits = digits.str.extract(r'^(?P<amount>\d+\.\d{2})(?P=amount)$')['amount'].fillna(digits)
+    return (digits + ' AED').where(digits != '', 'N/A')
+
+
+def _text_price(prices):
+    """متن قیمت بدون تغییر (Lulu و Spinneys)"""
+    return prices.fillna('N/A').astype(str).str.strip()
+
+
+# قوانین هر فروشگاه: ستون نام، حدس برند وقتی در فهرست برندها نیست، نحوه حذف وزن از نام،
+# پاکسازی قیمت و ستون‌های خروجی
+STORE_PROFILES = {
+    'lulu': {
+        'name_column': 'product',
+        'brand_fallback': _first_word_brand,
+        'quantity_removal': 'suffix',
+        'price': _text_price,
+        'constants': {'website': 'luluhypermarket.com'},
+        'columns': ['product', 'brand', 'price', 'weight', 'website', 'url', 'page']
+    },
+    'almeera': {
+        'name_column': 'product',
+        'brand_fallback': _uppercase_first_word_brand,
+        'quantity_removal': 'suffix',
+        'price': _digits_price,
+        'constants': {},
+        'columns': ['product', 'brand', 'price', 'weight', 'url', 'page']
+    },
+    'spinneys': {
+        'name_column': 'product',
+        'brand_fallback': _leading_words_brand,
+        'quantity_removal': 'suffix',
+        'price': _text_price,
+        'constants': {'website': 'spinneys.com'},
+        'columns': ['product', 'brand', 'price', 'weight', 'website', 'url', 'page']
+    },
+    'unioncoop': {
+        'name_column': 'name',
+        'brand_fallback': _first_two_words_brand,
+        'quantity_removal': 'span',
+        'price': _aed_price,
+        'constants': {'store': 'Union Coop'},
+        'columns': ['name', 'brand', 'price', 'weight', 'store', 'url', 'page']
+    }
+}
+
+
+def _find_brands(names):
+    """جستجوی برند هر نام یکتا در فهرست مشترک برندها (برند، شروع و پایان محدوده آن)"""
+    unique_names = pd.unique(names)
+    matches = pd.DataFrame(
+        [find_brand(name) or (None, -1, -1) for name in unique_names],
+        columns=['brand', 'start', 'end'], index=unique_names
+    )
+    return matches.reindex(names.values).set_index(names.index)
+
+
+def _remove_brands(names, starts, ends):
+    """حذف محدوده برند از نام‌ها (start منفی یعنی بدون برند) و جداکننده‌های بعد از آن"""
+    return pd.Series([
+        (name[:start] + ' ' + name[end:]).strip().lstrip(' -:') if start >= 0 else name
+        for name, start, end in zip(names, starts, ends)
+    ], index=names.index, dtype=object)
+
+
+def name_rules_version():
+    """نسخه قوانین پارس نام: NAME_RULES_VERSION همراه با اثر انگشت فهرست برندها و الگوی وزن"""
+    digest = hashlib.sha1(QUANTITY_PATTERN.pattern.encode('utf-8'))
+    for brand in get_brand_index().brands:
+        digest.update(b'\n' + brand.encode('utf-8'))
+    return f"{NAME_RULES_VERSION}-{digest.hexdigest()[:12]}"
+
+
+def _parse_names(names, source_brands, profile):
+    """
+    پارس ستونی نام‌ها: برند، نام بدون برند و وزن، و وزن
+
+    Args:
+        names (pandas.Series): نام‌های خام با فاصله‌های یکسان شده
+        source_brands (pandas.Series): برند اعلام شده توسط سایت (NaN اگر نباشد)
+        profile (dict): قوانین فروشگاه
+
+    Returns:
+        pandas.DataFrame: ستون‌های product، brand و weight با همان index
+    """
+    # برند: برند اعلام شده توسط سایت، سپس فهرست برندها، سپس حدس فروشگاه از ابتدای نام
+    matches = _find_brands(names)
+    brands = source_brands.fillna(matches['brand']).fillna(profile['brand_fallback'](names))
+
+    # محدوده برند در نام: برند حدسی همیشه در ابتدای نام است و برند سایت هر جای نام (یا هیچ جا)
+    listed = matches['brand'].notna()
+    starts = matches['start'].where(listed, pd.Series(0, index=names.index).where(brands.notna(), -1))
+    ends = matches['end'].where(listed, brands.fillna('').str.len())
+    from_source = source_brands.notna()
+    if from_source.any():
+        source_starts = pd.Series([
+            name.lower().find(brand.lower())
+            for name, brand in zip(names[from_source], source_brands[from_source])
+        ], index=names.index[from_source])
+        # برند سایت که در نام نیامده چیزی حذف نمی‌کند (فقط جداکننده‌های ابتدای نام)
+        starts[from_source] = source_starts.clip(lower=0)
+        ends[from_source] = (source_starts + source_brands[from_source].str.len()).where(source_starts >= 0, 0)
+
+    clean_names = _remove_brands(names, starts, ends)
+    if profile['quantity_removal'] == 'suffix':
+        clean_names = clean_names.str.replace(QUANTITY_SUFFIX_PATTERN, '', regex=True)
+    else:
+        clean_names = clean_names.str.replace(QUANTITY_SPAN_PATTERN, ' ', n=1, regex=True)
+    clean_names = clean_names.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+    return pd.DataFrame({
+        'product': clean_names,
+        'brand': brands.fillna('N/A'),
+        'weight': parse_quantities(names)['weight'].fillna('N/A')
+    }, index=names.index)
+
+
+def _parse_names_cached(names, source_brands, store, name_cache):
+    """
+    پارس نام‌ها با استفاده از کش: فقط نام‌هایی که قبلاً دیده نشده‌اند پارس و ذخیره می‌شوند
+    (نام‌هایی که برند سایت دارند همیشه پارس می‌شوند چون نتیجه به برند بستگی دارد)
+    """
+    cacheable = source_brands.isna()
+    cached = name_cache.get_many(store, pd.unique(names[cacheable]))
+    hit = cacheable & names.isin(cached.keys())
+
+    parsed = pd.DataFrame(index=names.index, columns=PARSED_NAME_COLUMNS, dtype=object)
+    if hit.any():
+        parsed.loc[hit] = pd.DataFrame(names[hit].map(cached).tolist(), index=names.index[hit],
+                                       columns=PARSED_NAME_COLUMNS)
+    if not hit.all():
+        fresh = _parse_names(names[~hit], source_brands[~hit], STORE_PROFILES[store])
+        parsed.loc[~hit] = fresh
+        new = fresh[cacheable[~hit]]
+        new = new[~names[new.index].duplicated()]
+        name_cache.put_many(store, dict(zip(names[new.index], new.itertuples(index=False, name=None))))
+    return parsed
+
+
+def normalize_products(raw_products, store, name_cache=None):
+    """
+    یکسان‌سازی ستونی محصولات خام یک فروشگاه
+
+    Args:
+        raw_products (list | pandas.DataFrame): رکوردهای خام با کلیدهای name، price، url، page
+            و در صورت وجود brand (برند اعلام شده توسط خود سایت)
+        store (str): نام فروشگاه (lulu، almeera، spinneys یا unioncoop)
+        name_cache (NameParseCache | bool, optional): کش نتایج پارس نام‌ها. None یعنی کش پیش‌فرض
+            (SHELFIE_NAME_CACHE) و False یعنی پارس همه نام‌ها بدون کش
+
+    Returns:
+        pandas.DataFrame: محصولات با همان ستون‌های خروجی اسکرپر فروشگاه
+    """
+    profile = STORE_PROFILES[store]
+    start_time = time.perf_counter()
+    raw = raw_products if isinstance(raw_products, pd.DataFrame) else pd.DataFrame(list(raw_products))
+    if raw.empty:
+        return pd.DataFrame(columns=profile['columns'])
+    raw = raw.reindex(columns=list(dict.fromkeys(RAW_FIELDS + list(raw.columns))))
+
+    names = raw['name'].fillna('').astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
+    source_brands = raw['brand'].astype(object)
+    source_brands = source_brands.where(source_brands.map(lambda value: isinstance(value, str))).str.strip()
+    source_brands = source_brands.where(source_brands != '')
+
+    if name_cache is None:
+        name_cache = get_name_cache(name_rules_version())
+    if name_cache:
+        parsed = _parse_names_cached(names, source_brands, store, name_cache)
+    else:
+        parsed = _parse_names(names, source_brands, profile)
+
+    products = pd.DataFrame({
+        profile['name_column']: parsed['product'],
+        'brand': parsed['brand'],
+        'price': profile['price'](raw['price']),
+        'weight': parsed['weight'],
+        'url': raw['url'],
+        'page': raw['page']
+    }, index=raw.index)
+    for column, value in profile['constants'].items():
+        products[column] = value
+
+    logger.info(f"پس‌پردازش {len(products)} محصول {store} در {(time.perf_counter() - start_time) * 1000:.1f} میلی‌ثانیه")
+    return products[profile['columns']].reset_index(drop=True)
+
+
+def read_raw_products(path):
+    """خواندن محصولات خام آرشیو شده از فایل CSV، JSON، JSON Lines یا اکسل"""
+    if path.endswith('.csv'):
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    if path.endswith(('.jsonl', '.ndjson')):
+        return pd.read_json(path, lines=True, dtype=False)
+    if path.endswith('.json'):
+        return pd.read_json(path, dtype=False)
+    return pd.read_excel(path, dtype=str)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='پس‌پردازش دوباره محصولات خام آرشیو شده')
+    parser.add_argument('path', help='فایل محصولات خام (csv، json، jsonl یا xlsx)')
+    parser.add_argument('--store', choices=sorted(STORE_PROFILES), required=True, help='فروشگاه محصولات')
+    parser.add_argument('--output', required=True, help='فایل خروجی (csv یا xlsx)')
+    parser.add_argument('--no-name-cache', action='store_true', help='پارس همه نام‌ها بدون کش نام‌ها')
+    args = parser.parse_args()
+
+    products = normalize_products(read_raw_products(args.path), args.store,
+                                  name_cache=False if args.no_name_cache else None)
+    if args.output.endswith('.csv'):
+        products.to_csv(args.output, index=False, encoding='utf-8-sig')
+    else:
+        products.to_excel(args.output, index=False, sheet_name='Products', engine='xlsxwriter')
+    logger.info(f"{len(products)} محصول در {args.output} ذخیره شد")
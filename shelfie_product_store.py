@@ -0,0 +1,282 @@
+"""
+Shelfie - پایگاه داده محلی محصولات و تاریخچه قیمت‌ها (SQLite)
+هر محصول با کلید فروشگاه و آدرس استاندارد شده آن یک بار در جدول products نگه داشته و در هر
+اجرا به‌روز می‌شود (upsert)، و هر قیمت دیده شده به جدول فقط افزودنی price_observations اضافه
+می‌شود. اسکرپرها از طریق ProductStoreSink (مثل بقیه sinkها) محصولات هر صفحه را می‌نویسند؛
+ردیف‌ها جمع و به صورت دسته‌ای در یک تراکنش ذخیره می‌شوند.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, urlunparse
+from shelfie_dataset import to_unified
+
+logger = logging.getLogger(__name__)
+
+# فایل پیش‌فرض پایگاه داده (خالی یا 0 برای غیرفعال کردن)
+DEFAULT_PRODUCT_DB_PATH = os.environ.get('SHELFIE_PRODUCT_DB', 'shelfie_products.sqlite')
+
+# تعداد ردیف‌هایی که پیش از ذخیره در یک تراکنش جمع می‌شوند
+DEFAULT_PRODUCT_DB_BATCH_SIZE = int(os.environ.get('SHELFIE_PRODUCT_DB_BATCH_SIZE', 500))
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS products ("
+    "id INTEGER PRIMARY KEY, store TEXT NOT NULL, url TEXT NOT NULL, product TEXT, brand TEXT, "
+    "category TEXT, weight TEXT, quantity REAL, unit TEXT, base_quantity REAL, pack_count INTEGER, "
+    "last_price REAL, currency TEXT, first_seen TEXT NOT NULL, last_seen TEXT NOT NULL, "
+    "UNIQUE (store, url))",
+    "CREATE TABLE IF NOT EXISTS price_observations ("
+    "id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL REFERENCES products(id), "
+    "observed_at TEXT NOT NULL, price REAL, currency TEXT, price_text TEXT, job_id TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_products_store ON products (store)",
+    "CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand)",
+    "CREATE INDEX IF NOT EXISTS idx_products_category ON products (category)",
+    "CREATE INDEX IF NOT EXISTS idx_price_observations_product ON price_observations (product_id, observed_at)"
+]
+
+_UPSERT_PRODUCT = (
+    "INSERT INTO products (store, url, product, brand, category, weight, quantity, unit, base_quantity, "
+    "pack_count, last_price, currency, first_seen, last_seen) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (store, url) DO UPDATE SET "
+    "product = excluded.product, brand = excluded.brand, "
+    "category = COALESCE(excluded.category, products.category), weight = excluded.weight, "
+    "quantity = excluded.quantity, unit = excluded.unit, base_quantity = excluded.base_quantity, "
+    "pack_count = excluded.pack_count, last_price = COALESCE(excluded.last_price, products.last_price), "
+    "currency = COALESCE(excluded.currency, products.currency), last_seen = excluded.last_seen"
+)
+
+_INSERT_OBSERVATION = (
+    "INSERT INTO price_observations (product_id, observed_at, price, currency, price_text, job_id) "
+    "SELECT id, ?, ?, ?, ?, ? FROM products WHERE store = ? AND url = ?"
+)
+
+
+def canonical_url(url):
+    """
+    آدرس استاندارد محصول (بدون query و fragment، دامنه با حروف کوچک و بدون / پایانی)
+
+    Args:
+        url (str): آدرس محصول
+
+    Returns:
+        str: آدرس استاندارد، یا None اگر آدرسی وجود نداشته باشد
+    """
+    if not isinstance(url, str) or not url.strip():
+        return None
+    parts = urlparse(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), path, '', '', ''))
+
+
+def category_from_url(url):
+    """نام دسته‌بندی از آخرین بخش مسیر آدرس صفحه (مثلاً ready-meals یا frozen-food.html -> frozen-food)"""
+    if not isinstance(url, str) or not url.strip():
+        return None
+    segments = [segment for segment in urlparse(url.strip()).path.split('/') if segment]
+    if not segments:
+        return None
+    return segments[-1].rsplit('.html', 1)[0] or None
+
+
+def _product_key(row):
+    """کلید محصول: آدرس استاندارد، یا برای ردیف‌های بدون آدرس محصول (مثلاً خروجی‌های قدیمی Union Coop) نام و وزن"""
+    url = canonical_url(row['url'])
+    if url:
+        return url
+    name = ' '.join(part for part in (row['brand'], row['product'], row['weight']) if isinstance(part, str))
+    return f"name:{name.lower()}" if name else None
+
+
+def _nullable(value):
+    """تبدیل NA و NaN به None برای SQLite"""
+    if value is None:
+        return None
+    try:
+        if value != value:
+            return None
+    except TypeError:
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ProductStore:
+    """
+    پایگاه داده محصولات و تاریخچه قیمت‌ها
+    (امن برای استفاده همزمان از چند thread)
+    """
+
+    def __init__(self, path=DEFAULT_PRODUCT_DB_PATH):
+        """
+        باز کردن یا ساختن فایل پایگاه داده
+
+        Args:
+            path (str): مسیر فایل SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL تا خواندن گزارش‌ها هنگام نوشتن کارهای همزمان مسدود نشود
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+
+    def ingest(self, products, store, category=None, observed_at=None, job_id=None):
+        """
+        upsert محصولات و افزودن قیمت‌های آن‌ها به تاریخچه در یک تراکنش
+
+        Args:
+            products (list | pandas.DataFrame): محصولات پس‌پردازش شده یک فروشگاه
+            store (str): نام فروشگاه (lulu، almeera، spinneys یا unioncoop)
+            category (str, optional): دسته‌بندی پیش‌فرض وقتی از آدرس صفحه محصول به دست نیاید
+            observed_at (datetime, optional): زمان مشاهده قیمت‌ها. اگر None باشد، زمان فعلی
+            job_id (str, optional): شناسه کار استخراج
+
+        Returns:
+            int: تعداد محصولات ذخیره شده
+        """
+        observed_at = observed_at or datetime.now()
+        unified = to_unified(products, store, observed_at)
+        if unified.empty:
+            return 0
+        seen = observed_at.isoformat(timespec='seconds')
+
+        product_rows = {}
+        observation_rows = {}
+        for row in unified.to_dict('records'):
+            key = _product_key(row)
+            if key is None:
+                continue
+            values = {column: _nullable(value) for column, value in row.items()}
+            product_rows[key] = (
+                store, key, values['product'], values['brand'],
+                category_from_url(values['page']) or category, values['weight'], values['quantity'],
+                values['unit'], values['base_quantity'], values['pack_count'], values['price'],
+                values['currency'], seen, seen
+            )
+            observation_rows[key] = (
+                seen, values['price'], values['currency'], values['price_text'], job_id, store, key
+            )
+
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(_UPSERT_PRODUCT, product_rows.values())
+                self._connection.executemany(_INSERT_OBSERVATION, observation_rows.values())
+        return len(product_rows)
+
+    def price_history(self, store, url):
+        """
+        تاریخچه قیمت یک محصول
+
+        Args:
+            store (str): نام فروشگاه
+            url (str): آدرس محصول (یا کلید name:... برای محصولات بدون آدرس)
+
+        Returns:
+            list: تاپل‌های (زمان مشاهده، قیمت، واحد پول) به ترتیب زمان
+        """
+        key = canonical_url(url) or url
+        with self._lock:
+            return self._connection.execute(
+                "SELECT o.observed_at, o.price, o.currency FROM price_observations o "
+                "JOIN products p ON p.id = o.product_id WHERE p.store = ? AND p.url = ? "
+                "ORDER BY o.observed_at",
+                (store, key)
+            ).fetchall()
+
+    def close(self):
+        """بستن فایل پایگاه داده"""
+        with self._lock:
+            self._connection.close()
+
+
+class ProductStoreSink:
+    """
+    sink نوشتن محصولات هر صفحه در ProductStore؛ ردیف‌ها تا رسیدن به batch_size جمع
+    و سپس در یک تراکنش ذخیره می‌شوند
+    """
+
+    def __init__(self, product_store, store, category=None, job_id=None, observed_at=None,
+                 batch_size=DEFAULT_PRODUCT_DB_BATCH_SIZE):
+        """
+        مقداردهی اولیه
+
+        Args:
+            product_store (ProductStore): پایگاه داده محصولات
+            store (str): نام فروشگاه
+            category (str, optional): دسته‌بندی پیش‌فرض محصولات
+            job_id (str, optional): شناسه کار استخراج
+            observed_at (datetime, optional): زمان مشاهده قیمت‌ها. اگر None باشد، زمان ساخت sink
+            batch_size (int): تعداد ردیف‌های هر تراکنش
+        """
+        self.product_store = product_store
+        self.store = store
+        self.category = category
+        self.job_id = job_id
+        self.observed_at = observed_at or datetime.now()
+        self.batch_size = batch_size
+        self.row_count = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def write_rows(self, rows):
+        """افزودن ردیف‌ها و ذخیره آن‌ها وقتی تعداد ردیف‌های جمع شده به batch_size برسد"""
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        """ذخیره ردیف‌های جمع شده در یک تراکنش"""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        self.row_count += self.product_store.ingest(rows, self.store, self.category, self.observed_at, self.job_id)
+
+    def close(self):
+        """
+        ذخیره ردیف‌های باقی‌مانده
+
+        Returns:
+            str: مسیر پایگاه داده، یا None اگر هیچ محصولی ذخیره نشده باشد
+        """
+        with self._lock:
+            self._flush()
+        if not self.row_count:
+            return None
+        logger.info(f"{self.row_count} محصول در پایگاه داده {self.product_store.path} ذخیره شد")
+        return self.product_store.path
+
+
+_product_stores = {}
+_product_stores_lock = threading.Lock()
+
+
+def get_product_store(path=None):
+    """
+    پایگاه داده مشترک محصولات (یک نمونه برای هر فایل)
+
+    Args:
+        path (str, optional): مسیر فایل. اگر None باشد، مسیر پیش‌فرض استفاده می‌شود
+
+    Returns:
+        ProductStore: پایگاه داده آماده، یا None اگر غیرفعال باشد یا فایل باز نشود
+    """
+    path = DEFAULT_PRODUCT_DB_PATH if path is None else path
+    if not path or path == '0':
+        return None
+    with _product_stores_lock:
+        product_store = _product_stores.get(path)
+        if product_store is None:
+            try:
+                product_store = ProductStore(path)
+            except sqlite3.Error as e:
+                logger.warning(f"پایگاه داده محصولات باز نشد ({path}): {e}")
+                return None
+            _product_stores[path] = product_store
+    return product_store
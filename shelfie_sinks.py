@@ -0,0 +1,244 @@
+"""
+Shelfie - نوشتن جریانی خروجی محصولات (CSV، اکسل و NDJSON)
+ردیف‌ها به محض آماده شدن هر صفحه به فایل اضافه می‌شوند و هیچ DataFrame کاملی ساخته
+نمی‌شود، بنابراین حافظه مصرفی به اندازه کاتالوگ بستگی ندارد. فایل‌های CSV و NDJSON بعد
+از هر دسته ردیف flush می‌شوند تا با قطع شدن برنامه محصولات صفحات قبلی از دست نروند.
+اکسل در حالت constant_memory نوشته می‌شود و عرض ستون‌ها هنگام نوشتن ردیف‌ها به‌روز می‌شود.
+"""
+
+import csv
+import json
+import logging
+import math
+import threading
+
+# xlsxwriter فقط برای خروجی اکسل لازم است؛ بدون آن CSV و NDJSON همچنان کار می‌کنند
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _clean_value(value):
+    """تبدیل NaN و None به مقدار خالی"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+class ProductSink:
+    """
+    پایه نوشتن جریانی ردیف‌های محصولات در یک فایل
+    (امن برای استفاده همزمان از چند thread)
+    """
+
+    def __init__(self, path, columns=None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            path (str): مسیر فایل خروجی
+            columns (list, optional): ستون‌ها به ترتیب. اگر None باشد، از کلیدهای اولین ردیف خوانده می‌شوند
+        """
+        self.path = path
+        self.columns = list(columns) if columns else None
+        self.row_count = 0
+        self._opened = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def write_rows(self, rows):
+        """
+        افزودن چند ردیف به فایل
+
+        Args:
+            rows (iterable): دیکشنری‌های محصولات (کلیدهای خارج از ستون‌ها نادیده گرفته می‌شوند)
+        """
+        with self._lock:
+            if self._closed:
+                return
+            for row in rows:
+                if not self._opened:
+                    if self.columns is None:
+                        self.columns = list(row.keys())
+                    self._open()
+                    self._opened = True
+                self._write([_clean_value(row.get(column)) for column in self.columns])
+                self.row_count += 1
+            if self._opened:
+                self._flush()
+
+    def close(self):
+        """
+        بستن فایل
+
+        Returns:
+            str: مسیر فایل، یا None اگر هیچ ردیفی نوشته نشده باشد
+        """
+        with self._lock:
+            if self._closed:
+                return self.path if self._opened else None
+            self._closed = True
+            if not self._opened:
+                return None
+            self._close()
+        logger.info(f"{self.row_count} محصول در فایل {self.path} ذخیره شد")
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write(self, values):
+        raise NotImplementedError
+
+    def _flush(self):
+        pass
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvSink(ProductSink):
+    """خروجی CSV (با BOM تا اکسل حروف فارسی و عربی را درست نشان دهد)"""
+
+    def _open(self):
+        self._file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def _write(self, values):
+        self._writer.writerow(['' if value is None else value for value in values])
+
+    def _flush(self):
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class NdjsonSink(ProductSink):
+    """خروجی JSON Lines (هر محصول یک خط JSON)"""
+
+    def _open(self):
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _write(self, values):
+        self._file.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False, default=str) + '\n')
+
+    def _flush(self):
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class XlsxSink(ProductSink):
+    """
+    خروجی اکسل در حالت constant_memory؛ هر ردیف بلافاصله روی دیسک نوشته می‌شود و
+    عرض هر ستون (طولانی‌ترین مقدار + 2) هنگام نوشتن محاسبه می‌شود
+    """
+
+    def __init__(self, path, columns=None, sheet_name='Products'):
+        super().__init__(path, columns)
+        self.sheet_name = sheet_name
+
+    def _open(self):
+        if not XLSXWRITER_AVAILABLE:
+            raise ImportError("xlsxwriter is required for Excel output (pip install xlsxwriter)")
+        self._workbook = xlsxwriter.Workbook(self.path, {'constant_memory': True})
+        self._worksheet = self._workbook.add_worksheet(self.sheet_name)
+        header_format = self._workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+        self._worksheet.write_row(0, 0, self.columns, header_format)
+        self._widths = [len(str(column)) for column in self.columns]
+
+    def _write(self, values):
+        row = self.row_count + 1
+        for col, value in enumerate(values):
+            if value is None:
+                continue
+            self._worksheet.write(row, col, value)
+            width = len(str(value))
+            if width > self._widths[col]:
+                self._widths[col] = width
+
+    def _close(self):
+        for col, width in enumerate(self._widths):
+            self._worksheet.set_column(col, col, width + 2)
+        self._workbook.close()
+
+
+# کلاس نوشتن هر پسوند فایل
+SINK_TYPES = {
+    '.csv': CsvSink,
+    '.xlsx': XlsxSink,
+    '.ndjson': NdjsonSink,
+    '.jsonl': NdjsonSink
+}
+
+
+def open_sink(path, columns=None):
+    """
+    ساخت sink مناسب پسوند فایل
+
+    Args:
+        path (str): مسیر فایل (.csv، .xlsx، .ndjson یا .jsonl)
+        columns (list, optional): ستون‌ها به ترتیب
+
+    Returns:
+        ProductSink: sink آماده نوشتن
+    """
+    for extension, sink_class in SINK_TYPES.items():
+        if path.endswith(extension):
+            return sink_class(path, columns)
+    raise ValueError(f"Unsupported export format: {path}")
+
+
+class SinkGroup:
+    """نوشتن همزمان ردیف‌ها در چند sink (مثلاً CSV و NDJSON یک کار)"""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        for sink in self.sinks:
+            sink.write_rows(rows)
+
+    def close(self):
+        """بستن همه فایل‌ها و برگرداندن مسیر فایل‌هایی که ردیفی دارند"""
+        return [path for path in (sink.close() for sink in self.sinks) if path]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def write_products(path, products, columns=None):
+    """
+    نوشتن یک لیست یا iterator از محصولات در فایل بدون ساخت DataFrame
+
+    Args:
+        path (str): مسیر فایل خروجی
+        products (iterable): دیکشنری‌های محصولات
+        columns (list, optional): ستون‌ها به ترتیب
+
+    Returns:
+        str: مسیر فایل، یا None اگر محصولی وجود نداشته باشد
+    """
+    sink = open_sink(path, columns)
+    try:
+        sink.write_rows(products)
+    finally:
+        path = sink.close()
+    return path
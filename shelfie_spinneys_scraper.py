@@ -1,16 +1,23 @@
 import logging
-import re
+import threading
 import time
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from urllib.parse import urljoin
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from datetime import datetime
 import argparse
+from shelfie_concurrent import scrape_pages_concurrently
+from shelfie_driver_pool import create_driver
+from shelfie_checkpoint import ScrapeCheckpoint
+from shelfie_async_fetcher import AsyncPageFetcher
+from shelfie_waits import wait_for_dom_stable
+from shelfie_js_extraction import DEFAULT_JS_EXTRACTION, run_extraction_script
+from shelfie_parsing import compile_selector, parse_html
+from shelfie_structured_data import DEFAULT_STRUCTURED_DATA, extract_structured_products
+from shelfie_postprocess import normalize_products
+from shelfie_sinks import write_products
 
 # تنظیم لاگینگ
 logging.basicConfig(
@@ -23,31 +30,98 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# استخراج نام، آدرس و قیمت همه محصولات صفحه با یک فراخوانی
+PRODUCTS_SCRIPT = """
+return Array.prototype.map.call(document.querySelectorAll('.product-info'), function (block) {
+    var link = block.querySelector('.product-name a');
+    var price = block.querySelector('.product-price .price');
+    return {
+        name: link ? (link.innerText || '').trim() : null,
+        url: link ? link.href : null,
+        price: price ? (price.innerText || '').trim() : null
+    };
+});
+"""
+
+# سلکتورهای صفحه محصولات، یک بار در زمان import کامپایل می‌شوند
+PRODUCT_BLOCK_SELECTOR = compile_selector(".product-info")
+PRODUCT_NAME_SELECTOR = compile_selector(".product-name a")
+PRODUCT_PRICE_SELECTOR = compile_selector(".product-price .price")
+PAGINATION_LINK_SELECTOR = compile_selector(".pagination li:not(.next) a")
+
+# کلاس‌های بلوک محصول Spinneys برای استخراج تک‌عبوری بدون ساخت درخت
+STRUCTURED_DATA_PROFILE = {
+    'root_classes': {'hproduct', 'h-product', 'product-info'},
+    'name_classes': {'fn', 'p-name', 'product-name'},
+    'price_classes': {'price', 'p-price'}
+}
+
 class SpinneysMultiPageScraper:
     """کلاس برای استخراج داده‌های محصولات از وبسایت Spinneys"""
     
-    def __init__(self, base_url, max_pages=None):
+    def __init__(self, base_url, max_pages=None, driver_pool=None, workers=1, cancel_event=None, http_engine=None,
+                 js_extraction=DEFAULT_JS_EXTRACTION, html_parser=None, structured_data=DEFAULT_STRUCTURED_DATA,
+                 sink=None, checkpoint=None):
         """
         مقداردهی اولیه اسکرپر
         
         Args:
             base_url (str): URL پایه دسته‌بندی برای استخراج
             max_pages (int, optional): حداکثر تعداد صفحات برای استخراج. اگر None باشد، همه صفحات استخراج می‌شوند
+            driver_pool (ChromeDriverPool, optional): مخزن مشترک درایورها. اگر None باشد، یک درایور اختصاصی ساخته می‌شود
+            workers (int): تعداد مرورگرهای همزمان برای استخراج صفحات. 1 یعنی استخراج ترتیبی
+            cancel_event (threading.Event, optional): رویداد لغو استخراج
+            http_engine (HttpFetchEngine, optional): موتور HTTP برای استخراج بدون مرورگر. اگر None باشد، فقط از Selenium استفاده می‌شود
+            js_extraction (bool): استخراج همه محصولات صفحه با یک فراخوانی JavaScript به جای find_element برای هر محصول
+            html_parser (str, optional): پارسر HTML برای مسیر HTTP. اگر None باشد، سریع‌ترین پارسر نصب شده استفاده می‌شود
+            structured_data (bool): استخراج تک‌عبوری از میکروفرمت‌ها و JSON-LD پیش از اجرای سلکتورها در مسیر HTTP
+            sink (ProductSink, optional): مقصد نوشتن جریانی محصولات هر صفحه به محض استخراج
+            checkpoint (ScrapeCheckpoint, optional): ذخیره محصولات هر صفحه تا استخراج قطع شده از اولین صفحه باقی‌مانده ادامه پیدا کند
         """
         self.base_url = base_url
         self.max_pages = max_pages
-        self.products = []
+        self.raw_products = []  # فیلدهای خام محصولات در طول استخراج
+        self.products = []  # محصولات پس‌پردازش شده پس از پایان استخراج
+        self.driver_pool = driver_pool
+        self.workers = workers
+        self.cancel_event = cancel_event
+        self.http_engine = http_engine
+        self.js_extraction = js_extraction
+        self.html_parser = html_parser
+        self.structured_data = structured_data
+        self.sink = sink
+        self.checkpoint = checkpoint
+        # تعداد محصولات خام ابتدای raw_products که از checkpoint خوانده شده‌اند (در sinkها نوشته نمی‌شوند)
+        self.restored_product_count = 0
+        # وقتی Selenium محصولی را پیدا کند که HTTP پیدا نکرده، مسیر سریع برای بقیه صفحات غیرفعال می‌شود
+        self._http_disabled = False
+        # HTML صفحاتی که قبلاً با HTTP دریافت شده‌اند تا دوباره دریافت نشوند
+        self._prefetched_html = {}
+        # درایورهای Selenium که فقط برای fallback گرفته شده‌اند (یکی برای هر thread)
+        self._fallback_local = threading.local()
+        self._fallback_drivers = []
+        self._fallback_lock = threading.Lock()
         
     def get_total_products_and_pages(self, driver):
         """
         استخراج تعداد کل محصولات و تعداد صفحات
         
         Args:
-            driver: WebDriver سلنیوم
+            driver: WebDriver سلنیوم (در حالت HTTP می‌تواند None باشد)
             
         Returns:
             int: تعداد کل صفحات
         """
+        if driver is None:
+            total_pages = self._get_total_pages_http()
+            if total_pages is not None:
+                return total_pages
+            
+            # مسیر سریع نتوانست صفحه‌بندی را بخواند، استفاده از Selenium
+            logger.info("استفاده از Selenium برای استخراج تعداد صفحات...")
+            driver = self._get_fallback_driver()
+            driver.get(self.base_url)
+        
         try:
             # تلاش برای یافتن تعداد کل محصولات و صفحات
             logger.info("در حال استخراج تعداد کل صفحات...")
@@ -76,10 +150,203 @@ class SpinneysMultiPageScraper:
             logger.error(f"خطا در استخراج تعداد کل صفحات: {e}")
             return 1  # فرض می‌کنیم حداقل 1 صفحه وجود دارد
     
+    def _get_total_pages_http(self):
+        """
+        استخراج تعداد صفحات از HTML اولیه صفحه اول بدون مرورگر
+        
+        Returns:
+            int: تعداد کل صفحات یا None اگر HTML صفحه قابل استفاده نباشد
+        """
+        try:
+            html_content = self.http_engine.fetch(self.base_url)
+        except Exception as e:
+            logger.warning(f"خطا در دریافت صفحه اول با HTTP: {e}")
+            return None
+        
+        soup = parse_html(html_content, self.html_parser)
+        if not PRODUCT_BLOCK_SELECTOR.select_one(soup):
+            logger.info("محصولی در HTML اولیه صفحه اول یافت نشد")
+            return None
+        
+        # نگه داشتن HTML صفحه اول برای استخراج محصولات آن
+        self._prefetched_html[self.base_url] = html_content
+        
+        last_page_link = PAGINATION_LINK_SELECTOR.select(soup)
+        if last_page_link:
+            try:
+                last_page = int(last_page_link[-1].get_text(strip=True))
+                logger.info(f"تعداد کل صفحات: {last_page}")
+                return last_page
+            except ValueError as e:
+                logger.warning(f"خطا در استخراج آخرین صفحه از پیجینیشن: {e}")
+        
+        logger.info("فقط یک صفحه شناسایی شد")
+        return 1
+    
     def scrape_page(self, driver, page_url):
         """
         استخراج اطلاعات محصولات از یک صفحه
         
+        در حالت HTTP ابتدا صفحه بدون مرورگر دریافت می‌شود و اگر محصولی پیدا نشد،
+        به صورت خودکار از Selenium استفاده می‌شود.
+        
+        Args:
+            driver: WebDriver سلنیوم (در حالت HTTP می‌تواند None باشد)
+            page_url (str): آدرس صفحه برای استخراج
+            
+        Returns:
+            list: لیستی از محصولات استخراج شده از این صفحه
+        """
+        if self.http_engine is not None and not self._http_disabled:
+            page_products = self._scrape_page_http(page_url)
+            if page_products:
+                return page_products
+            
+            logger.info(f"مسیر HTTP محصولی در صفحه {page_url} پیدا نکرد، استفاده از Selenium...")
+            page_products = self._scrape_page_selenium(driver or self._get_fallback_driver(), page_url)
+            if page_products:
+                logger.warning("Selenium محصولاتی یافت که در HTML اولیه نبودند، مسیر HTTP برای بقیه صفحات غیرفعال شد")
+                self._http_disabled = True
+            return page_products
+        
+        return self._scrape_page_selenium(driver or self._get_fallback_driver(), page_url)
+    
+    def _scrape_page_http(self, page_url):
+        """
+        استخراج محصولات یک صفحه با HTTP و BeautifulSoup
+        
+        Args:
+            page_url (str): آدرس صفحه برای استخراج
+            
+        Returns:
+            list: لیستی از محصولات استخراج شده از این صفحه
+        """
+        try:
+            html_content = self._prefetched_html.pop(page_url, None)
+            if html_content is None:
+                html_content = self.http_engine.fetch(page_url)
+        except Exception as e:
+            logger.warning(f"خطا در دریافت صفحه {page_url} با HTTP: {e}")
+            return []
+        
+        page_products = self._extract_products_from_html(html_content, page_url)
+        logger.info(f"استخراج {len(page_products)} محصول از صفحه {page_url} با HTTP انجام شد")
+        return page_products
+    
+    def _extract_products_from_html(self, html_content, page_url):
+        """
+        استخراج محصولات از HTML صفحه
+        
+        Args:
+            html_content (str): متن HTML صفحه
+            page_url (str): آدرس صفحه
+            
+        Returns:
+            list: لیستی از محصولات استخراج شده
+        """
+        if self.structured_data:
+            page_products = self._extract_structured_products(html_content, page_url)
+            if page_products:
+                return page_products
+        
+        page_products = []
+        soup = parse_html(html_content, self.html_parser)
+        
+        for product_block in PRODUCT_BLOCK_SELECTOR.select(soup):
+            product_element = PRODUCT_NAME_SELECTOR.select_one(product_block)
+            price_element = PRODUCT_PRICE_SELECTOR.select_one(product_block)
+            if not product_element or not price_element:
+                logger.warning("خطا در استخراج اطلاعات محصول: نام یا قیمت یافت نشد")
+                continue
+            
+            product_name = product_element.get_text(" ", strip=True)
+            product_url = urljoin(page_url, product_element.get('href', ''))
+            price = price_element.get_text(" ", strip=True)
+            page_products.append(self._build_product(product_name, price, product_url, page_url))
+        
+        return page_products
+    
+    def _extract_structured_products(self, html_content, page_url):
+        """
+        استخراج محصولات از میکروفرمت‌ها و JSON-LD صفحه در یک عبور
+        
+        Args:
+            html_content (str): متن HTML صفحه
+            page_url (str): آدرس صفحه
+            
+        Returns:
+            list: لیستی از محصولات استخراج شده (خالی اگر داده ساخت‌یافته‌ای پیدا نشود)
+        """
+        try:
+            structured_products = extract_structured_products(html_content, STRUCTURED_DATA_PROFILE)
+        except Exception as e:
+            logger.warning(f"خطا در استخراج داده‌های ساخت‌یافته: {e}")
+            return []
+        
+        page_products = []
+        for structured_product in structured_products:
+            if not structured_product.get('price'):
+                logger.warning("خطا در استخراج اطلاعات محصول: نام یا قیمت یافت نشد")
+                continue
+            
+            product_name = ' '.join(structured_product['name'].split())
+            product_url = urljoin(page_url, structured_product.get('url') or '')
+            price = ' '.join(structured_product['price'].split())
+            page_products.append(self._build_product(product_name, price, product_url, page_url))
+        
+        return page_products
+    
+    def _extract_products_js(self, driver, page_url):
+        """
+        استخراج محصولات صفحه با یک فراخوانی JavaScript
+        
+        Args:
+            driver: WebDriver سلنیوم
+            page_url (str): آدرس صفحه
+            
+        Returns:
+            list: لیستی از محصولات یا None اگر اسکریپت اجرا نشد
+        """
+        raw_products = run_extraction_script(driver, PRODUCTS_SCRIPT)
+        if raw_products is None:
+            return None
+        
+        logger.info(f"تعداد {len(raw_products)} محصول در این صفحه یافت شد")
+        page_products = []
+        for raw_product in raw_products:
+            if not raw_product.get('name') or raw_product.get('price') is None:
+                logger.warning("خطا در استخراج اطلاعات محصول: نام یا قیمت یافت نشد")
+                continue
+            page_products.append(
+                self._build_product(raw_product['name'], raw_product['price'], raw_product.get('url'), page_url)
+            )
+        
+        return page_products
+    
+    def _build_product(self, product_name, price, product_url, page_url):
+        """
+        ساخت رکورد خام محصول (پاکسازی نام، برند و وزن در postprocess انجام می‌شود)
+        
+        Args:
+            product_name (str): نام کامل محصول
+            price (str): متن قیمت
+            product_url (str): آدرس محصول
+            page_url (str): آدرس صفحه
+            
+        Returns:
+            dict: فیلدهای خام محصول
+        """
+        return {
+            'name': product_name,
+            'price': price,
+            'url': product_url,
+            'page': page_url
+        }
+    
+    def _scrape_page_selenium(self, driver, page_url):
+        """
+        استخراج اطلاعات محصولات از یک صفحه با Selenium
+        
         Args:
             driver: WebDriver سلنیوم
             page_url (str): آدرس صفحه برای استخراج
@@ -92,10 +359,16 @@ class SpinneysMultiPageScraper:
             logger.info(f"در حال استخراج محصولات از صفحه: {page_url}")
             driver.get(page_url)
             
-            # منتظر بارگزاری محصولات شود
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".product-info"))
-            )
+            # منتظر بارگزاری محصولات شود (تا پایدار شدن تعداد محصولات)
+            if wait_for_dom_stable(driver, ".product-info", budget=10, scroll=False, cancel_event=self.cancel_event) == 0:
+                logger.warning(f"محصولی در صفحه {page_url} بارگذاری نشد")
+                return []
+            
+            if self.js_extraction:
+                js_products = self._extract_products_js(driver, page_url)
+                if js_products is not None:
+                    logger.info(f"استخراج {len(js_products)} محصول از صفحه {page_url} با JavaScript انجام شد")
+                    return js_products
             
             # یافتن همه بلوک‌های محصول
             product_blocks = driver.find_elements(By.CSS_SELECTOR, ".product-info")
@@ -112,20 +385,8 @@ class SpinneysMultiPageScraper:
                     price_element = product_block.find_element(By.CSS_SELECTOR, ".product-price .price")
                     price = price_element.text.strip()
                     
-                    # استخراج برند و وزن محصول از نام محصول
-                    brand = self._extract_brand(product_name)
-                    weight = self._extract_weight(product_name)
-                    
                     # اضافه کردن به لیست محصولات
-                    page_products.append({
-                        'product': self._clean_product_name(product_name),
-                        'brand': brand,
-                        'price': price,
-                        'weight': weight,
-                        'website': 'spinneys.com',
-                        'url': product_url,
-                        'page': page_url
-                    })
+                    page_products.append(self._build_product(product_name, price, product_url, page_url))
                     
                 except Exception as e:
                     logger.warning(f"خطا در استخراج اطلاعات محصول: {e}")
@@ -144,16 +405,12 @@ class SpinneysMultiPageScraper:
         """
         logger.info(f"شروع استخراج از URL: {self.base_url}")
         
-        # راه‌اندازی ChromeDriver
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # اجرا در حالت headless
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
-        driver = webdriver.Chrome(options=chrome_options)
+        # در حالت HTTP مرورگر فقط در صورت نیاز به fallback گرفته می‌شود
+        driver = None if self.http_engine is not None else self._acquire_driver()
         try:
             # رفتن به URL اصلی
-            driver.get(self.base_url)
+            if driver is not None:
+                driver.get(self.base_url)
             
             # استخراج تعداد کل صفحات
             total_pages = self.get_total_products_and_pages(driver)
@@ -164,120 +421,204 @@ class SpinneysMultiPageScraper:
                 
             logger.info(f"تعداد کل صفحات برای استخراج: {total_pages}")
             
-            # استخراج صفحه اول
-            first_page_products = self.scrape_page(driver, self.base_url)
-            self.products.extend(first_page_products)
+            # صفحات کامل شده در اجرای قبلی از checkpoint خوانده و دوباره دریافت نمی‌شوند
+            done_pages = self._restore_checkpoint(total_pages)
+            
+            if self.http_engine is not None:
+                # دریافت همه صفحات در یک انفجار همزمان، استخراج از HTML دریافت شده انجام می‌شود
+                self._prefetch_pages([self._get_page_url(page_num) for page_num in range(1, total_pages + 1)
+                                      if page_num not in done_pages])
+            
+            if self.workers > 1:
+                # حالت همزمان: تقسیم صفحات بین چند مرورگر و ادغام نتایج به ترتیب صفحه
+                pages = [(page_num, self._get_page_url(page_num)) for page_num in range(1, total_pages + 1)
+                         if page_num not in done_pages]
+                scrape_pages_concurrently(
+                    self.scrape_page, pages, self.workers,
+                    driver=driver,
+                    driver_pool=self.driver_pool,
+                    driver_factory=self._acquire_driver,
+                    page_delay=None if self.http_engine is not None else (2, 2),
+                    use_drivers=self.http_engine is None,
+                    on_page=lambda page_num, page_url, page_products: self._collect_page(page_products, page_num),
+                    cancel_event=self.cancel_event
+                )
+            else:
+                # استخراج صفحه اول
+                if 1 not in done_pages:
+                    first_page_products = self.scrape_page(driver, self.base_url)
+                    self._collect_page(first_page_products, 1)
             
-            # استخراج صفحات بعدی
-            for page_num in range(2, total_pages + 1):
-                # ساخت URL صفحه بعدی
-                page_url = f"{self.base_url}?page={page_num}"
+                # استخراج صفحات بعدی
+                for page_num in range(2, total_pages + 1):
+                    if page_num in done_pages:
+                        continue
+                    if self._is_cancelled():
+                        logger.info(f"استخراج به درخواست کاربر پیش از صفحه {page_num} متوقف شد")
+                        break
+                    
+                    # ساخت URL صفحه بعدی
+                    page_url = self._get_page_url(page_num)
                 
-                # استخراج صفحه
-                page_products = self.scrape_page(driver, page_url)
-                self.products.extend(page_products)
+                    # استخراج صفحه
+                    page_products = self.scrape_page(driver, page_url)
+                    self._collect_page(page_products, page_num)
                 
-                # وقفه کوتاه بین استخراج صفحات
-                time.sleep(2)
+                    # وقفه کوتاه بین استخراج صفحات (صفحات دریافت شده با HTTP نیازی به وقفه ندارند)
+                    if page_num < total_pages and self._get_page_url(page_num + 1) not in self._prefetched_html:
+                        time.sleep(2)
             
-            logger.info(f"استخراج تمام شد. تعداد کل محصولات استخراج شده: {len(self.products)}")
+            # صفحات خالی پس از استخراج کامل (مثلاً صفحات تخمینی اضافه) در اجرای بعدی دوباره دریافت نمی‌شوند
+            if self.checkpoint is not None and not self._is_cancelled():
+                self.checkpoint.finish()
+            logger.info(f"استخراج تمام شد. تعداد کل محصولات استخراج شده: {len(self.raw_products)}")
             
         except Exception as e:
             logger.error(f"خطا در استخراج صفحات: {e}")
         finally:
-            driver.quit()
+            if driver is not None:
+                self._release_driver(driver)
+            self._release_fallback_drivers()
+            self.postprocess()
     
-    def _extract_brand(self, product_name):
+    def _prefetch_pages(self, page_urls):
         """
-        استخراج برند از نام محصول
+        دریافت همزمان HTML صفحات با asyncio و نگه داشتن آن‌ها برای scrape_page
         
         Args:
-            product_name (str): نام کامل محصول
-            
-        Returns:
-            str: نام برند یا "N/A" اگر شناسایی نشود
+            page_urls (list): لیست آدرس صفحات
         """
-        # الگوی عمومی: اولین کلمه یا کلمات قبل از اولین space یا dash
-        first_word_match = re.match(r'^([\w\s]+?)[\s\-]', product_name)
-        if first_word_match:
-            return first_word_match.group(1).strip()
+        page_urls = [page_url for page_url in page_urls if page_url not in self._prefetched_html]
+        if not page_urls or self._is_cancelled():
+            return
         
-        # اگر نتوانستیم برند را استخراج کنیم
-        return "N/A"
+        logger.info(f"دریافت همزمان {len(page_urls)} صفحه با HTTP...")
+        fetcher = AsyncPageFetcher(http_engine=self.http_engine)
+        self._prefetched_html.update(fetcher.fetch_pages(page_urls, cancel_event=self.cancel_event))
     
-    def _extract_weight(self, product_name):
+    def _get_page_url(self, page_num):
         """
-        استخراج وزن/اندازه محصول از نام محصول
+        ساخت آدرس یک صفحه از دسته‌بندی
         
         Args:
-            product_name (str): نام کامل محصول
+            page_num (int): شماره صفحه
             
         Returns:
-            str: وزن یا اندازه محصول یا "N/A" اگر شناسایی نشود
+            str: آدرس صفحه
         """
-        # الگوهای مختلف برای وزن محصول
-        weight_patterns = [
-            r'(\d+[\.\d]*\s*(?:g|kg|ml|l|pcs|pieces|pack|x\d+))\b',
-            r'(\d+[\.\d]*\s*(?:G|KG|ML|L|PCS|PIECES|PACK|X\d+))\b',
-            r'(\d+[\.\d]*\s*(?:گرم|کیلوگرم|میلی لیتر|لیتر|عدد|بسته))\b'
-        ]
+        if page_num == 1:
+            return self.base_url
+        return f"{self.base_url}?page={page_num}"
+    
+    def _is_cancelled(self):
+        """
+        بررسی درخواست لغو استخراج
+        
+        Returns:
+            bool: True اگر استخراج لغو شده باشد
+        """
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def _acquire_driver(self):
+        """
+        گرفتن درایور از مخزن مشترک یا راه‌اندازی یک درایور اختصاصی
+        
+        Returns:
+            webdriver: آبجکت درایور سلنیوم
+        """
+        if self.driver_pool is not None:
+            return self.driver_pool.acquire()
         
-        for pattern in weight_patterns:
-            match = re.search(pattern, product_name, re.IGNORECASE)
-            if match:
-                return match.group(1)
+        # درایور اختصاصی با همان تنظیمات مشترک مخزن
+        return create_driver()
+    
+    def _get_fallback_driver(self):
+        """
+        گرفتن درایور Selenium برای fallback مسیر HTTP (یک درایور برای هر thread)
         
-        return "N/A"
+        Returns:
+            webdriver: آبجکت درایور سلنیوم
+        """
+        driver = getattr(self._fallback_local, 'driver', None)
+        if driver is None:
+            driver = self._acquire_driver()
+            self._fallback_local.driver = driver
+            with self._fallback_lock:
+                self._fallback_drivers.append(driver)
+        return driver
     
-    def _clean_product_name(self, product_name):
+    def _release_fallback_drivers(self):
+        """برگرداندن همه درایورهای fallback پس از پایان استخراج"""
+        with self._fallback_lock:
+            drivers = self._fallback_drivers
+            self._fallback_drivers = []
+            self._fallback_local = threading.local()
+        for driver in drivers:
+            self._release_driver(driver)
+    
+    def _release_driver(self, driver):
         """
-        پاکسازی نام محصول با حذف برند و وزن
+        برگرداندن درایور به مخزن یا بستن درایور اختصاصی
         
         Args:
-            product_name (str): نام کامل محصول
-            
-        Returns:
-            str: نام تمیز شده محصول
-        """
-        # حذف برند از ابتدای نام
-        brand = self._extract_brand(product_name)
-        if brand != "N/A":
-            # حذف برند از ابتدای نام محصول
-            clean_name = product_name.replace(brand, '', 1).strip()
-            # حذف کاراکترهای اضافی مثل - یا : بعد از حذف برند
-            clean_name = re.sub(r'^[\s\-:]+', '', clean_name)
+            driver: WebDriver سلنیوم
+        """
+        if self.driver_pool is not None:
+            self.driver_pool.release(driver)
         else:
-            clean_name = product_name
-            
-        # حذف وزن و اندازه از انتهای نام
-        weight_pattern = r'\b\d+\s*(?:g|kg|ml|l|pcs|pieces|pack|x)\b.*$'
-        clean_name = re.sub(weight_pattern, '', clean_name, flags=re.IGNORECASE).strip()
+            driver.quit()
+    
+    def _collect_page(self, page_products, page_num=None):
+        """افزودن محصولات خام یک صفحه، نوشتن نسخه پس‌پردازش شده آن در sink و ذخیره صفحه در checkpoint (در صورت وجود)"""
+        self.raw_products.extend(page_products)
+        if self.sink is not None and page_products:
+            self.sink.write_rows(normalize_products(page_products, 'spinneys').to_dict('records'))
+        if self.checkpoint is not None and page_num is not None:
+            self.checkpoint.record_page(page_num, page_products)
+    
+    def _restore_checkpoint(self, total_pages):
+        """
+        افزودن محصولات صفحات ذخیره شده در checkpoint بدون دریافت دوباره
         
-        # حذف whitespace اضافی
-        clean_name = re.sub(r'\s+', ' ', clean_name).strip()
+        Args:
+            total_pages (int): تعداد کل صفحات برای استخراج
+            
+        Returns:
+            set: شماره صفحاتی که نیازی به استخراج دوباره ندارند
+        """
+        if self.checkpoint is None:
+            return set()
+        self.checkpoint.start(total_pages)
+        done_pages = self.checkpoint.done_pages(total_pages)
+        # صفحات بازیابی شده قبلاً در sinkهای اجرای قبلی نوشته شده‌اند و فقط به محصولات خام اضافه می‌شوند
+        for page_num in sorted(done_pages):
+            if self.checkpoint.is_done(page_num):
+                self.raw_products.extend(self.checkpoint.load_page(page_num))
+        self.restored_product_count = len(self.raw_products)
+        if done_pages:
+            logger.info(f"{len(done_pages)} صفحه از {total_pages} صفحه از checkpoint {self.checkpoint.path} بازیابی شد")
+        return done_pages
+    
+    def postprocess(self):
+        """
+        یکسان‌سازی ستونی محصولات خام جمع‌آوری شده
         
-        return clean_name
+        Returns:
+            list: محصولات پس‌پردازش شده (در self.products هم قرار می‌گیرند)
+        """
+        self.products = normalize_products(self.raw_products, 'spinneys').to_dict('records')
+        return self.products
     
     def save_to_excel(self):
         """ذخیره داده‌ها در فایل اکسل"""
         logger.info("در حال ذخیره داده‌ها در فایل اکسل...")
         try:
-            # ایجاد DataFrame از محصولات استخراج شده
-            df = pd.DataFrame(self.products)
-            
             current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"shelfie_spinneys_products_{current_datetime}.xlsx"
-            writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-            df.to_excel(writer, index=False, sheet_name='Products')
-            
-            # تنظیم عرض ستون‌ها
-            workbook = writer.book
-            worksheet = writer.sheets['Products']
-            for i, col in enumerate(df.columns):
-                column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, column_width)
-            
-            writer.close()
+            # نوشتن ردیف به ردیف در حالت constant_memory (بدون ساخت DataFrame)
+            if not write_products(filename, self.products):
+                logger.warning("محصولی برای ذخیره در فایل اکسل وجود ندارد")
+                return None
             logger.info(f"داده‌ها در فایل {filename} ذخیره شدند")
             return filename
         except Exception as e:
@@ -292,6 +633,8 @@ if __name__ == "__main__":
                         help='آدرس URL دسته‌بندی محصولات برای استخراج')
     parser.add_argument('--pages', type=int, 
                         help='تعداد صفحاتی که می‌خواهید استخراج کنید (اختیاری، پیش‌فرض: همه صفحات)')
+    parser.add_argument('--checkpoint', type=str,
+                        help='پوشه checkpoint؛ اجرای دوباره با همان پوشه از اولین صفحه استخراج نشده ادامه می‌دهد (اختیاری)')
     
     # پارس کردن آرگومان‌ها
     args = parser.parse_args()
@@ -303,7 +646,8 @@ if __name__ == "__main__":
         logger.info(f"شروع استخراج تمام صفحات از {args.url}")
     
     # ایجاد اسکریپر با پارامترهای مشخص شده
-    scraper = SpinneysMultiPageScraper(args.url, args.pages)
+    checkpoint = ScrapeCheckpoint(args.checkpoint, args.url) if args.checkpoint else None
+    scraper = SpinneysMultiPageScraper(args.url, args.pages, checkpoint=checkpoint)
     scraper.scrape_all_pages()
     
     # ذخیره داده‌ها در فایل اکسل
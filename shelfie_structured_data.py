@@ -0,0 +1,249 @@
+"""
+Shelfie - استخراج محصولات از داده‌های ساخت‌یافته صفحه (میکروفرمت hProduct، microdata و JSON-LD)
+سند فقط یک بار به صورت جریانی (بدون ساخت درخت و بدون اجرای سلکتور) پیمایش می‌شود:
+ریشه هر محصول با کلاس‌های میکروفرمت یا itemtype شناسایی می‌شود، فیلدهای نام، قیمت،
+آدرس، تصویر و برند در همان عبور خوانده می‌شوند و محصولات داخل بخش‌های مستثنی (مثل
+سایدبار) با نگه داشتن عمق همان بخش کنار گذاشته می‌شوند. بلوک‌های JSON-LD هم در همین
+عبور جمع‌آوری می‌شوند و وقتی میکروفرمتی پیدا نشود استفاده می‌شوند.
+"""
+
+import json
+import logging
+import os
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+# فعال بودن استخراج از داده‌های ساخت‌یافته به صورت پیش‌فرض (0 برای استفاده از سلکتورها)
+DEFAULT_STRUCTURED_DATA = os.environ.get('SHELFIE_STRUCTURED_DATA', '1') != '0'
+
+# المان‌هایی که تگ پایانی ندارند
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+
+# مقادیر پیش‌فرض پروفایل یک فروشگاه
+DEFAULT_PROFILE = {
+    'root_classes': {'hproduct', 'h-product'},
+    'name_classes': {'fn', 'p-name'},
+    'price_classes': {'price', 'p-price'},
+    'photo_classes': {'photo', 'u-photo'},
+    'brand_classes': {'brand', 'p-brand'},
+    'url_classes': {'url', 'u-url'},
+    'exclude_ids': set(),
+    'exclude_classes': set()
+}
+
+
+class _StructuredDataHandler:
+    """
+    دریافت رویدادهای start/data/end پارسر و ساخت لیست محصولات
+    (رابط target پارسر lxml)
+    """
+
+    def __init__(self, profile):
+        self.profile = dict(DEFAULT_PROFILE)
+        self.profile.update(profile or {})
+        self.stack = []
+        self.exclude_depth = None
+        self.current = None
+        self.field = None
+        self.json_ld_depth = None
+        self.json_ld_buffer = []
+        self.json_ld_blocks = []
+        self.products = []
+
+    def start(self, tag, attrs):
+        depth = len(self.stack)
+        self.stack.append(tag)
+        profile = self.profile
+        classes = set((attrs.get('class') or '').split())
+
+        if self.exclude_depth is None and (
+                attrs.get('id') in profile['exclude_ids'] or classes & profile['exclude_classes']):
+            self.exclude_depth = depth
+
+        if tag == 'script' and (attrs.get('type') or '').lower() == 'application/ld+json':
+            self.json_ld_depth = depth
+            self.json_ld_buffer = []
+            return
+
+        if self.exclude_depth is not None:
+            return
+
+        itemprop = attrs.get('itemprop')
+        if self.current is None:
+            if classes & profile['root_classes'] or (attrs.get('itemtype') or '').endswith('/Product'):
+                self.current = {'depth': depth, 'name': None, 'price': None, 'brand': None, 'url': None, 'image': None}
+            return
+
+        current = self.current
+        if self.field is None:
+            for field in ('name', 'price', 'brand'):
+                if current[field] is None and (classes & profile[f'{field}_classes'] or itemprop == field):
+                    if itemprop == field and attrs.get('content'):
+                        current[field] = attrs['content'].strip()
+                    else:
+                        self.field = (field, depth, [])
+                    break
+
+        if tag == 'a' and current['url'] is None and attrs.get('href') and (
+                (self.field is not None and self.field[0] == 'name')
+                or classes & profile['url_classes'] or itemprop == 'url'):
+            current['url'] = attrs['href']
+
+        if tag == 'img' and current['image'] is None and (classes & profile['photo_classes'] or itemprop == 'image'):
+            current['image'] = attrs.get('src') or attrs.get('data-src')
+
+    def data(self, text):
+        if self.json_ld_depth is not None:
+            self.json_ld_buffer.append(text)
+        elif self.field is not None:
+            self.field[2].append(text)
+
+    def end(self, tag):
+        # بستن المان‌های باز تا رسیدن به تگ متناظر (تگ‌های پایانی بی‌جفت نادیده گرفته می‌شوند)
+        if tag not in self.stack:
+            return
+        while self.stack:
+            closed = self.stack.pop()
+            self._close(len(self.stack))
+            if closed == tag:
+                break
+
+    def _close(self, depth):
+        if self.field is not None and depth == self.field[1]:
+            field, _, buffer = self.field
+            text = ''.join(buffer).strip()
+            if text:
+                self.current[field] = text
+            self.field = None
+
+        if self.json_ld_depth == depth:
+            self.json_ld_blocks.append(''.join(self.json_ld_buffer))
+            self.json_ld_depth = None
+
+        if self.current is not None and depth == self.current['depth']:
+            if self.current['name']:
+                self.products.append({key: value for key, value in self.current.items() if key != 'depth'})
+            self.current = None
+            self.field = None
+
+        if self.exclude_depth == depth:
+            self.exclude_depth = None
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.products
+
+
+class _HTMLParserAdapter(HTMLParser):
+    """ارسال رویدادهای html.parser به handler (وقتی lxml نصب نیست)"""
+
+    def __init__(self, handler):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+        if tag in VOID_ELEMENTS:
+            self.handler.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+        self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data)
+
+
+def _iter_json_ld_products(node):
+    """یافتن همه اشیاء Product در یک سند JSON-LD (شامل @graph و ItemList)"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            node_type = node.get('@type')
+            types = node_type if isinstance(node_type, list) else [node_type]
+            if 'Product' in types:
+                yield node
+            else:
+                stack.extend(reversed([value for value in node.values() if isinstance(value, (dict, list))]))
+
+
+def _json_ld_product(item):
+    """تبدیل یک شیء Product در JSON-LD به فیلدهای محصول"""
+    offers = item.get('offers') or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    price = offers.get('price', offers.get('lowPrice')) if isinstance(offers, dict) else None
+    currency = offers.get('priceCurrency', '') if isinstance(offers, dict) else ''
+
+    brand = item.get('brand')
+    if isinstance(brand, dict):
+        brand = brand.get('name')
+
+    image = item.get('image')
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get('url')
+
+    return {
+        'name': str(item.get('name') or '').strip(),
+        'price': f"{currency} {price}".strip() if price not in (None, '') else None,
+        'brand': brand if isinstance(brand, str) else None,
+        'url': item.get('url'),
+        'image': image if isinstance(image, str) else None
+    }
+
+
+def extract_structured_products(html_content, profile=None):
+    """
+    استخراج محصولات از داده‌های ساخت‌یافته صفحه در یک عبور
+
+    Args:
+        html_content (str): متن HTML صفحه
+        profile (dict, optional): کلاس‌های ریشه و فیلدهای فروشگاه (root_classes، name_classes،
+            price_classes، photo_classes، brand_classes، url_classes، exclude_ids، exclude_classes)
+
+    Returns:
+        list: لیست دیکشنری‌های خام با کلیدهای name، price، brand، url و image به ترتیب صفحه
+    """
+    handler = _StructuredDataHandler(profile)
+    if etree is not None:
+        parser = etree.HTMLParser(target=handler)
+        parser.feed(html_content)
+        parser.close()
+    else:
+        parser = _HTMLParserAdapter(handler)
+        parser.feed(html_content)
+        parser.close()
+
+    if handler.products:
+        return handler.products
+
+    products = []
+    for block in handler.json_ld_blocks:
+        try:
+            document = json.loads(block)
+        except ValueError as e:
+            logger.debug(f"بلوک JSON-LD قابل پارس نیست: {e}")
+            continue
+        for item in _iter_json_ld_products(document):
+            product = _json_ld_product(item)
+            if product['name']:
+                products.append(product)
+    return products
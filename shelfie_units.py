@@ -0,0 +1,139 @@
+"""
+Shelfie - تشخیص و یکسان‌سازی وزن، حجم و تعداد محصولات
+یک الگوی از پیش کامپایل شده مقدار و واحد را از نام محصول پیدا می‌کند (مثل 500g، 1.5 L،
+6 x 200ml یا 12 عدد) و خروجی عددی آن را برمی‌گرداند: مقدار، واحد، واحد پایه (g، ml یا
+count)، مقدار بر حسب واحد پایه و تعداد بسته‌ها. parse_quantities همین کار را برای یک
+ستون کامل با عملیات رشته‌ای pandas انجام می‌دهد.
+"""
+
+import re
+from collections import namedtuple
+import pandas as pd
+
+# نام‌های هر واحد: (واحد استاندارد، واحد پایه، ضریب تبدیل به واحد پایه)
+UNITS = {
+    'mg': ('mg', 'g', 0.001),
+    'g': ('g', 'g', 1), 'gm': ('g', 'g', 1), 'gms': ('g', 'g', 1), 'gr': ('g', 'g', 1), 'grm': ('g', 'g', 1),
+    'gram': ('g', 'g', 1), 'grams': ('g', 'g', 1), 'gramme': ('g', 'g', 1), 'grammes': ('g', 'g', 1),
+    'گرم': ('g', 'g', 1),
+    'kg': ('kg', 'g', 1000), 'kgs': ('kg', 'g', 1000), 'kilo': ('kg', 'g', 1000), 'kilos': ('kg', 'g', 1000),
+    'kilogram': ('kg', 'g', 1000), 'kilograms': ('kg', 'g', 1000), 'کیلوگرم': ('kg', 'g', 1000),
+    'کیلو': ('kg', 'g', 1000),
+    'oz': ('oz', 'g', 28.3495), 'ounce': ('oz', 'g', 28.3495), 'ounces': ('oz', 'g', 28.3495),
+    'lb': ('lb', 'g', 453.592), 'lbs': ('lb', 'g', 453.592), 'pound': ('lb', 'g', 453.592),
+    'pounds': ('lb', 'g', 453.592),
+    'ml': ('ml', 'ml', 1), 'mls': ('ml', 'ml', 1), 'milliliter': ('ml', 'ml', 1), 'milliliters': ('ml', 'ml', 1),
+    'millilitre': ('ml', 'ml', 1), 'millilitres': ('ml', 'ml', 1), 'میلی لیتر': ('ml', 'ml', 1),
+    'cl': ('cl', 'ml', 10),
+    'l': ('l', 'ml', 1000), 'lt': ('l', 'ml', 1000), 'ltr': ('l', 'ml', 1000), 'ltrs': ('l', 'ml', 1000),
+    'liter': ('l', 'ml', 1000), 'liters': ('l', 'ml', 1000), 'litre': ('l', 'ml', 1000),
+    'litres': ('l', 'ml', 1000), 'لیتر': ('l', 'ml', 1000),
+    'fl oz': ('fl oz', 'ml', 29.5735),
+    'pc': ('pcs', 'count', 1), 'pcs': ('pcs', 'count', 1), 'piece': ('pcs', 'count', 1),
+    'pieces': ('pcs', 'count', 1), 'pack': ('pack', 'count', 1), 'packs': ('pack', 'count', 1),
+    'pk': ('pack', 'count', 1), 'pkt': ('pack', 'count', 1), 'عدد': ('pcs', 'count', 1),
+    'بسته': ('pack', 'count', 1)
+}
+
+# نام‌های طولانی‌تر اول می‌آیند تا مثلاً kg پیش از g و liters پیش از l امتحان شود
+_UNIT_ALTERNATIVES = '|'.join(
+    re.escape(alias).replace(r'\ ', r'[\s\u200c]*') for alias in sorted(UNITS, key=len, reverse=True)
+)
+
+# [تعداد x] مقدار واحد [x تعداد]؛ عدد نباید ادامه عدد دیگری باشد و واحد نباید ادامه کلمه‌ای دیگر
+QUANTITY_PATTERN = re.compile(
+    r'(?P<text>(?<![\d.,])(?:(?P<pack_before>\d+)\s*[x×]\s*)?'
+    r'(?P<value>\d+(?:\.\d+)?)\s*-?\s*(?P<unit>' + _UNIT_ALTERNATIVES + r')(?![^\W\d_])'
+    r'(?:\s*[x×]\s*(?P<pack_after>\d+)(?![\d.]))?)',
+    re.IGNORECASE
+)
+
+# مقدار تشخیص داده شده در نام محصول
+Quantity = namedtuple('Quantity', [
+    'text', 'quantity', 'unit', 'base_unit', 'base_quantity', 'pack_count', 'total_base_quantity', 'start', 'end'
+])
+
+# ستون‌های خروجی parse_quantities
+QUANTITY_COLUMNS = [
+    'weight', 'quantity', 'unit', 'base_unit', 'base_quantity', 'pack_count', 'total_base_quantity'
+]
+
+
+def _unit_key(unit_text):
+    """کلید جدول واحدها برای متن واحد (حروف کوچک و یک فاصله بین کلمات)"""
+    return re.sub(r'[\s\u200c]+', ' ', unit_text.lower())
+
+
+def parse_quantity(text):
+    """
+    تشخیص اولین مقدار و واحد در یک متن
+
+    Args:
+        text (str): نام محصول یا متن اندازه
+
+    Returns:
+        Quantity: مقدار تشخیص داده شده، یا None اگر مقداری پیدا نشود
+    """
+    if not text:
+        return None
+    match = QUANTITY_PATTERN.search(text)
+    if not match:
+        return None
+
+    unit, base_unit, factor = UNITS[_unit_key(match.group('unit'))]
+    quantity = float(match.group('value'))
+    pack_count = int(match.group('pack_before') or match.group('pack_after') or 1)
+    base_quantity = quantity * factor
+    return Quantity(
+        text=match.group('text'),
+        quantity=quantity,
+        unit=unit,
+        base_unit=base_unit,
+        base_quantity=base_quantity,
+        pack_count=pack_count,
+        total_base_quantity=base_quantity * pack_count,
+        start=match.start(),
+        end=match.end()
+    )
+
+
+def parse_quantities(values):
+    """
+    تشخیص مقدار و واحد برای یک ستون کامل
+
+    Args:
+        values (pandas.Series | list): نام‌های محصولات
+
+    Returns:
+        pandas.DataFrame: ستون‌های weight (متن یافت شده)، quantity، unit، base_unit،
+            base_quantity، pack_count و total_base_quantity با همان index ورودی
+            (برای نام‌های بدون مقدار NaN یا None)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    parts = series.astype('string').str.extract(QUANTITY_PATTERN)
+
+    unit_keys = parts['unit'].str.lower().str.replace(r'[\s\u200c]+', ' ', regex=True)
+    quantity = pd.to_numeric(parts['value']).astype('float64')
+    factor = unit_keys.map({alias: unit[2] for alias, unit in UNITS.items()}).astype('float64')
+    pack_count = pd.to_numeric(parts['pack_before'].fillna(parts['pack_after'])).astype('float64')
+    pack_count = pack_count.fillna(1).where(quantity.notna())
+    base_quantity = quantity * factor
+    found = quantity.notna()
+
+    result = pd.DataFrame({
+        'weight': parts['text'].astype(object).where(found, None),
+        'quantity': quantity,
+        'unit': unit_keys.map({alias: unit[0] for alias, unit in UNITS.items()}).astype(object).where(found, None),
+        'base_unit': unit_keys.map({alias: unit[1] for alias, unit in UNITS.items()}).astype(object).where(found, None),
+        'base_quantity': base_quantity,
+        'pack_count': pack_count.astype('Int64'),
+        'total_base_quantity': base_quantity * pack_count
+    }, index=series.index)
+    return result[QUANTITY_COLUMNS]
+
+
+def remove_quantity(text, quantity):
+    """حذف محدوده مقدار از متن همراه با جداکننده‌های چسبیده به آن (خط تیره، پرانتز و کاما)"""
+    before = text[:quantity.start].rstrip(' -(,')
+    after = text[quantity.end:].lstrip(' -),')
+    return re.sub(r'\s+', ' ', f"{before} {after}").strip()
@@ -0,0 +1,105 @@
+"""
+Shelfie - انتظار تطبیقی برای پایدار شدن صفحه
+به جای تاخیرهای ثابت و حلقه‌های اسکرول، صفحه به صورت دوره‌ای بررسی می‌شود و به محض
+اینکه تعداد محصولات، ارتفاع صفحه و تعداد المان‌های DOM برای چند بررسی پشت سر هم
+تغییر نکنند، انتظار تمام می‌شود (حتی اگر صفحه هیچ محصولی نداشته باشد). هر صفحه یک سقف
+زمانی ثابت دارد.
+"""
+
+import logging
+import os
+import time
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# حداکثر زمان انتظار برای هر صفحه بر حسب ثانیه (قابل تنظیم با متغیر محیطی)
+DEFAULT_PAGE_WAIT_BUDGET = float(os.environ.get('SHELFIE_PAGE_WAIT_BUDGET', 15))
+
+# فاصله بین دو بررسی صفحه بر حسب ثانیه
+DEFAULT_POLL_INTERVAL = float(os.environ.get('SHELFIE_DOM_POLL_INTERVAL', 0.25))
+
+# تعداد بررسی‌های پشت سر هم بدون تغییر برای پایدار دانستن صفحه
+DEFAULT_STABLE_POLLS = int(os.environ.get('SHELFIE_DOM_STABLE_POLLS', 3))
+
+# یک رفت و برگشت WebDriver برای هر بررسی: اسکرول یک صفحه به پایین و گرفتن وضعیت DOM
+_SNAPSHOT_SCRIPT = """
+var selector = arguments[0];
+var scroll = arguments[1];
+if (scroll) {
+    window.scrollBy(0, Math.max(window.innerHeight, 400));
+}
+var height = document.body ? document.body.scrollHeight : 0;
+return {
+    count: selector ? document.querySelectorAll(selector).length : 0,
+    height: height,
+    nodes: document.getElementsByTagName('*').length,
+    atBottom: window.scrollY + window.innerHeight >= height - 2,
+    ready: document.readyState
+};
+"""
+
+
+def wait_for_dom_stable(driver, product_selector=None, budget=DEFAULT_PAGE_WAIT_BUDGET,
+                        poll_interval=DEFAULT_POLL_INTERVAL, stable_polls=DEFAULT_STABLE_POLLS,
+                        scroll=True, min_count=None, cancel_event=None):
+    """
+    انتظار تا پایدار شدن صفحه یا تمام شدن سقف زمانی
+
+    صفحه وقتی پایدار است که بارگذاری سند تمام شده باشد، (در حالت اسکرول) به انتهای صفحه
+    رسیده باشیم و تعداد محصولات، ارتفاع صفحه و تعداد المان‌ها برای stable_polls بررسی پشت
+    سر هم ثابت مانده باشند. صفحه‌ای که پایدار شده و محصولی ندارد (مثلاً صفحه خالی انتهای
+    دسته‌بندی) هم بدون انتظار تا سقف زمانی برمی‌گردد، مگر اینکه min_count داده شده باشد.
+
+    Args:
+        driver: WebDriver سلنیوم
+        product_selector (str, optional): سلکتور CSS محصولات صفحه
+        budget (float): حداکثر زمان انتظار (ثانیه)
+        poll_interval (float): فاصله بین دو بررسی (ثانیه)
+        stable_polls (int): تعداد بررسی‌های بدون تغییر لازم
+        scroll (bool): اسکرول تدریجی به پایین برای بارگذاری محصولات lazy
+        min_count (int, optional): حداقل تعداد محصول لازم برای پایدار دانستن صفحه
+        cancel_event (threading.Event, optional): با فعال شدن آن انتظار فوراً تمام می‌شود
+
+    Returns:
+        int: تعداد محصولات یافت شده با product_selector در آخرین بررسی
+    """
+    start_time = time.time()
+    deadline = start_time + budget
+    last_signature = None
+    unchanged = 0
+    snapshot = {}
+
+    while True:
+        try:
+            snapshot = driver.execute_script(_SNAPSHOT_SCRIPT, product_selector, scroll) or {}
+        except WebDriverException as e:
+            logger.debug(f"خطا در بررسی وضعیت صفحه: {e}")
+            snapshot = {}
+
+        count = snapshot.get('count') or 0
+        signature = (count, snapshot.get('height'), snapshot.get('nodes'))
+        settled = (
+            snapshot.get('ready') == 'complete'
+            and (not scroll or snapshot.get('atBottom'))
+            and (min_count is None or count >= min_count)
+        )
+
+        if settled and signature == last_signature:
+            unchanged += 1
+        else:
+            unchanged = 0
+        last_signature = signature
+
+        if unchanged >= stable_polls:
+            logger.info(f"صفحه پس از {time.time() - start_time:.2f} ثانیه پایدار شد ({count} محصول)")
+            return count
+
+        if time.time() >= deadline:
+            logger.warning(f"صفحه در سقف {budget:.0f} ثانیه پایدار نشد ({count} محصول)")
+            return count
+
+        if cancel_event is not None and cancel_event.is_set():
+            return count
+
+        time.sleep(poll_interval)
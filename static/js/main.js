@@ -104,6 +104,9 @@ const defaultURLs = {
 // متغیرهای سراسری
 let isRunning = false;
 let statusInterval = null;
+let eventSource = null;
+let logCursor = 0;
+let currentJobId = null;
 let toast = null;
 
 // رویدادهای DOMContentLoaded
@@ -235,6 +238,9 @@ function startScraping() {
         formData.append('max_pages', maxPages);
     }
     
+    // تعداد مرورگرهای همزمان
+    formData.append('workers', document.getElementById('workers').value || 1);
+    
     // چندین دسته‌بندی
     const useMultiCategory = document.getElementById('multi_category').checked;
     formData.append('use_multi_category', useMultiCategory);
@@ -261,6 +267,7 @@ function startScraping() {
     .then(data => {
         if (data.status === 'success') {
             // نمایش وضعیت استخراج
+            currentJobId = data.job_id;
             isRunning = true;
             updateUI(true);
             
@@ -278,8 +285,17 @@ function startScraping() {
     });
 }
 
-// شروع بررسی دوره‌ای وضعیت
+// شروع دریافت وضعیت: جریان رویدادهای سرور (SSE) و در صورت پشتیبانی نشدن، بررسی دوره‌ای
 function startStatusPolling() {
+    stopStatusUpdates();
+    logCursor = 0;
+    document.getElementById('log-container').innerHTML = '';
+    
+    if (window.EventSource && currentJobId) {
+        startEventStream();
+        return;
+    }
+    
     // ابتدا وضعیت فعلی را دریافت می‌کنیم
     fetchStatus();
     
@@ -287,30 +303,80 @@ function startStatusPolling() {
     statusInterval = setInterval(fetchStatus, 2000);
 }
 
-// دریافت وضعیت فعلی از سرور
+// توقف جریان رویدادها و بررسی دوره‌ای
+function stopStatusUpdates() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    if (statusInterval) {
+        clearInterval(statusInterval);
+        statusInterval = null;
+    }
+}
+
+// دریافت پیشرفت و لاگ‌های جدید کار از جریان رویدادهای سرور
+function startEventStream() {
+    eventSource = new EventSource(`/jobs/${currentJobId}/events?since=${logCursor}`);
+    
+    eventSource.addEventListener('status', event => {
+        handleStatus(JSON.parse(event.data));
+    });
+    
+    eventSource.addEventListener('log', event => {
+        const data = JSON.parse(event.data);
+        appendLogs(data.logs);
+        logCursor = data.log_cursor;
+    });
+    
+    eventSource.addEventListener('end', () => {
+        stopStatusUpdates();
+    });
+    
+    eventSource.onerror = () => {
+        // پس از اتصال دوباره، مرورگر آخرین cursor را در Last-Event-ID می‌فرستد
+        console.error('Event stream connection lost, reconnecting...');
+    };
+}
+
+// دریافت وضعیت فعلی از سرور (فقط لاگ‌های پس از آخرین cursor)
 function fetchStatus() {
-    fetch('/status')
+    const params = new URLSearchParams({since: logCursor});
+    if (currentJobId) {
+        params.set('job_id', currentJobId);
+    }
+    fetch(`/status?${params}`)
     .then(response => response.json())
     .then(data => {
-        updateStatusUI(data);
-        
-        // اگر استخراج تمام شده، توقف بررسی
-        if (!data.scraper_running && isRunning) {
-            isRunning = false;
-            updateUI(false);
-            clearInterval(statusInterval);
-        }
-        
-        // نمایش اعلان موفقیت
-        if (data.show_notification) {
-            showNotification(data.notification_message, 'success');
-        }
+        appendLogs(data.logs);
+        logCursor = data.log_cursor;
+        handleStatus(data);
     })
     .catch(error => {
         console.error('Error fetching status:', error);
     });
 }
 
+// اعمال وضعیت دریافت شده (از SSE یا بررسی دوره‌ای)
+function handleStatus(data) {
+    updateStatusUI(data);
+    
+    // اگر استخراج تمام شده، توقف بررسی
+    if (!data.scraper_running && isRunning && data.status !== 'queued') {
+        isRunning = false;
+        updateUI(false);
+        if (statusInterval) {
+            clearInterval(statusInterval);
+            statusInterval = null;
+        }
+    }
+    
+    // نمایش اعلان موفقیت
+    if (data.show_notification) {
+        showNotification(data.notification_message, 'success');
+    }
+}
+
 // به‌روزرسانی رابط کاربری بر اساس وضعیت استخراج
 function updateStatusUI(data) {
     // به‌روزرسانی پیشرفت
@@ -339,9 +405,6 @@ function updateStatusUI(data) {
         progressStatus.className = 'alert alert-danger';
     }
     
-    // به‌روزرسانی لاگ‌ها
-    updateLogs(data.logs);
-    
     // به‌روزرسانی نتایج
     if (data.product_count > 0) {
         document.getElementById('product-count').textContent = data.product_count;
@@ -358,15 +421,21 @@ function updateStatusUI(data) {
         document.getElementById('download-container').style.display = 'block';
         document.getElementById('success-message').textContent = `فایل اکسل با موفقیت ذخیره شد: ${data.output_file}`;
         document.getElementById('excel-download').href = `/download/${data.output_file}`;
+        if (data.job_id) {
+            document.getElementById('csv-download').href = `/download_csv?job_id=${data.job_id}`;
+        }
     }
 }
 
-// به‌روزرسانی لاگ‌ها
-function updateLogs(logs) {
+// افزودن لاگ‌های جدید به انتهای لیست
+function appendLogs(logs) {
     if (!logs || logs.length === 0) return;
     
     const logContainer = document.getElementById('log-container');
-    logContainer.innerHTML = '';
+    const placeholder = logContainer.querySelector('.text-muted');
+    if (placeholder) {
+        placeholder.remove();
+    }
     
     logs.forEach(log => {
         const logEntry = document.createElement('div');
@@ -463,7 +532,7 @@ function updateUI(running) {
 
 // پاک کردن لاگ‌ها
 function clearLogs() {
-    fetch('/clear_logs', {
+    fetch(currentJobId ? `/clear_logs?job_id=${currentJobId}` : '/clear_logs', {
         method: 'POST'
     })
     .then(response => response.json())
@@ -0,0 +1,24 @@
+"""تنظیمات مشترک تست‌ها: ماژول‌های پروژه از ریشه مخزن import می‌شوند"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def flask_app(tmp_path, monkeypatch):
+    """
+    ماژول shelfie_flask با کش خروجی در پوشه موقت و بدون گرم کردن مخزن مرورگرها
+    (هر تست مدیر کارهای خودش را با monkeypatch روی job_manager قرار می‌دهد)
+    """
+    import shelfie_flask
+    from shelfie_exports import ExportCache
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(shelfie_flask, '_driver_pool_warmed', True)
+    monkeypatch.setattr(shelfie_flask, 'export_cache', ExportCache(root=str(tmp_path / 'exports')))
+    shelfie_flask.app.config['TESTING'] = True
+    return shelfie_flask
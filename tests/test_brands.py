@@ -0,0 +1,52 @@
+"""تست فهرست مشترک برندها"""
+
+import pytest
+
+from shelfie_brands import BrandIndex, remove_brand
+
+BRANDS = ['Al Ain', 'Al Ain Farms', 'Ain', 'Nido', 'Lulu', 'Dove']
+
+
+@pytest.fixture(scope='module')
+def index():
+    return BrandIndex(BRANDS + ['nido', ' '])
+
+
+@pytest.mark.parametrize('name, expected', [
+    # طولانی‌ترین تطابق برنده است
+    ('Al Ain Farms Fresh Milk 1L', ('Al Ain Farms', 0, 12)),
+    ('Al Ain Water 500ml', ('Al Ain', 0, 6)),
+    # بدون حساسیت به حروف بزرگ و کوچک، با املای فهرست در خروجی
+    ('NIDO Fortified Milk 2.25kg', ('Nido', 0, 4)),
+    ('Fresh Milk by lulu', ('Lulu', 14, 18)),
+    # در تساوی طول، اولین تطابق
+    ('Dove Soap with Nido', ('Dove', 0, 4)),
+])
+def test_find_returns_longest_match(index, name, expected):
+    assert tuple(index.find(name)) == expected
+
+
+@pytest.mark.parametrize('name', [
+    # برند کوتاه داخل کلمه دیگر پیدا نمی‌شود
+    'Rainbow Cake',
+    'Lulumart Special Rice',
+    'Doves Chocolate',
+    '',
+    None,
+])
+def test_find_only_matches_whole_words(index, name):
+    assert index.find(name) is None
+
+
+def test_brand_next_to_punctuation(index):
+    assert tuple(index.find('Frozen Peas (Nido)')) == ('Nido', 13, 17)
+    assert index.find('Nido-Milk').brand == 'Nido'
+
+
+def test_duplicate_and_blank_brands_are_skipped(index):
+    assert index.brands == BRANDS
+
+
+def test_remove_brand(index):
+    name = 'Al Ain Farms - Fresh Milk 1L'
+    assert remove_brand(name, index.find(name)) == 'Fresh Milk 1L'
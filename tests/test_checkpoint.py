@@ -0,0 +1,122 @@
+"""تست‌های checkpoint و ادامه استخراج قطع شده"""
+
+import threading
+import time
+import types
+
+import pytest
+
+import almeera_scraper
+import shelfie_name_cache
+from shelfie_checkpoint import JobCheckpoint, ScrapeCheckpoint
+
+CATEGORY_URL = 'https://almeera.online/frozen-food'
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """اجرا در پوشه موقت، بدون کش نام و بدون تاخیر بین صفحات"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(shelfie_name_cache, 'DEFAULT_NAME_CACHE_PATH', '0')
+    monkeypatch.setattr(almeera_scraper, 'time', types.SimpleNamespace(sleep=lambda seconds: None, time=time.time))
+
+
+class RecordingSink:
+    """sink ساختگی که ردیف‌های نوشته شده را نگه می‌دارد"""
+
+    def __init__(self):
+        self.rows = []
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+
+
+def run_scraper(checkpoint, total_pages, product_pages, cancel_after=None, sink=None):
+    """
+    استخراج یک دسته‌بندی با صفحات ساختگی
+
+    Args:
+        checkpoint (ScrapeCheckpoint): checkpoint دسته‌بندی
+        total_pages (int): تعداد صفحاتی که اسکرپر تشخیص می‌دهد
+        product_pages (int): تعداد صفحاتی که واقعاً محصول دارند
+        cancel_after (int, optional): لغو استخراج پس از این تعداد صفحه
+        sink (optional): مقصد نوشتن جریانی محصولات
+
+    Returns:
+        tuple: (اسکرپر، شماره صفحات دریافت شده)
+    """
+    cancel_event = threading.Event()
+    scraper = almeera_scraper.AlmeeraMultiPageScraper(
+        CATEGORY_URL, cancel_event=cancel_event, http_engine=object(), checkpoint=checkpoint, sink=sink)
+    scraper.get_total_products_and_pages = lambda driver: total_pages
+    scraper._prefetch_pages = lambda page_urls: None
+    fetched = []
+
+    def scrape_page(driver, page_url):
+        page_num = scraper._page_number(page_url)
+        fetched.append(page_num)
+        if cancel_after and len(fetched) >= cancel_after:
+            cancel_event.set()
+        if page_num > product_pages:
+            return []
+        return [{'name': f'Sadia Chicken {page_num}-{index} 900g', 'price': 'QAR 12.50',
+                 'url': f'https://almeera.online/p{page_num}-{index}', 'page': page_url} for index in range(3)]
+
+    scraper._scrape_page_with_retry = scrape_page
+    scraper.scrape_all_pages()
+    return scraper, fetched
+
+
+def test_padded_page_count_completes_checkpoint():
+    """صفحات خالی انتهای دسته‌بندی (تعداد صفحات تخمینی) checkpoint را ناتمام نگه نمی‌دارند"""
+    job_checkpoint = JobCheckpoint('0123abcd', root='checkpoints')
+    scraper, fetched = run_scraper(job_checkpoint.for_url(CATEGORY_URL), total_pages=10, product_pages=2)
+
+    assert fetched == list(range(1, 11))
+    assert len(scraper.products) == 6
+    assert job_checkpoint.is_complete()
+    assert job_checkpoint.missing_pages() == {}
+
+    # ادامه یک checkpoint کامل هیچ صفحه‌ای را دوباره دریافت نمی‌کند
+    resumed, fetched = run_scraper(JobCheckpoint('0123abcd', root='checkpoints').for_url(CATEGORY_URL),
+                                   total_pages=10, product_pages=2)
+    assert fetched == []
+    assert len(resumed.products) == 6
+
+
+def test_cancelled_scrape_resumes_from_first_missing_page():
+    """استخراج لغو شده ناتمام می‌ماند و اجرای بعدی فقط صفحات باقی‌مانده را دریافت می‌کند"""
+    job_checkpoint = JobCheckpoint('4567cdef', root='checkpoints')
+    scraper, fetched = run_scraper(job_checkpoint.for_url(CATEGORY_URL), total_pages=5, product_pages=5, cancel_after=2)
+
+    assert fetched == [1, 2]
+    assert not job_checkpoint.is_complete()
+    assert job_checkpoint.missing_pages() == {CATEGORY_URL: [3, 4, 5]}
+
+    resumed_checkpoint = JobCheckpoint('4567cdef', root='checkpoints')
+    sink = RecordingSink()
+    resumed, fetched = run_scraper(resumed_checkpoint.for_url(CATEGORY_URL), total_pages=5, product_pages=5, sink=sink)
+    assert fetched == [3, 4, 5]
+    assert len(resumed.products) == 15
+    # صفحات بازیابی شده در اجرای قبلی در sinkها نوشته شده‌اند و دوباره نوشته نمی‌شوند
+    assert resumed.restored_product_count == 6
+    assert len(sink.rows) == 9
+    assert resumed_checkpoint.is_complete()
+
+
+def test_changed_mode_or_page_size_discards_saved_pages(tmp_path):
+    """صفحات ذخیره شده با حالت یا اندازه صفحه دیگر (مثلاً API در برابر مرورگر) دوباره استفاده نمی‌شوند"""
+    path = str(tmp_path / 'unioncoop')
+    checkpoint = ScrapeCheckpoint(path, CATEGORY_URL)
+    checkpoint.start(3, mode='api', page_size=1000)
+    checkpoint.record_page(1, [{'name': 'Frozen Peas', 'price': '10.00'}])
+
+    same = ScrapeCheckpoint(path)
+    same.start(3, mode='api', page_size=1000)
+    assert same.completed_pages() == [1]
+
+    switched = ScrapeCheckpoint(path)
+    switched.start(40, mode='browser', page_size=9)
+    assert switched.completed_pages() == []
+    assert not list((tmp_path / 'unioncoop').glob('page_*.json'))
+    assert ScrapeCheckpoint(path).mode == 'browser'
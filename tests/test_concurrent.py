@@ -0,0 +1,98 @@
+"""تست استخراج همزمان صفحات بدون مرورگر واقعی"""
+
+import threading
+import time
+
+from shelfie_concurrent import scrape_pages_concurrently
+
+PAGES = [(page_num, f"https://example.com/frozen?page={page_num}") for page_num in range(1, 7)]
+
+
+class Recorder:
+    """scrape_page ساختگی با تاخیر متفاوت برای هر صفحه و ثبت فراخوانی‌ها"""
+
+    def __init__(self, delays=None, cancel_event=None, cancel_on=None):
+        self.delays = delays or {}
+        self.cancel_event = cancel_event
+        self.cancel_on = cancel_on
+        self.calls = []
+        self.pages_seen = []
+        self._lock = threading.Lock()
+
+    def scrape_page(self, driver, page_url):
+        page_num = int(page_url.rsplit('=', 1)[1])
+        with self._lock:
+            self.calls.append((page_num, driver))
+        time.sleep(self.delays.get(page_num, 0))
+        if page_num == self.cancel_on:
+            self.cancel_event.set()
+        return [f"product {page_num}"]
+
+    def on_page(self, page_num, page_url, page_products):
+        self.pages_seen.append((page_num, page_products))
+
+
+class FailingPool:
+    """مخزن ساختگی که هیچ درایوری نمی‌دهد"""
+
+    size = 4
+
+    def __init__(self):
+        self.released = []
+
+    def acquire(self):
+        raise RuntimeError('no browser available')
+
+    def release(self, driver):
+        self.released.append(driver)
+
+
+def test_driverless_results_reach_on_page_in_order():
+    # صفحات اول کندتر از صفحات بعدی تمام می‌شوند
+    recorder = Recorder(delays={1: 0.15, 2: 0.1, 3: 0.05, 4: 0.0, 5: 0.02, 6: 0.0})
+
+    results = scrape_pages_concurrently(recorder.scrape_page, PAGES, 3, use_drivers=False, on_page=recorder.on_page)
+
+    assert results == [[f"product {page_num}"] for page_num, _ in PAGES]
+    assert recorder.pages_seen == [(page_num, [f"product {page_num}"]) for page_num, _ in PAGES]
+    assert sorted(page_num for page_num, _ in recorder.calls) == [1, 2, 3, 4, 5, 6]
+    assert all(driver is None for _, driver in recorder.calls)
+
+
+def test_cancel_stops_new_pages_and_reports_the_rest_empty():
+    cancel_event = threading.Event()
+    recorder = Recorder(delays={1: 0.05, 2: 0.0}, cancel_event=cancel_event, cancel_on=2)
+
+    results = scrape_pages_concurrently(recorder.scrape_page, PAGES, 2, use_drivers=False,
+                                        on_page=recorder.on_page, cancel_event=cancel_event)
+
+    scraped = {page_num for page_num, _ in recorder.calls}
+    assert {1, 2} <= scraped <= {1, 2, 3}
+    assert 6 not in scraped
+    # صفحات استخراج نشده خالی هستند و on_page همچنان همه صفحات را به ترتیب می‌بیند
+    assert [page_num for page_num, _ in recorder.pages_seen] == [page_num for page_num, _ in PAGES]
+    assert results[5] == []
+
+
+def test_worker_without_driver_leaves_pages_to_other_workers():
+    recorder = Recorder(delays={page_num: 0.01 for page_num, _ in PAGES})
+    pool = FailingPool()
+
+    results = scrape_pages_concurrently(recorder.scrape_page, PAGES, 3, driver='caller-driver', driver_pool=pool,
+                                        on_page=recorder.on_page)
+
+    # workerهای اضافه درایور نگرفتند و درایور فراخواننده همه صفحات را استخراج کرد
+    assert [driver for _, driver in recorder.calls] == ['caller-driver'] * len(PAGES)
+    assert results == [[f"product {page_num}"] for page_num, _ in PAGES]
+    assert pool.released == []
+
+
+def test_no_driver_at_all_returns_empty_pages_in_order():
+    recorder = Recorder()
+
+    results = scrape_pages_concurrently(recorder.scrape_page, PAGES, 2, driver_pool=FailingPool(),
+                                        on_page=recorder.on_page)
+
+    assert recorder.calls == []
+    assert results == [[] for _ in PAGES]
+    assert recorder.pages_seen == [(page_num, []) for page_num, _ in PAGES]
@@ -0,0 +1,94 @@
+"""تست دانلود خروجی‌های کش شده کارها از مسیر /jobs/<job_id>/export/<fmt>"""
+
+import gzip
+import time
+
+import pytest
+
+from shelfie_jobs import FINISHED_STATUSES, JobManager
+
+
+def wait_for_job(job, timeout=10):
+    """انتظار برای پایان کار"""
+    deadline = time.time() + timeout
+    while job.status not in FINISHED_STATUSES and time.time() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def finished_job(flask_app, monkeypatch):
+    """یک کار تمام شده Spinneys با 200 محصول و کلاینت تست Flask"""
+    def runner(job):
+        job.products = [{'product': f"Green Peas {index}", 'brand': 'Americana', 'price': 'AED 12.50',
+                         'weight': '400g', 'website': 'spinneys.com',
+                         'url': f"https://www.spinneys.com/en-ae/catalogue/green-peas-{index}/"}
+                        for index in range(200)]
+
+    job_manager = JobManager(runner, max_concurrent=1)
+    monkeypatch.setattr(flask_app, 'job_manager', job_manager)
+    job = job_manager.create_job('Spinneys', 'https://www.spinneys.com/en-ae/catalogue/category/frozen')
+    wait_for_job(job)
+    return flask_app.app.test_client(), job
+
+
+def test_etag_and_if_none_match(finished_job):
+    client, job = finished_job
+    url = f"/jobs/{job.id}/export/csv"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') is None
+    assert response.data.decode('utf-8-sig').startswith('product,brand,price')
+    etag = response.headers['ETag']
+
+    cached = client.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    # محصول جدید فایل و ETag تازه می‌سازد
+    job.products = job.products + [dict(job.products[0], product='Sweet Corn')]
+    refreshed = client.get(url, headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers['ETag'] != etag
+    assert b'Sweet Corn' in refreshed.data
+
+
+def test_range_request_resumes_download(finished_job):
+    client, job = finished_job
+    url = f"/jobs/{job.id}/export/ndjson"
+    full = client.get(url).data
+
+    partial = client.get(url, headers={'Range': 'bytes=100-199'})
+    assert partial.status_code == 206
+    assert partial.headers['Content-Range'] == f"bytes 100-199/{len(full)}"
+    assert partial.data == full[100:200]
+
+    rest = client.get(url, headers={'Range': 'bytes=200-'})
+    assert full[:200] + rest.data == full
+
+
+def test_gzip_content_encoding(finished_job):
+    client, job = finished_job
+    url = f"/jobs/{job.id}/export/csv"
+    plain = client.get(url)
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.status_code == 200
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data)
+
+    # gzip=0 و فرمت xlsx (که خودش فشرده است) بدون Content-Encoding ارسال می‌شوند
+    assert client.get(f"{url}?gzip=0", headers={'Accept-Encoding': 'gzip'}).headers.get('Content-Encoding') is None
+    xlsx = client.get(f"/jobs/{job.id}/export/xlsx", headers={'Accept-Encoding': 'gzip'})
+    assert xlsx.status_code == 200
+    assert xlsx.headers.get('Content-Encoding') is None
+
+
+def test_unknown_job_or_format(finished_job):
+    client, job = finished_job
+
+    assert client.get(f"/jobs/{job.id}/export/parquet").status_code == 404
+    assert client.get('/jobs/000000000000/export/csv').status_code == 404
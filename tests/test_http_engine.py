@@ -0,0 +1,231 @@
+"""تست مسیر HTTP اسکرپرهای Spinneys و Almeera با HTML ذخیره شده روی http.server محلی"""
+
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin
+
+import pytest
+import requests
+
+import almeera_scraper
+import shelfie_name_cache
+import shelfie_spinneys_scraper
+import shelfie_waits
+from shelfie_http_engine import HttpFetchEngine
+from shelfie_parsing import compile_selector, parse_html
+
+SPINNEYS_PAGE = """
+<html><body>
+<div class="product-info">
+  <div class="product-name"><a href="/en-ae/catalogue/{slug}-1/">{name} 1 400g</a></div>
+  <div class="product-price"><span class="price">AED 12.50</span></div>
+</div>
+<div class="product-info">
+  <div class="product-name"><a href="/en-ae/catalogue/{slug}-2/">{name} 2 400g</a></div>
+  <div class="product-price"><span class="price">AED 9.75</span></div>
+</div>
+<ul class="pagination"><li><a href="?page=1">1</a></li><li><a href="?page=2">2</a></li><li class="next"><a href="?page=2">Next</a></li></ul>
+</body></html>
+"""
+
+ALMEERA_PAGE = """
+<html><body>
+<ul>
+  <li class="product-cell box-product">
+    <h5 class="product-name"><a href="{slug}-1.html">{name} 1 900g</a></h5>
+    <span class="price product-price">QAR 15.00</span>
+  </li>
+  <li class="product-cell box-product">
+    <h5 class="product-name"><a href="{slug}-2.html">{name} 2 900g</a></h5>
+    <span class="price product-price">QAR 17.25</span>
+  </li>
+</ul>
+<ul class="pagination"><li class="item"><a title="Go to page 2" href="?pageId=2">2</a></li></ul>
+</body></html>
+"""
+
+# صفحه‌ای که محصولاتش فقط با JavaScript رندر می‌شوند
+EMPTY_PAGE = "<html><body><div id='app'></div></body></html>"
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """اجرا در پوشه موقت، بدون کش نام و بدون تاخیر بین بررسی‌های صفحه"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(shelfie_name_cache, 'DEFAULT_NAME_CACHE_PATH', '0')
+    no_sleep = types.SimpleNamespace(sleep=lambda seconds: None, time=time.time)
+    for module in (shelfie_waits, shelfie_spinneys_scraper, almeera_scraper):
+        monkeypatch.setattr(module, 'time', no_sleep)
+
+
+@pytest.fixture
+def site():
+    """
+    سرور http.server که HTML ذخیره شده را بر اساس مسیر و query string برمی‌گرداند
+
+    Returns:
+        tuple: (آدرس پایه سرور، دیکشنری صفحات {مسیر: HTML} که تست پر می‌کند)
+    """
+    pages = {}
+
+    class SavedPageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            html = pages.get(self.path)
+            if html is None:
+                self.send_error(404)
+                return
+            body = html.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SavedPageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", pages
+    server.shutdown()
+    server.server_close()
+
+
+class FakeDriver:
+    """درایور ساختگی که HTML «رندر شده» هر آدرس را برمی‌گرداند"""
+
+    def __init__(self, rendered):
+        self.rendered = rendered
+        self.visited = []
+        self.current_url = None
+        self.quit_called = False
+
+    def get(self, url):
+        self.visited.append(url)
+        self.current_url = url
+
+    @property
+    def page_source(self):
+        return self.rendered.get(self.current_url, EMPTY_PAGE)
+
+    def execute_script(self, script, *args):
+        soup = parse_html(self.page_source)
+        if script == shelfie_waits._SNAPSHOT_SCRIPT:
+            count = len(compile_selector(args[0]).select(soup)) if args[0] else 0
+            return {'count': count, 'height': 1000, 'nodes': 50, 'atBottom': True, 'ready': 'complete'}
+        if script == shelfie_spinneys_scraper.PRODUCTS_SCRIPT:
+            return [{'name': block.select_one('.product-name a').get_text(strip=True),
+                     'url': urljoin(self.current_url, block.select_one('.product-name a')['href']),
+                     'price': block.select_one('.product-price .price').get_text(strip=True)}
+                    for block in soup.select('.product-info')]
+        return []
+
+    def quit(self):
+        self.quit_called = True
+
+
+def no_browser():
+    raise AssertionError('HTTP mode should not start a browser')
+
+
+def test_http_engine_fetches_saved_page(site):
+    base_url, pages = site
+    pages['/frozen'] = SPINNEYS_PAGE
+    engine = HttpFetchEngine(retries=0)
+
+    assert 'product-info' in engine.fetch(f"{base_url}/frozen")
+    assert engine.requests_made == 1
+    with pytest.raises(requests.HTTPError):
+        engine.fetch(f"{base_url}/missing")
+    engine.close()
+
+
+def test_spinneys_scrapes_all_pages_over_http(site):
+    base_url, pages = site
+    pages['/frozen'] = SPINNEYS_PAGE.format(slug='peas', name='Green Peas')
+    pages['/frozen?page=2'] = SPINNEYS_PAGE.format(slug='corn', name='Sweet Corn')
+    scraper = shelfie_spinneys_scraper.SpinneysMultiPageScraper(
+        f"{base_url}/frozen", http_engine=HttpFetchEngine(retries=0))
+    scraper._acquire_driver = no_browser
+
+    scraper.scrape_all_pages()
+
+    assert [product['name'] for product in scraper.raw_products] == [
+        'Green Peas 1 400g', 'Green Peas 2 400g', 'Sweet Corn 1 400g', 'Sweet Corn 2 400g']
+    assert scraper.raw_products[0]['url'] == f"{base_url}/en-ae/catalogue/peas-1/"
+    assert scraper.raw_products[2]['page'] == f"{base_url}/frozen?page=2"
+    assert not scraper._http_disabled
+
+    # صفحه‌ای که از قبل دریافت نشده مستقیماً با HTTP دریافت می‌شود
+    assert len(scraper._scrape_page_http(f"{base_url}/frozen?page=2")) == 2
+
+
+def test_spinneys_falls_back_to_driver_when_html_has_no_products(site):
+    base_url, pages = site
+    pages['/frozen'] = SPINNEYS_PAGE.format(slug='peas', name='Green Peas')
+    pages['/frozen?page=2'] = EMPTY_PAGE
+    driver = FakeDriver({f"{base_url}/frozen?page=2": SPINNEYS_PAGE.format(slug='corn', name='Sweet Corn')})
+    scraper = shelfie_spinneys_scraper.SpinneysMultiPageScraper(
+        f"{base_url}/frozen", http_engine=HttpFetchEngine(retries=0))
+    scraper._acquire_driver = lambda: driver
+
+    # صفحه اول محصولاتش را در HTML دارد و مرورگری گرفته نمی‌شود
+    assert len(scraper.scrape_page(None, f"{base_url}/frozen")) == 2
+    assert driver.visited == []
+
+    page_products = scraper.scrape_page(None, f"{base_url}/frozen?page=2")
+    assert [product['name'] for product in page_products] == ['Sweet Corn 1 400g', 'Sweet Corn 2 400g']
+    assert driver.visited == [f"{base_url}/frozen?page=2"]
+    assert scraper._http_disabled
+
+    # پس از غیرفعال شدن مسیر HTTP، صفحات بعدی هم با همان درایور استخراج می‌شوند
+    scraper.scrape_page(None, f"{base_url}/frozen")
+    assert driver.visited[-1] == f"{base_url}/frozen"
+    scraper._release_fallback_drivers()
+    assert driver.quit_called
+
+
+def test_spinneys_keeps_http_when_driver_finds_nothing_either(site):
+    base_url, pages = site
+    pages['/frozen?page=3'] = EMPTY_PAGE
+    driver = FakeDriver({})
+    scraper = shelfie_spinneys_scraper.SpinneysMultiPageScraper(
+        f"{base_url}/frozen", http_engine=HttpFetchEngine(retries=0))
+    scraper._acquire_driver = lambda: driver
+
+    assert scraper.scrape_page(None, f"{base_url}/frozen?page=3") == []
+    assert driver.visited == [f"{base_url}/frozen?page=3"]
+    assert not scraper._http_disabled
+
+
+def test_almeera_scrapes_all_pages_over_http(site):
+    base_url, pages = site
+    pages['/frozen-meals'] = ALMEERA_PAGE.format(slug='chicken', name='Sadia Chicken')
+    pages['/frozen-meals/?pageId=2'] = ALMEERA_PAGE.format(slug='nuggets', name='Sadia Nuggets')
+    scraper = almeera_scraper.AlmeeraMultiPageScraper(f"{base_url}/frozen-meals", http_engine=HttpFetchEngine(retries=0))
+    scraper._acquire_driver = no_browser
+
+    scraper.scrape_all_pages()
+
+    assert [product['name'] for product in scraper.raw_products] == [
+        'Sadia Chicken 1 900g', 'Sadia Chicken 2 900g', 'Sadia Nuggets 1 900g', 'Sadia Nuggets 2 900g']
+    assert scraper.raw_products[0]['url'] == 'https://almeera.online/chicken-1.html'
+    assert not scraper._http_disabled
+
+
+def test_almeera_falls_back_to_driver_when_html_has_no_products(site):
+    base_url, pages = site
+    pages['/frozen-meals/?pageId=2'] = EMPTY_PAGE
+    page_url = f"{base_url}/frozen-meals/?pageId=2"
+    driver = FakeDriver({page_url: ALMEERA_PAGE.format(slug='nuggets', name='Sadia Nuggets')})
+    scraper = almeera_scraper.AlmeeraMultiPageScraper(f"{base_url}/frozen-meals", http_engine=HttpFetchEngine(retries=0))
+    scraper._acquire_driver = lambda: driver
+
+    page_products = scraper.scrape_page(None, page_url)
+
+    assert [product['name'] for product in page_products] == ['Sadia Nuggets 1 900g', 'Sadia Nuggets 2 900g']
+    assert driver.visited == [page_url]
+    assert scraper._http_disabled
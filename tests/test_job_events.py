@@ -0,0 +1,105 @@
+"""تست ادامه جریان رویدادهای کار (Last-Event-ID و since) و /status?since="""
+
+import json
+import threading
+import time
+
+import pytest
+
+from shelfie_jobs import FINISHED_STATUSES, JobManager
+
+
+def parse_events(text):
+    """تبدیل متن جریان SSE به لیست (id، نوع رویداد، داده)"""
+    events = []
+    for block in text.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def log_messages(events):
+    """متن لاگ‌های رویدادهای log بدون زمان ثبت"""
+    return [line.split(' - ', 1)[1] for _, event, data in events if event == 'log' for line in data['logs']]
+
+
+@pytest.fixture
+def paused_job(flask_app, monkeypatch):
+    """
+    کاری که پس از دو لاگ منتظر می‌ماند تا تست آن را ادامه دهد
+
+    Returns:
+        tuple: (کلاینت تست، کار، تابع ادامه کار که تا پایان آن صبر می‌کند)
+    """
+    reached = threading.Event()
+    gate = threading.Event()
+
+    def runner(job):
+        job.log('صفحه 1 استخراج شد')
+        job.log('صفحه 2 استخراج شد')
+        reached.set()
+        gate.wait(10)
+        job.log('صفحه 3 استخراج شد')
+
+    job_manager = JobManager(runner, max_concurrent=1)
+    monkeypatch.setattr(flask_app, 'job_manager', job_manager)
+    job = job_manager.create_job('Spinneys', 'https://www.spinneys.com/en-ae/catalogue/category/frozen')
+    assert reached.wait(10)
+
+    def resume():
+        gate.set()
+        deadline = time.time() + 10
+        while job.status not in FINISHED_STATUSES and time.time() < deadline:
+            time.sleep(0.01)
+
+    yield flask_app.app.test_client(), job, resume
+    gate.set()
+
+
+def test_reconnect_with_last_event_id_skips_sent_logs(paused_job):
+    client, job, resume = paused_job
+
+    # اتصال اول: فقط اولین بخش جریان خوانده و اتصال بسته می‌شود
+    response = client.get(f"/jobs/{job.id}/events", buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    first_chunk = next(iter(response.response))
+    response.close()
+    events = parse_events(first_chunk if isinstance(first_chunk, str) else first_chunk.decode('utf-8'))
+    assert log_messages(events)[1:] == ['صفحه 1 استخراج شد', 'صفحه 2 استخراج شد']
+    last_event_id = [event_id for event_id, event, _ in events if event == 'log'][-1]
+    assert last_event_id == '3'
+
+    resume()
+    reconnected = parse_events(client.get(f"/jobs/{job.id}/events",
+                                          headers={'Last-Event-ID': last_event_id}).get_data(as_text=True))
+
+    assert log_messages(reconnected) == ['صفحه 3 استخراج شد']
+    assert reconnected[-1][1:] == ('end', {'status': 'completed'})
+
+
+def test_since_parameter_and_last_event_id_precedence(paused_job):
+    client, job, resume = paused_job
+    resume()
+
+    from_since = parse_events(client.get(f"/jobs/{job.id}/events?since=2").get_data(as_text=True))
+    assert log_messages(from_since) == ['صفحه 2 استخراج شد', 'صفحه 3 استخراج شد']
+
+    # Last-Event-ID مرورگر بر since آدرس اولیه EventSource مقدم است
+    both = parse_events(client.get(f"/jobs/{job.id}/events?since=1",
+                                   headers={'Last-Event-ID': '3'}).get_data(as_text=True))
+    assert log_messages(both) == ['صفحه 3 استخراج شد']
+
+
+def test_status_since_returns_only_new_logs(paused_job):
+    client, job, resume = paused_job
+
+    status = client.get(f"/status?job_id={job.id}").get_json()
+    assert status['log_cursor'] == 3
+
+    resume()
+    update = client.get(f"/status?job_id={job.id}&since={status['log_cursor']}").get_json()
+    assert [line.split(' - ', 1)[1] for line in update['logs']] == ['صفحه 3 استخراج شد']
+    assert update['log_cursor'] == 4
+
+    assert client.get(f"/status?job_id={job.id}&since=4").get_json()['logs'] == []
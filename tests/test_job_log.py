@@ -0,0 +1,19 @@
+"""تست‌های لاگ محدود کارها"""
+
+from shelfie_job_log import JobLog
+
+
+def test_spilled_lines_round_trip(tmp_path):
+    """لاگ‌های منتقل شده به فایل gzip بدون تغییر (از جمله \\ و خطوط چندسطری) برگردانده می‌شوند"""
+    spill_path = tmp_path / 'job.log.gz'
+    job_log = JobLog(str(spill_path), capacity=4)
+    lines = ['C:\\new\\path', 'first\nsecond', 'tab\tseparated', 'literal \\n'] + [f"line {index}" for index in range(10)]
+    for line in lines:
+        job_log.append(line)
+
+    assert spill_path.exists()
+    assert list(job_log.lines()) == lines
+
+    job_log.remove()
+    assert not spill_path.exists()
+    assert list(job_log.lines()) == []
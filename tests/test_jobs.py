@@ -0,0 +1,35 @@
+"""تست‌های مدیریت کارهای استخراج"""
+
+import time
+
+from shelfie_jobs import FINISHED_STATUSES, JobManager
+
+
+def wait_for_jobs(job_manager, jobs, timeout=10):
+    """انتظار برای پایان همه کارها"""
+    deadline = time.time() + timeout
+    while any(job.status not in FINISHED_STATUSES for job in jobs) and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_old_finished_jobs_are_discarded():
+    """فقط آخرین max_finished کار تمام شده نگه داشته و فایل‌های کارهای قدیمی‌تر حذف می‌شوند"""
+    discarded = []
+
+    def runner(job):
+        job.products = [{'product': 'Sadia Chicken'}]
+
+    job_manager = JobManager(runner, max_concurrent=1, max_finished=2, on_discard=discarded.append)
+    jobs = []
+    for _ in range(4):
+        jobs.append(job_manager.create_job('Almeera', 'https://almeera.online/frozen-food'))
+        wait_for_jobs(job_manager, jobs)
+    # حذف پس از آزاد شدن جایگاه اجرا انجام می‌شود
+    deadline = time.time() + 10
+    while len(discarded) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert [job.id for job in job_manager.list()] == [job.id for job in jobs[2:]]
+    assert [job.id for job in discarded] == [job.id for job in jobs[:2]]
+    assert all(job.products == [] and len(job.logs) == 0 for job in discarded)
+    assert job_manager.get(jobs[0].id) is None
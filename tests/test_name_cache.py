@@ -0,0 +1,70 @@
+"""تست کش ماندگار نتایج پارس نام محصولات"""
+
+import sqlite3
+
+from shelfie_name_cache import NameParseCache
+
+RESULT = ('Frozen Peas', 'Americana', '400g')
+
+
+def open_cache(path, version):
+    return NameParseCache(str(path), version)
+
+
+def row_versions(path):
+    with sqlite3.connect(str(path)) as connection:
+        return sorted(row[0] for row in connection.execute("SELECT version FROM parsed_names"))
+
+
+def test_versions_share_the_file_until_the_version_changes(tmp_path):
+    path = tmp_path / 'names.sqlite'
+    cache = open_cache(path, 'v1')
+    cache.put_many('lulu', {'Americana Frozen Peas 400g': RESULT})
+    cache.close()
+
+    # باز کردن دوباره با همان نسخه چیزی حذف نمی‌کند
+    cache = open_cache(path, 'v1')
+    assert cache.get_many('lulu', ['Americana Frozen Peas 400g']) == {'Americana Frozen Peas 400g': RESULT}
+    # نوشتن دوباره همان نام فقط ردیف همان نسخه را جایگزین می‌کند
+    cache.put_many('lulu', {'Americana Frozen Peas 400g': RESULT})
+    cache.close()
+    assert row_versions(path) == ['v1']
+
+    # تغییر نسخه، ردیف‌های نسخه قبلی را یک بار حذف می‌کند
+    cache = open_cache(path, 'v2')
+    assert cache.get_many('lulu', ['Americana Frozen Peas 400g']) == {}
+    cache.put_many('lulu', {'Americana Frozen Peas 400g': RESULT})
+    cache.close()
+    assert row_versions(path) == ['v2']
+
+
+def test_rows_of_other_versions_are_kept_until_pruned(tmp_path):
+    path = tmp_path / 'names.sqlite'
+    old = open_cache(path, 'v1')
+    new = open_cache(path, 'v2')
+    # نسخه قبلی که هنوز باز است ردیف‌هایش را در کنار نسخه جدید می‌نویسد
+    old.put_many('lulu', {'Americana Frozen Peas 400g': RESULT})
+    new.put_many('lulu', {'Americana Frozen Peas 400g': RESULT})
+    assert row_versions(path) == ['v1', 'v2']
+
+    assert new.prune() == 1
+    assert row_versions(path) == ['v2']
+    old.close()
+    new.close()
+
+
+def test_old_cache_file_without_version_key_is_rebuilt(tmp_path):
+    path = tmp_path / 'names.sqlite'
+    with sqlite3.connect(str(path)) as connection:
+        connection.execute(
+            "CREATE TABLE parsed_names (store TEXT NOT NULL, name TEXT NOT NULL, version TEXT NOT NULL, "
+            "product TEXT, brand TEXT, weight TEXT, PRIMARY KEY (store, name))"
+        )
+        connection.execute("INSERT INTO parsed_names VALUES ('lulu', 'Peas', 'v1', 'Peas', '', '')")
+    connection.close()
+
+    cache = open_cache(path, 'v1')
+    cache.put_many('lulu', {'Americana Frozen Peas 400g': RESULT})
+    cache.put_many('spinneys', {'Americana Frozen Peas 400g': RESULT})
+    assert cache.get_many('lulu', ['Americana Frozen Peas 400g', 'Peas']) == {'Americana Frozen Peas 400g': RESULT}
+    cache.close()
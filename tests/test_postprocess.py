@@ -0,0 +1,22 @@
+"""تست پس‌پردازش ستونی محصولات خام"""
+
+import pandas as pd
+import pytest
+
+from shelfie_postprocess import _aed_price
+
+
+@pytest.mark.parametrize('price_text, expected', [
+    ('AED 12.50', '12.50 AED'),
+    # قیمت تکراری Union Coop (قیمت ویژه و قیمت عادی در یک المان)
+    ('AED 12.50AED 12.50', '12.50 AED'),
+    ('7.007.00', '7.00 AED'),
+    # اعدادی که فقط به ظاهر دو نیمه یکسان دارند دست نمی‌خورند
+    ('AED 11', '11 AED'),
+    ('1010', '1010 AED'),
+    ('1.51.5', '1.51.5 AED'),
+    ('', 'N/A'),
+    (None, 'N/A'),
+])
+def test_aed_price_collapses_only_doubled_amounts(price_text, expected):
+    assert _aed_price(pd.Series([price_text], dtype=object)).tolist() == [expected]
@@ -0,0 +1,87 @@
+"""تست پایگاه داده محلی محصولات و تاریخچه قیمت‌ها"""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from shelfie_product_store import ProductStore, ProductStoreSink
+
+PAGE = 'https://www.spinneys.com/en-ae/catalogue/category/frozen/ready-meals?page=2'
+
+
+def spinneys_row(price, url='https://www.spinneys.com/en-ae/catalogue/green-peas/', product='Green Peas'):
+    return {'product': product, 'brand': 'Americana', 'price': price, 'weight': '400g',
+            'website': 'spinneys.com', 'url': url, 'page': PAGE}
+
+
+@pytest.fixture
+def product_store(tmp_path):
+    product_store = ProductStore(str(tmp_path / 'products.sqlite'))
+    yield product_store
+    product_store.close()
+
+
+def table(product_store, query):
+    with sqlite3.connect(product_store.path) as connection:
+        return connection.execute(query).fetchall()
+
+
+def test_ingest_upserts_on_store_and_canonical_url(product_store):
+    first_run = datetime(2025, 1, 15, 8, 0)
+    second_run = datetime(2025, 1, 16, 8, 0)
+
+    assert product_store.ingest([spinneys_row('AED 12.50')], 'spinneys', observed_at=first_run, job_id='a') == 1
+    # همان محصول با query string و بدون / پایانی، و نام به‌روز شده
+    product_store.ingest([spinneys_row('AED 11.00', url='https://WWW.spinneys.com/en-ae/catalogue/green-peas?utm=x',
+                                       product='Green Peas Garden')],
+                         'spinneys', observed_at=second_run, job_id='b')
+
+    assert table(product_store, "SELECT store, url, product, category, last_price, first_seen, last_seen FROM products") == [
+        ('spinneys', 'https://www.spinneys.com/en-ae/catalogue/green-peas', 'Green Peas Garden', 'ready-meals', 11.0,
+         '2025-01-15T08:00:00', '2025-01-16T08:00:00')
+    ]
+
+
+def test_same_url_in_another_store_is_another_product(product_store):
+    product_store.ingest([spinneys_row('AED 12.50')], 'spinneys')
+    product_store.ingest([spinneys_row('AED 12.50')], 'lulu')
+
+    assert table(product_store, "SELECT store FROM products ORDER BY store") == [('lulu',), ('spinneys',)]
+
+
+def test_price_observations_are_append_only(product_store):
+    for day, price in ((15, 'AED 12.50'), (16, 'AED 12.50'), (17, 'AED 10.00')):
+        product_store.ingest([spinneys_row(price)], 'spinneys', observed_at=datetime(2025, 1, day), job_id=f"job-{day}")
+
+    assert product_store.price_history('spinneys', 'https://www.spinneys.com/en-ae/catalogue/green-peas/') == [
+        ('2025-01-15T00:00:00', 12.5, 'AED'),
+        ('2025-01-16T00:00:00', 12.5, 'AED'),
+        ('2025-01-17T00:00:00', 10.0, 'AED'),
+    ]
+    assert table(product_store, "SELECT job_id FROM price_observations ORDER BY id") == [
+        ('job-15',), ('job-16',), ('job-17',)
+    ]
+
+
+def test_rows_without_url_fall_back_to_name_key(product_store):
+    row = {'name': 'Frozen Peas', 'brand': 'Americana', 'price': '12.50 AED', 'weight': '400g',
+           'store': 'Union Coop', 'url': '', 'page': 'https://www.unioncoop.ae/frozen-food.html'}
+
+    product_store.ingest([row], 'unioncoop', observed_at=datetime(2025, 1, 15))
+    product_store.ingest([dict(row, price='11.00 AED')], 'unioncoop', observed_at=datetime(2025, 1, 16))
+
+    assert table(product_store, "SELECT url, category, last_price FROM products") == [
+        ('name:americana frozen peas 400g', 'frozen-food', 11.0)
+    ]
+    assert len(product_store.price_history('unioncoop', 'name:americana frozen peas 400g')) == 2
+
+
+def test_sink_writes_in_batches(product_store):
+    sink = ProductStoreSink(product_store, 'spinneys', job_id='a', batch_size=2)
+    sink.write_rows([spinneys_row('AED 1.00', url=f"https://www.spinneys.com/p/{index}/") for index in range(3)])
+    sink.write_rows([spinneys_row('AED 1.00', url='https://www.spinneys.com/p/3/')])
+    assert sink.row_count == 3
+
+    assert sink.close() == product_store.path
+    assert table(product_store, "SELECT COUNT(*) FROM products") == [(4,)]
@@ -0,0 +1,111 @@
+"""تست حالت API جستجوی Union Coop با سرور بازپخش محلی"""
+
+import json
+import threading
+
+import pytest
+
+import shelfie_name_cache
+import unioncoop_scraper
+from unioncoop_search_stub import create_stub_server
+
+CATEGORY_URL = 'https://www.unioncoop.ae/frozen-food.html'
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """اجرا در پوشه موقت، بدون کش نام و بدون متغیرهای محیطی API جستجو"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(shelfie_name_cache, 'DEFAULT_NAME_CACHE_PATH', '0')
+    monkeypatch.delenv('SHELFIE_UNIONCOOP_RECORD_DIR', raising=False)
+    monkeypatch.delenv('SHELFIE_UNIONCOOP_SITE_PAGE_SIZE', raising=False)
+
+
+def write_responses(responses_dir, product_count, hits_per_page, nb_pages=None):
+    """
+    ذخیره پاسخ‌های ساختگی API به شکل فایل‌های page_N.json
+
+    Args:
+        responses_dir (Path): پوشه پاسخ‌ها
+        product_count (int): تعداد کل محصولات دسته‌بندی (nbHits)
+        hits_per_page (int): تعداد محصولات هر پاسخ
+        nb_pages (int, optional): تعداد صفحات اعلام شده (برای شبیه‌سازی paginationLimitedTo)
+    """
+    responses_dir.mkdir()
+    if nb_pages is None:
+        nb_pages = -(-product_count // hits_per_page)
+    for page in range(nb_pages):
+        hits = [
+            {'name': f"Frozen Peas {index}", 'price': {'AED': {'default': 10 + index}},
+             'url': f"https://www.unioncoop.ae/frozen-peas-{index}.html"}
+            for index in range(page * hits_per_page, min(product_count, (page + 1) * hits_per_page))
+        ]
+        response = {'hits': hits, 'nbHits': product_count, 'nbPages': nb_pages, 'page': page}
+        (responses_dir / f"page_{page}.json").write_text(json.dumps(response), encoding='utf-8')
+
+
+@pytest.fixture
+def stub_server(tmp_path):
+    """سرور بازپخش روی یک پورت آزاد؛ آدرس آن و پوشه پاسخ‌ها را برمی‌گرداند"""
+    responses_dir = tmp_path / 'responses'
+    server = create_stub_server(str(responses_dir), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", responses_dir
+    server.shutdown()
+    server.server_close()
+
+
+def make_scraper(endpoint, hits_per_page, max_pages=None, site_page_size=None):
+    """اسکرپر Union Coop متصل به سرور بازپخش که هیچ‌وقت مرورگر راه‌اندازی نمی‌کند"""
+    scraper = unioncoop_scraper.UnionCoopMultiPageScraper(
+        CATEGORY_URL, max_pages=max_pages, use_search_api=True,
+        search_config={
+            'app_id': 'stub', 'api_key': 'stub', 'index_name': 'stub_products', 'endpoint': endpoint,
+            'facet_filters': [['categories.level0:Frozen Food']],
+            'hits_per_page': hits_per_page, 'site_page_size': site_page_size
+        })
+
+    def no_browser():
+        raise AssertionError('browser mode should not be used')
+
+    scraper.setup_driver = no_browser
+    scraper.save_to_excel = lambda df=None: 'products.xlsx'
+    return scraper
+
+
+def test_scrapes_every_api_page_from_stub(stub_server):
+    endpoint, responses_dir = stub_server
+    write_responses(responses_dir, product_count=7, hits_per_page=3)
+
+    scraper = make_scraper(endpoint, hits_per_page=3)
+    scraper.scrape_all_pages()
+
+    assert [product['name'] for product in scraper.raw_products] == [f"Frozen Peas {index}" for index in range(7)]
+    assert scraper.raw_products[0]['price'] == '10.00'
+    # آدرس محصول و صفحه در خروجی می‌ماند تا ردیف‌ها کلید پایدار داشته باشند
+    assert scraper.products[0]['url'] == 'https://www.unioncoop.ae/frozen-peas-0.html'
+    assert scraper.products[0]['page'] == CATEGORY_URL
+    # صفحات API با صفحات سایت یکی نیستند
+    assert scraper.products[6]['page'] == CATEGORY_URL
+
+
+def test_max_pages_counts_site_pages(stub_server):
+    endpoint, responses_dir = stub_server
+    write_responses(responses_dir, product_count=7, hits_per_page=3)
+
+    scraper = make_scraper(endpoint, hits_per_page=3, max_pages=2, site_page_size=2)
+    scraper.scrape_all_pages()
+
+    assert [product['name'] for product in scraper.raw_products] == [f"Frozen Peas {index}" for index in range(4)]
+
+
+def test_truncated_pagination_falls_back_to_browser(stub_server):
+    endpoint, responses_dir = stub_server
+    # مثل paginationLimitedTo: فقط یک صفحه اعلام می‌شود در حالی که nbHits بیشتر است
+    write_responses(responses_dir, product_count=7, hits_per_page=3, nb_pages=1)
+
+    scraper = make_scraper(endpoint, hits_per_page=3)
+
+    assert scraper.init_search_api() is False
+    assert scraper.search_client is None
@@ -0,0 +1,51 @@
+"""تست تشخیص و یکسان‌سازی وزن، حجم و تعداد محصولات"""
+
+import math
+
+import pytest
+
+from shelfie_units import QUANTITY_COLUMNS, parse_quantities, parse_quantity
+
+# نام محصول -> (متن یافت شده، مقدار، واحد، واحد پایه، مقدار پایه، تعداد بسته، مقدار پایه کل)
+CASES = [
+    ('Sadia Chicken 900g', ('900g', 900.0, 'g', 'g', 900.0, 1, 900.0)),
+    ('Basmati Rice 2kg', ('2kg', 2.0, 'kg', 'g', 2000.0, 1, 2000.0)),
+    ('Nido Milk Powder 2.25 Kg', ('2.25 Kg', 2.25, 'kg', 'g', 2250.0, 1, 2250.0)),
+    ('Lays Chips 45gm', ('45gm', 45.0, 'g', 'g', 45.0, 1, 45.0)),
+    ('Almarai Milk 1.5 L', ('1.5 L', 1.5, 'l', 'ml', 1500.0, 1, 1500.0)),
+    ('Pepsi 6 x 200ml', ('6 x 200ml', 200.0, 'ml', 'ml', 200.0, 6, 1200.0)),
+    ('Coca Cola 330 ml x 6', ('330 ml x 6', 330.0, 'ml', 'ml', 330.0, 6, 1980.0)),
+    ('12x1L Mineral Water', ('12x1L', 1.0, 'l', 'ml', 1000.0, 12, 12000.0)),
+    ('Farm Eggs 30 pcs', ('30 pcs', 30.0, 'pcs', 'count', 30.0, 1, 30.0)),
+]
+
+# نام‌هایی که مقداری ندارند یا عددشان با واحد شروع کلمه دیگری است
+NO_QUANTITY = ['White Bread', 'Lemon 5 Large', 'Tea 100 bags', '', None]
+
+
+@pytest.mark.parametrize('name, expected', CASES)
+def test_parse_quantity(name, expected):
+    quantity = parse_quantity(name)
+
+    assert quantity is not None
+    assert tuple(quantity)[:7] == expected
+    assert name[quantity.start:quantity.end] == expected[0]
+
+
+@pytest.mark.parametrize('name', NO_QUANTITY)
+def test_parse_quantity_without_unit(name):
+    assert parse_quantity(name) is None
+
+
+def test_parse_quantities_matches_parse_quantity():
+    names = [name for name, _ in CASES] + NO_QUANTITY
+    result = parse_quantities(names)
+
+    assert list(result.columns) == QUANTITY_COLUMNS
+    for row, (name, expected) in zip(result.itertuples(index=False), CASES):
+        assert (row.weight, row.quantity, row.unit, row.base_unit, row.base_quantity,
+                row.pack_count, row.total_base_quantity) == expected
+    empty = result.iloc[len(CASES):]
+    assert empty['weight'].isna().all()
+    assert all(math.isnan(value) for value in empty['total_base_quantity'])
+    assert empty['pack_count'].isna().all()
@@ -0,0 +1,68 @@
+"""تست انتظار تطبیقی برای پایدار شدن صفحه"""
+
+import time
+import types
+
+import pytest
+
+import shelfie_waits
+from shelfie_waits import wait_for_dom_stable
+
+
+class SnapshotDriver:
+    """درایور ساختگی که وضعیت‌های از پیش تعیین شده صفحه را به ترتیب برمی‌گرداند (آخرین وضعیت تکرار می‌شود)"""
+
+    def __init__(self, snapshots):
+        self.snapshots = list(snapshots)
+        self.polls = 0
+
+    def execute_script(self, script, *args):
+        self.polls += 1
+        if len(self.snapshots) > 1:
+            return self.snapshots.pop(0)
+        return self.snapshots[0]
+
+
+def snapshot(count, height=1000, nodes=50, ready='complete', at_bottom=True):
+    return {'count': count, 'height': height, 'nodes': nodes, 'ready': ready, 'atBottom': at_bottom}
+
+
+@pytest.fixture(autouse=True)
+def fake_clock(monkeypatch):
+    """ساعت ساختگی: هر sleep زمان را جلو می‌برد و واقعاً صبر نمی‌کند"""
+    clock = types.SimpleNamespace(now=0.0)
+
+    def sleep(seconds):
+        clock.now += seconds
+
+    monkeypatch.setattr(shelfie_waits, 'time', types.SimpleNamespace(sleep=sleep, time=lambda: clock.now))
+    return clock
+
+
+def test_settles_once_products_stop_changing():
+    driver = SnapshotDriver([snapshot(0, ready='loading'), snapshot(4, height=800), snapshot(9)])
+
+    assert wait_for_dom_stable(driver, '.product', poll_interval=1, stable_polls=2) == 9
+    assert driver.polls == 5
+
+
+def test_empty_page_settles_without_waiting_for_budget(fake_clock):
+    driver = SnapshotDriver([snapshot(0)])
+
+    assert wait_for_dom_stable(driver, '.product', budget=15, poll_interval=1, stable_polls=3) == 0
+    assert driver.polls == 4
+    assert fake_clock.now < 15
+
+
+def test_min_count_is_a_hard_requirement(fake_clock):
+    driver = SnapshotDriver([snapshot(0)])
+
+    assert wait_for_dom_stable(driver, '.product', budget=5, poll_interval=1, stable_polls=3, min_count=1) == 0
+    assert fake_clock.now >= 5
+
+
+def test_scrolling_page_settles_only_at_bottom():
+    driver = SnapshotDriver([snapshot(3, at_bottom=False)] * 4 + [snapshot(3)])
+
+    assert wait_for_dom_stable(driver, '.product', poll_interval=1, stable_polls=2) == 3
+    assert driver.polls == 6
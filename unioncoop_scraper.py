@@ -1,18 +1,25 @@
 import logging
+import math
 import os
 import re
 import time
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-import pandas as pd
 import traceback
-from webdriver_manager.chrome import ChromeDriverManager
+from shelfie_concurrent import scrape_pages_concurrently
+from shelfie_driver_pool import create_driver
+from shelfie_waits import wait_for_dom_stable
+from shelfie_js_extraction import DEFAULT_JS_EXTRACTION, run_extraction_script
+from unioncoop_search_api import (
+    AlgoliaSearchClient, DEFAULT_HITS_PER_PAGE, DEFAULT_SITE_PAGE_SIZE, DEFAULT_USE_SEARCH_API, discover_search_config,
+    hit_to_fields, reachable_hit_count, search_config_from_env
+)
+from urllib.parse import parse_qs, urljoin, urlparse
+from shelfie_postprocess import normalize_products
+from shelfie_sinks import write_products
 
 # تنظیم لاگر
 logging.basicConfig(
@@ -25,22 +32,93 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# سلکتورهای المان محصول، نام و قیمت به ترتیب اولویت
+PRODUCT_SELECTORS = ["a.result", ".result", "div.hit", ".ais-hits--item", ".product-item"]
+NAME_SELECTORS = ["h3.result-title", ".result-title", "h3", "a.name", ".product-name"]
+PRICE_SELECTORS = [
+    ".tamayaz.after_special.promotion",
+    ".tamayaz",
+    ".price",
+    ".price-currency-symbol",
+    ".special-price",
+    ".product-price"
+]
+
+# استخراج نام و متن قیمت همه محصولات صفحه با یک فراخوانی
+PRODUCTS_SCRIPT = """
+var productSelectors = arguments[0], nameSelectors = arguments[1], priceSelectors = arguments[2];
+var items = [], usedSelector = null;
+for (var i = 0; i < productSelectors.length; i++) {
+    items = document.querySelectorAll(productSelectors[i]);
+    if (items.length) { usedSelector = productSelectors[i]; break; }
+}
+function firstText(el, selectors, digitsOnly) {
+    for (var j = 0; j < selectors.length; j++) {
+        var found = el.querySelector(selectors[j]);
+        if (!found) continue;
+        var text = (found.innerText || '').trim();
+        if (text && (!digitsOnly || text.replace(/[^\\d.]/g, ''))) return text;
+    }
+    return '';
+}
+return {
+    selector: usedSelector,
+    products: Array.prototype.map.call(items, function (el) {
+        var link = el.matches('a[href]') ? el : el.querySelector('a[href]');
+        return {
+            name: firstText(el, nameSelectors, false),
+            price: firstText(el, priceSelectors, true),
+            url: link ? link.href : ''
+        };
+    })
+};
+"""
+
 class UnionCoopMultiPageScraper:
     """
     کلاس برای استخراج محصولات از وبسایت Union Coop
     """
     
-    def __init__(self, url, max_pages=None):
+    def __init__(self, url, max_pages=None, driver_pool=None, workers=1, cancel_event=None,
+                 js_extraction=DEFAULT_JS_EXTRACTION, use_search_api=DEFAULT_USE_SEARCH_API, search_config=None,
+                 sink=None, checkpoint=None):
         """
         مقداردهی اولیه کلاس
         
         پارامترها:
             url (str): آدرس وب‌سایت برای استخراج محصولات
             max_pages (int, optional): حداکثر تعداد صفحاتی که باید استخراج شود. اگر None باشد، همه صفحات استخراج می‌شوند.
+                در حالت API جستجو به max_pages برابر تعداد محصولات هر صفحه سایت تبدیل می‌شود.
+            driver_pool (ChromeDriverPool, optional): مخزن مشترک درایورها. اگر None باشد، درایور اختصاصی ساخته می‌شود.
+            workers (int): تعداد مرورگرهای همزمان برای استخراج صفحات. 1 یعنی استخراج ترتیبی.
+            cancel_event (threading.Event, optional): رویداد لغو استخراج.
+            js_extraction (bool): استخراج همه محصولات صفحه با یک فراخوانی JavaScript به جای find_element برای هر محصول.
+            use_search_api (bool): خواندن محصولات مستقیماً از API جستجو (InstantSearch) به جای رندر صفحات.
+            search_config (dict, optional): تنظیمات API جستجو (app_id، api_key، index_name، endpoint، facet_filters،
+                hits_per_page، site_page_size).
+                کلیدهای خالی از متغیرهای محیطی یا صفحه دسته‌بندی خوانده می‌شوند.
+            sink (ProductSink, optional): مقصد نوشتن جریانی محصولات هر صفحه به محض استخراج.
+            checkpoint (ScrapeCheckpoint, optional): ذخیره محصولات هر صفحه تا استخراج قطع شده از اولین صفحه باقی‌مانده ادامه پیدا کند.
         """
         self.url = url
         self.max_pages = max_pages
-        self.products = []
+        self.raw_products = []  # فیلدهای خام محصولات در طول استخراج
+        self.products = []  # محصولات پس‌پردازش شده پس از پایان استخراج
+        self.driver_pool = driver_pool
+        self.workers = workers
+        self.cancel_event = cancel_event
+        self.js_extraction = js_extraction
+        self.use_search_api = use_search_api
+        self.search_config = search_config
+        self.sink = sink
+        self.checkpoint = checkpoint
+        # تعداد محصولات خام ابتدای raw_products که از checkpoint خوانده شده‌اند (در sinkها نوشته نمی‌شوند)
+        self.restored_product_count = 0
+        self.search_client = None  # کلاینت API جستجو پس از آماده شدن حالت API
+        self._search_facet_filters = None
+        self._search_currency = 'AED'
+        self._search_hit_limit = None  # حداکثر تعداد محصولات در حالت API (معادل max_pages صفحه سایت)
+        self._search_responses = {}  # پاسخ‌های دریافت شده بر اساس شماره صفحه API
         logger.info(f"Union Coop Scraper initialized with URL: {url}")
         if max_pages:
             logger.info(f"Maximum pages to scrape: {max_pages}")
@@ -49,23 +127,18 @@ class UnionCoopMultiPageScraper:
     
     def setup_driver(self):
         """
-        راه‌اندازی درایور سلنیوم
+        راه‌اندازی درایور سلنیوم (یا گرفتن آن از مخزن مشترک)
         
         Returns:
             webdriver: آبجکت درایور سلنیوم
         """
+        if self.driver_pool is not None:
+            driver = self.driver_pool.acquire()
+            logger.info("Chrome WebDriver acquired from shared pool")
+            return driver
+        
         try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--disable-notifications")
-            chrome_options.add_argument("--disable-popup-blocking")
-            
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver = create_driver()
             
             logger.info("Chrome WebDriver setup successfully")
             return driver
@@ -83,11 +156,18 @@ class UnionCoopMultiPageScraper:
         Returns:
             int: تعداد کل صفحات
         """
+        if self.search_client is not None:
+            total_pages = self._search_page(0).get('nbPages', 0)
+            if self._search_hit_limit is not None:
+                total_pages = min(total_pages, math.ceil(self._search_hit_limit / self.search_client.hits_per_page))
+            return total_pages
+        
         try:
             # صفحه اول را لود می‌کنیم
             logger.info(f"Loading URL to get total pages: {self.url}")
             driver.get(self.url)
-            time.sleep(5)  # زمان بیشتر برای لود شدن صفحه
+            # انتظار تا لود شدن محصولات و پایدار شدن صفحه
+            wait_for_dom_stable(driver, "a.result, .result-title", scroll=False, cancel_event=self.cancel_event)
             
             try:
                 # یافتن لینک صفحه آخر - ابتدا با سلکتور دقیق
@@ -194,52 +274,26 @@ class UnionCoopMultiPageScraper:
         Returns:
             list: لیست محصولات استخراج شده از صفحه
         """
+        if self.search_client is not None:
+            return self._scrape_page_api(page_url)
+        
         try:
             logger.info(f"Loading page URL: {page_url}")
             driver.get(page_url)
             
-            # منتظر شدن برای لود شدن محصولات (تغییر سلکتور به سلکتور صحیح)
-            try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a.result"))
-                )
-            except TimeoutException:
-                # تلاش با سلکتور دیگر در صورت شکست
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".result-title"))
-                    )
-                except TimeoutException:
-                    logger.warning("Could not find product elements with standard selectors, trying alternate selectors")
-                    # تلاش با انتظار برای لود شدن هر نوع محتوا
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "body"))
-                    )
+            # منتظر شدن برای لود شدن محصولات: اسکرول تدریجی تا پایدار شدن تعداد محصولات و DOM
+            product_count = wait_for_dom_stable(driver, "a.result, .result-title", cancel_event=self.cancel_event)
+            if product_count == 0:
+                logger.warning("Could not find product elements with standard selectors, trying alternate selectors")
             
-            # زمان اضافی برای اطمینان از لود کامل همه محتوا
-            time.sleep(5)
-            
-            # اسکرول به پایین صفحه برای لود شدن همه محصولات
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            while True:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
+            if self.js_extraction:
+                page_products = self._scrape_page_js(driver, page_url)
+                if page_products is not None:
+                    return page_products
             
             # تلاش برای یافتن محصولات با سلکتورهای مختلف
             product_elements = []
-            selectors_to_try = [
-                "a.result", 
-                ".result", 
-                "div.hit", 
-                ".ais-hits--item",
-                ".product-item"
-            ]
-            
-            for selector in selectors_to_try:
+            for selector in PRODUCT_SELECTORS:
                 product_elements = driver.find_elements(By.CSS_SELECTOR, selector)
                 if product_elements:
                     logger.info(f"Found {len(product_elements)} product elements using selector: {selector}")
@@ -261,8 +315,7 @@ class UnionCoopMultiPageScraper:
                 try:
                     # تلاش برای استخراج نام محصول با سلکتورهای مختلف
                     name = ""
-                    name_selectors = ["h3.result-title", ".result-title", "h3", "a.name", ".product-name"]
-                    for selector in name_selectors:
+                    for selector in NAME_SELECTORS:
                         try:
                             name_element = product.find_element(By.CSS_SELECTOR, selector)
                             name = name_element.text.strip()
@@ -279,55 +332,24 @@ class UnionCoopMultiPageScraper:
                     
                     # استخراج قیمت (قیمت با تخفیف)
                     current_price = "N/A"
-                    price_selectors = [
-                        ".tamayaz.after_special.promotion", 
-                        ".tamayaz", 
-                        ".price", 
-                        ".price-currency-symbol",
-                        ".special-price",
-                        ".product-price"
-                    ]
-                    
-                    for selector in price_selectors:
+                    for selector in PRICE_SELECTORS:
                         try:
                             price_element = product.find_element(By.CSS_SELECTOR, selector)
-                            price_text = price_element.text.strip()
-                            # حذف "AED" یا دیگر پیشوندها از قیمت
-                            price_text = re.sub(r'[^\d.]', '', price_text)
-                            if price_text:
-                                # رفع مشکل تکرار قیمت‌ها
-                                if len(price_text) % 2 == 0:
-                                    mid_point = len(price_text) // 2
-                                    first_half = price_text[:mid_point]
-                                    second_half = price_text[mid_point:]
-                                    # بررسی اگر دو نیمه مشابه هستند
-                                    if first_half == second_half:
-                                        price_text = first_half
-                                
-                                current_price = f"{price_text} AED"
+                            if re.search(r'\d', price_element.text):
+                                current_price = price_element.text.strip()
                                 break
                         except NoSuchElementException:
                             continue
                     
-                    # استخراج وزن محصول (اگر در نام باشد)
-                    weight = self._extract_weight(name)
-                    
-                    # استخراج برند محصول و حذف آن از نام محصول
-                    brand, clean_name = self._extract_brand(name)
-                    
-                    # حذف وزن از نام محصول
-                    clean_name = self._remove_weight_from_name(clean_name, weight)
-                    
-                    # ساخت دیکشنری محصول
-                    product_data = {
-                        "name": clean_name,
-                        "brand": brand,
-                        "price": current_price,
-                        "weight": weight,
-                        "store": "Union Coop"
-                    }
+                    # آدرس محصول: خود المان a.result یا اولین لینک داخل آن
+                    product_url = product.get_attribute("href") or ""
+                    if not product_url:
+                        try:
+                            product_url = product.find_element(By.CSS_SELECTOR, "a[href]").get_attribute("href") or ""
+                        except NoSuchElementException:
+                            pass
                     
-                    page_products.append(product_data)
+                    page_products.append(self._build_product(name, current_price, product_url, page_url))
                     success_count += 1
                     
                 except Exception as e:
@@ -343,105 +365,261 @@ class UnionCoopMultiPageScraper:
             logger.error(traceback.format_exc())
             return []
     
-    def _extract_weight(self, product_name):
+    def init_search_api(self):
         """
-        استخراج وزن محصول از نام آن
+        آماده‌سازی حالت API جستجو
+        
+        تنظیمات از search_config و متغیرهای محیطی خوانده می‌شوند و در صورت کامل نبودن
+        (مثلاً نبود فیلتر دسته‌بندی) یک بار صفحه دسته‌بندی در مرورگر باز می‌شود تا
+        تنظیمات InstantSearch آن خوانده شود.
+        
+        Returns:
+            bool: True اگر حالت API آماده و نتیجه‌ای برای دسته‌بندی وجود داشته باشد
+        """
+        config = search_config_from_env()
+        config.update({key: value for key, value in (self.search_config or {}).items() if value})
+        
+        required_keys = ('app_id', 'api_key', 'index_name', 'facet_filters')
+        if not all(config.get(key) for key in required_keys):
+            driver = None
+            try:
+                driver = self.setup_driver()
+                discovered = discover_search_config(driver, self.url)
+                for key, value in discovered.items():
+                    if not config.get(key):
+                        config[key] = value
+            except Exception as e:
+                logger.warning(f"Could not discover search API settings: {e}")
+            finally:
+                if driver:
+                    self.release_driver(driver)
+        
+        missing = [key for key in required_keys if not config.get(key)]
+        if missing:
+            logger.warning(f"Search API mode unavailable (missing {', '.join(missing)}), using browser mode")
+            return False
+        
+        self.search_client = AlgoliaSearchClient(
+            config['app_id'], config['api_key'], config['index_name'],
+            endpoint=config.get('endpoint'), record_dir=config.get('record_dir'),
+            hits_per_page=int(config.get('hits_per_page') or DEFAULT_HITS_PER_PAGE)
+        )
+        self._search_facet_filters = config['facet_filters']
+        self._search_currency = config.get('currency') or 'AED'
+        
+        try:
+            first_page = self._search_page(0)
+        except Exception as e:
+            logger.warning(f"Search API request failed ({e}), using browser mode")
+            self.search_client = None
+            return False
+        
+        if not first_page.get('hits'):
+            logger.warning("Search API returned no products for this category, using browser mode")
+            self.search_client = None
+            return False
+        
+        # max_pages به صفحات سایت اشاره دارد، نه به صفحات بزرگ API
+        if self.max_pages:
+            site_page_size = int(config.get('site_page_size') or DEFAULT_SITE_PAGE_SIZE)
+            self._search_hit_limit = self.max_pages * site_page_size
+            logger.info(f"Limiting search API to {self._search_hit_limit} products "
+                        f"({self.max_pages} pages of {site_page_size} products)")
+        
+        # nbPages پس از paginationLimitedTo کوتاه می‌شود و بقیه محصولات بی‌صدا حذف می‌شدند
+        nb_hits = first_page.get('nbHits', 0)
+        wanted_hits = nb_hits if self._search_hit_limit is None else min(nb_hits, self._search_hit_limit)
+        reachable_hits = reachable_hit_count(first_page, self.search_client.hits_per_page)
+        if reachable_hits < wanted_hits:
+            logger.warning(f"Search API pagination only reaches {reachable_hits} of {nb_hits} products, using browser mode")
+            self.search_client = None
+            self._search_hit_limit = None
+            self._search_responses = {}
+            return False
+        
+        logger.info(f"Search API mode enabled: {first_page.get('nbHits')} products in {first_page.get('nbPages')} API pages")
+        return True
+    
+    def _search_page(self, page):
+        """
+        دریافت یک صفحه از API جستجو (با نگهداری پاسخ برای جلوگیری از درخواست تکراری)
         
         پارامترها:
-            product_name (str): نام محصول
+            page (int): شماره صفحه API (از 0)
             
         Returns:
-            str: وزن محصول یا مقدار پیش‌فرض
-        """
-        # الگوهای مختلف برای استخراج وزن
-        patterns = [
-            r'(\d+(?:\.\d+)?)\s*(?:kg|kilo|kilogram)s?',
-            r'(\d+(?:\.\d+)?)\s*(?:g|gram)s?',
-            r'(\d+(?:\.\d+)?)\s*(?:ml|milliliter)s?',
-            r'(\d+(?:\.\d+)?)\s*(?:l|liter)s?',
-            r'(\d+(?:\.\d+)?)(?:\s*x\s*\d+)?(?:\s*|-)(?:kg|g|ml|l)',
-            r'(\d+(?:\.\d+)?)\s*(?:oz|ounce)s?',
-            r'(\d+(?:\.\d+)?)\s*(?:lb|pound)s?',
-            r'-\s*(\d+(?:\.\d+)?(?:\s*x\s*\d+)?(?:\s*|-)(?:kg|g|ml|l|oz|lb))'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, product_name, re.IGNORECASE)
-            if match:
-                return match.group(0)
-        
-        # اگر هیچ الگویی پیدا نشد
-        return "N/A"
+            dict: پاسخ API
+        """
+        if page not in self._search_responses:
+            self._search_responses[page] = self.search_client.search(page=page, facet_filters=self._search_facet_filters)
+        return self._search_responses[page]
     
-    def _extract_brand(self, product_name):
+    def _scrape_page_api(self, page_url):
         """
-        استخراج برند محصول از نام آن و حذف برند از نام محصول
+        استخراج محصولات یک صفحه از API جستجو
         
         پارامترها:
-            product_name (str): نام محصول
+            page_url (str): آدرس صفحه (شماره صفحه از پارامتر page خوانده می‌شود)
             
         Returns:
-            tuple: (برند محصول, نام محصول بدون برند)
-        """
-        # لیست برندهای معروف
-        known_brands = [
-            "Trust", "Al Ain", "Emirates", "Almarai", "Al Rawabi", "Nido", 
-            "Anchor", "Lurpak", "President", "Nadec", "Farm Fresh", "KDD",
-            "Luna", "Rainbow", "Al Manar", "Puck", "Kraft", "Kiri", "Delmonte",
-            "Heinz", "Americana", "Al Kabeer", "Sadia", "Dairy Queen", "Nestle",
-            "Danone", "Arla", "Philadelphia", "Kingdom", "Milky Mist", "Amul"
-        ]
-        
-        clean_name = product_name
-        
-        # بررسی اگر برند در نام محصول است
-        for brand in known_brands:
-            if brand.lower() in product_name.lower():
-                # حذف برند از نام محصول
-                clean_name = re.sub(re.escape(brand), '', product_name, flags=re.IGNORECASE).strip()
-                # حذف کاراکترهای اضافی مانند فاصله و خط تیره در ابتدا
-                clean_name = re.sub(r'^[\s\-]+', '', clean_name)
-                return brand, clean_name
-        
-        # اگر برند شناخته شده نبود، کلمات اول نام را به عنوان برند در نظر می‌گیریم
-        words = product_name.split()
-        if len(words) >= 2:
-            potential_brand = " ".join(words[:2])
-            clean_name = " ".join(words[2:])
-            return potential_brand, clean_name
-        
-        # اگر نام کوتاه باشد، کلمه اول را به عنوان برند در نظر می‌گیریم
-        if len(words) > 0:
-            return words[0], " ".join(words[1:])
-        
-        return "N/A", product_name
+            list: لیست محصولات استخراج شده
+        """
+        page_num = int(parse_qs(urlparse(page_url).query).get('page', ['1'])[0])
+        try:
+            # پاسخ‌ها پس از پردازش نگه داشته نمی‌شوند
+            response = self._search_page(page_num - 1)
+            self._search_responses.pop(page_num - 1, None)
+        except Exception as e:
+            logger.error(f"Error fetching search API page {page_num}: {e}")
+            return []
+        
+        hits = response.get('hits', [])
+        hits_per_page = self.search_client.hits_per_page
+        offset = (page_num - 1) * hits_per_page
+        total_hits = response.get('nbHits', 0)
+        if self._search_hit_limit is not None:
+            total_hits = min(total_hits, self._search_hit_limit)
+            hits = hits[:max(0, self._search_hit_limit - offset)]
+        expected_hits = min(hits_per_page, max(0, total_hits - offset))
+        if len(hits) < expected_hits:
+            logger.warning(f"Search API page {page_num} returned {len(hits)} of {expected_hits} expected products "
+                           f"(nbHits {response.get('nbHits', 0)}); results may be truncated")
+        
+        page_products = []
+        for hit in hits:
+            name, price_text, product_url = hit_to_fields(hit, self._search_currency)
+            if not name:
+                continue
+            # صفحات API با صفحات سایت یکی نیستند، پس آدرس دسته‌بندی به عنوان صفحه ثبت می‌شود
+            page_products.append(self._build_product(name, price_text, product_url, self.url))
+        
+        logger.info(f"Extracted {len(page_products)} products from search API page {page_num}")
+        return page_products
     
-    def _remove_weight_from_name(self, product_name, weight):
+    def _scrape_page_js(self, driver, page_url):
         """
-        حذف وزن از نام محصول
+        استخراج محصولات صفحه با یک فراخوانی JavaScript
         
         پارامترها:
-            product_name (str): نام محصول
-            weight (str): وزن استخراج شده از نام محصول
+            driver (webdriver): آبجکت درایور سلنیوم
+            page_url (str): آدرس صفحه
             
         Returns:
-            str: نام محصول بدون وزن
-        """
-        if weight != "N/A":
-            # حذف وزن از نام محصول
-            clean_name = re.sub(re.escape(weight), '', product_name, flags=re.IGNORECASE).strip()
-            # حذف کاراکترهای اضافی مانند خط تیره و پرانتز
-            clean_name = re.sub(r'[-\(\)]\s*$', '', clean_name).strip()
-            clean_name = re.sub(r'^\s*[-\(\)]', '', clean_name).strip()
+            list: لیست محصولات یا None اگر اسکریپت اجرا نشد یا المان محصولی یافت نشد
+        """
+        result = run_extraction_script(driver, PRODUCTS_SCRIPT, PRODUCT_SELECTORS, NAME_SELECTORS, PRICE_SELECTORS)
+        if not result or not result.get('selector'):
+            return None
+        
+        raw_products = result.get('products') or []
+        logger.info(f"Found {len(raw_products)} product elements using selector: {result['selector']} (JavaScript)")
+        
+        page_products = []
+        fail_count = 0
+        for raw_product in raw_products:
+            name = (raw_product.get('name') or "").strip()
+            if not name:
+                fail_count += 1
+                continue
             
-            # حذف عبارات متداول مربوط به وزن
-            weight_terms = ['gm', 'gram', 'g', 'kg', 'kilos', 'kilo', 'ml', 'liter', 'l', 'oz', 'ounce', 'lb', 'pound']
-            for term in weight_terms:
-                clean_name = re.sub(r'\b' + re.escape(term) + r'\b', '', clean_name, flags=re.IGNORECASE).strip()
+            try:
+                page_products.append(self._build_product(name, raw_product.get('price') or "", raw_product.get('url'), page_url))
+            except Exception as e:
+                logger.error(f"Error extracting product: {e}")
+                fail_count += 1
+        
+        logger.info(f"Successfully extracted {len(page_products)} products, failed {fail_count}")
+        return page_products
+    
+    def _build_product(self, name, price_text, product_url=None, page_url=None):
+        """
+        ساخت رکورد خام محصول (پاکسازی نام، برند، وزن و قیمت در postprocess انجام می‌شود)
+        
+        پارامترها:
+            name (str): نام کامل محصول
+            price_text (str): متن خام قیمت
+            product_url (str, optional): آدرس صفحه محصول (نسبی یا کامل)
+            page_url (str, optional): آدرس صفحه دسته‌بندی
+            
+        Returns:
+            dict: فیلدهای خام محصول
+        """
+        return {
+            "name": name,
+            "price": price_text,
+            "url": urljoin(page_url or self.url, product_url) if product_url else "",
+            "page": page_url or self.url
+        }
+    
+    def _collect_page(self, page_products, page_num=None):
+        """افزودن محصولات خام یک صفحه، نوشتن نسخه پس‌پردازش شده آن در sink و ذخیره صفحه در checkpoint (در صورت وجود)"""
+        self.raw_products.extend(page_products)
+        if self.sink is not None and page_products:
+            self.sink.write_rows(normalize_products(page_products, 'unioncoop').to_dict('records'))
+        if self.checkpoint is not None and page_num is not None:
+            self.checkpoint.record_page(page_num, page_products)
+    
+    def _restore_checkpoint(self, total_pages):
+        """
+        افزودن محصولات صفحات ذخیره شده در checkpoint بدون دریافت دوباره
+        
+        پارامترها:
+            total_pages (int): تعداد کل صفحات برای استخراج
             
-            return clean_name
+        Returns:
+            set: شماره صفحاتی که نیازی به استخراج دوباره ندارند
+        """
+        if self.checkpoint is None:
+            return set()
+        # صفحه N در حالت API و حالت مرورگر محصولات متفاوتی دارد
+        if self.search_client is not None:
+            mode, page_size = 'api', self.search_client.hits_per_page
+        else:
+            mode, page_size = 'browser', int((self.search_config or {}).get('site_page_size') or DEFAULT_SITE_PAGE_SIZE)
+        self.checkpoint.start(total_pages, mode=mode, page_size=page_size)
+        done_pages = self.checkpoint.done_pages(total_pages)
+        # صفحات بازیابی شده قبلاً در sinkهای اجرای قبلی نوشته شده‌اند و فقط به محصولات خام اضافه می‌شوند
+        for page_num in sorted(done_pages):
+            if self.checkpoint.is_done(page_num):
+                self.raw_products.extend(self.checkpoint.load_page(page_num))
+        self.restored_product_count = len(self.raw_products)
+        if done_pages:
+            logger.info(f"Restored {len(done_pages)} of {total_pages} pages from checkpoint {self.checkpoint.path}")
+        return done_pages
+    
+    def postprocess(self):
+        """
+        یکسان‌سازی ستونی محصولات خام جمع‌آوری شده
         
-        return product_name
+        Returns:
+            list: محصولات پس‌پردازش شده (در self.products هم قرار می‌گیرند)
+        """
+        self.products = normalize_products(self.raw_products, 'unioncoop').to_dict('records')
+        return self.products
+    
+    def is_cancelled(self):
+        """
+        بررسی درخواست لغو استخراج
+        
+        Returns:
+            bool: True اگر استخراج لغو شده باشد
+        """
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def get_page_url(self, page_num):
+        """
+        ساخت آدرس یک صفحه
+        
+        پارامترها:
+            page_num (int): شماره صفحه
+            
+        Returns:
+            str: آدرس صفحه
+        """
+        if page_num == 1:
+            return self.url
+        # فرمت صفحه‌بندی مشخص شده در unioncoop.txt
+        return f"{self.url}?page={page_num}"
     
     def scrape_all_pages(self):
         """
@@ -449,37 +627,66 @@ class UnionCoopMultiPageScraper:
         """
         driver = None
         try:
-            driver = self.setup_driver()
+            if self.use_search_api:
+                self.init_search_api()
+            
+            # در حالت API جستجو نیازی به مرورگر نیست
+            if self.search_client is None:
+                driver = self.setup_driver()
             total_pages = self.get_total_products_and_pages(driver)
             
-            # اگر حداکثر تعداد صفحات تنظیم شده باشد
-            if self.max_pages and self.max_pages < total_pages:
+            # اگر حداکثر تعداد صفحات تنظیم شده باشد (در حالت API در get_total_products_and_pages اعمال شده است)
+            if self.max_pages and self.max_pages < total_pages and self.search_client is None:
                 total_pages = self.max_pages
                 logger.info(f"Limiting scraping to {total_pages} pages as per max_pages setting")
             
-            for page_num in range(1, total_pages + 1):
-                # ساخت URL صفحه
-                if page_num == 1:
-                    page_url = self.url
-                else:
-                    # فرمت صفحه‌بندی مشخص شده در unioncoop.txt
-                    page_url = f"{self.url}?page={page_num}"
-                
-                logger.info(f"Scraping page {page_num} of {total_pages}: {page_url}")
-                
-                try:
-                    page_products = self.scrape_page(driver, page_url)
-                    self.products.extend(page_products)
+            # صفحات کامل شده در اجرای قبلی از checkpoint خوانده و دوباره دریافت نمی‌شوند
+            done_pages = self._restore_checkpoint(total_pages)
+            
+            if self.workers > 1:
+                # حالت همزمان: تقسیم صفحات بین چند مرورگر و ادغام نتایج به ترتیب صفحه
+                logger.info(f"Scraping {total_pages} pages concurrently with {self.workers} workers")
+                pages = [(page_num, self.get_page_url(page_num)) for page_num in range(1, total_pages + 1)
+                         if page_num not in done_pages]
+                scrape_pages_concurrently(
+                    self.scrape_page, pages, self.workers,
+                    driver=driver,
+                    driver_pool=self.driver_pool,
+                    driver_factory=self.setup_driver,
+                    page_delay=None if self.search_client is not None else (3, 3),
+                    use_drivers=self.search_client is None,
+                    on_page=lambda page_num, page_url, page_products: self._collect_page(page_products, page_num),
+                    cancel_event=self.cancel_event
+                )
+            else:
+                for page_num in range(1, total_pages + 1):
+                    if page_num in done_pages:
+                        continue
+                    if self.is_cancelled():
+                        logger.info(f"Scraping cancelled before page {page_num}")
+                        break
                     
-                except Exception as e:
-                    logger.error(f"Error scraping page {page_num}: {e}")
-                    logger.error(traceback.format_exc())
-                
-                # وقفه کوتاه بین درخواست‌ها
-                if page_num < total_pages:
-                    time.sleep(3)
+                    page_url = self.get_page_url(page_num)
+                    
+                    logger.info(f"Scraping page {page_num} of {total_pages}: {page_url}")
+                    
+                    try:
+                        page_products = self.scrape_page(driver, page_url)
+                        self._collect_page(page_products, page_num)
+                        
+                    except Exception as e:
+                        logger.error(f"Error scraping page {page_num}: {e}")
+                        logger.error(traceback.format_exc())
+                    
+                    # وقفه کوتاه بین درخواست‌ها
+                    if page_num < total_pages and self.search_client is None:
+                        time.sleep(3)
             
-            logger.info(f"Total products scraped: {len(self.products)}")
+            # صفحات خالی پس از استخراج کامل (مثلاً صفحات تخمینی اضافه) در اجرای بعدی دوباره دریافت نمی‌شوند
+            if self.checkpoint is not None and not self.is_cancelled():
+                self.checkpoint.finish()
+            logger.info(f"Total products scraped: {len(self.raw_products)}")
+            self.postprocess()
             
             # ذخیره نهایی فایل اکسل
             filename = self.save_to_excel()
@@ -490,14 +697,28 @@ class UnionCoopMultiPageScraper:
             logger.error(traceback.format_exc())
             
             # در صورت خطا، سعی می‌کنیم محصولات جمع‌آوری شده تا به اینجا را ذخیره کنیم
-            if self.products:
-                logger.info(f"Attempting to save {len(self.products)} products collected so far")
+            if self.raw_products:
+                logger.info(f"Attempting to save {len(self.raw_products)} products collected so far")
+                self.postprocess()
                 return self.save_to_excel()
             return None
         finally:
             if driver:
-                driver.quit()
-                logger.info("WebDriver closed")
+                self.release_driver(driver)
+    
+    def release_driver(self, driver):
+        """
+        برگرداندن درایور به مخزن مشترک یا بستن آن
+        
+        پارامترها:
+            driver (webdriver): آبجکت درایور سلنیوم
+        """
+        if self.driver_pool is not None:
+            self.driver_pool.release(driver)
+            logger.info("WebDriver returned to shared pool")
+        else:
+            driver.quit()
+            logger.info("WebDriver closed")
     
     def save_to_excel(self, df=None):
         """
@@ -510,29 +731,17 @@ class UnionCoopMultiPageScraper:
             str: نام فایل اکسل ایجاد شده
         """
         try:
-            if df is None:
-                df = pd.DataFrame(self.products)
-            
-            if df.empty:
-                logger.warning("No products to save to Excel")
-                return None
+            products = self.products if df is None else df.to_dict('records')
+            columns = None if df is None else list(df.columns)
             
             # ایجاد نام فایل با تاریخ و زمان (مشابه سایر اسکرپرها)
             current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"shelfie_unioncoop_products_{current_datetime}.xlsx"
             
-            # ذخیره به اکسل با xlsxwriter مشابه دیگر اسکرپرها
-            writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-            df.to_excel(writer, index=False, sheet_name='Products')
-            
-            # تنظیم عرض ستون‌ها
-            workbook = writer.book
-            worksheet = writer.sheets['Products']
-            for i, col in enumerate(df.columns):
-                column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, column_width)
-            
-            writer.close()
+            # نوشتن ردیف به ردیف در حالت constant_memory (بدون ساخت DataFrame)
+            if not write_products(filename, products, columns):
+                logger.warning("No products to save to Excel")
+                return None
             logger.info(f"Products saved to Excel file: {filename}")
             return filename
             
@@ -0,0 +1,217 @@
+"""
+Shelfie - دسترسی مستقیم به API جستجوی Union Coop
+صفحات دسته‌بندی Union Coop با ویجت‌های InstantSearch ساخته می‌شوند که محصولات را از
+API جستجوی Algolia می‌خوانند. این ماژول همان API را مستقیماً و با صفحات بزرگ
+(تا 1000 محصول در هر درخواست) صدا می‌زند، بدون نیاز به رندر و اسکرول صفحه در Chrome.
+
+برای تست بدون اینترنت، پاسخ‌ها با SHELFIE_UNIONCOOP_RECORD_DIR ذخیره می‌شوند و با
+unioncoop_search_stub.py از یک سرور محلی بازپخش می‌شوند.
+"""
+
+import json
+import logging
+import os
+import time
+from urllib.parse import quote, urlencode
+import requests
+
+logger = logging.getLogger(__name__)
+
+# فعال بودن حالت API جستجو به صورت پیش‌فرض (0 برای استفاده از مرورگر)
+DEFAULT_USE_SEARCH_API = os.environ.get('SHELFIE_UNIONCOOP_SEARCH_API', '1') != '0'
+
+# تعداد محصولات در هر درخواست (حداکثر مجاز Algolia برابر 1000 است)
+DEFAULT_HITS_PER_PAGE = int(os.environ.get('SHELFIE_UNIONCOOP_HITS_PER_PAGE', 1000))
+
+# تعداد محصولات هر صفحه سایت (برای تبدیل max_pages به تعداد محصولات در حالت API)
+DEFAULT_SITE_PAGE_SIZE = 9
+
+# خواندن تنظیمات InstantSearch از صفحه دسته‌بندی (افزونه Algolia برای Magento)
+ALGOLIA_CONFIG_SCRIPT = """
+var c = window.algoliaConfig;
+if (!c) { return null; }
+return {
+    applicationId: c.applicationId,
+    apiKey: c.apiKey,
+    indexName: c.indexName,
+    currencyCode: c.currencyCode,
+    path: c.request ? c.request.path : null,
+    level: c.request ? c.request.level : null,
+    hitsPerPage: c.hitsPerPage
+};
+"""
+
+
+def search_config_from_env():
+    """
+    تنظیمات API جستجو از متغیرهای محیطی
+
+    Returns:
+        dict: تنظیمات (کلیدهای خالی یعنی باید از صفحه خوانده شوند)
+    """
+    facet_filters = os.environ.get('SHELFIE_UNIONCOOP_ALGOLIA_FILTERS')
+    site_page_size = os.environ.get('SHELFIE_UNIONCOOP_SITE_PAGE_SIZE')
+    return {
+        'app_id': os.environ.get('SHELFIE_UNIONCOOP_ALGOLIA_APP_ID'),
+        'api_key': os.environ.get('SHELFIE_UNIONCOOP_ALGOLIA_API_KEY'),
+        'index_name': os.environ.get('SHELFIE_UNIONCOOP_ALGOLIA_INDEX'),
+        'endpoint': os.environ.get('SHELFIE_UNIONCOOP_ALGOLIA_ENDPOINT'),
+        'facet_filters': json.loads(facet_filters) if facet_filters else None,
+        'currency': os.environ.get('SHELFIE_UNIONCOOP_CURRENCY', 'AED'),
+        'record_dir': os.environ.get('SHELFIE_UNIONCOOP_RECORD_DIR'),
+        'site_page_size': int(site_page_size) if site_page_size else None
+    }
+
+
+def discover_search_config(driver, url):
+    """
+    خواندن تنظیمات API جستجو از صفحه دسته‌بندی
+
+    پارامترها:
+        driver (webdriver): آبجکت درایور سلنیوم
+        url (str): آدرس صفحه دسته‌بندی
+
+    Returns:
+        dict: تنظیمات یافت شده یا دیکشنری خالی
+    """
+    driver.get(url)
+    try:
+        algolia_config = driver.execute_script(ALGOLIA_CONFIG_SCRIPT)
+    except Exception as e:
+        logger.warning(f"Could not read algoliaConfig from page: {e}")
+        return {}
+
+    if not algolia_config:
+        logger.warning("algoliaConfig not found on category page")
+        return {}
+
+    config = {
+        'app_id': algolia_config.get('applicationId'),
+        'api_key': algolia_config.get('apiKey'),
+        # افزونه Magento محصولات را در ایندکس {prefix}_products نگه می‌دارد
+        'index_name': f"{algolia_config['indexName']}_products" if algolia_config.get('indexName') else None,
+        'currency': algolia_config.get('currencyCode'),
+        'site_page_size': algolia_config.get('hitsPerPage')
+    }
+    if algolia_config.get('path'):
+        level = algolia_config.get('level') or 0
+        config['facet_filters'] = [[f"categories.level{level}:{algolia_config['path']}"]]
+    return {key: value for key, value in config.items() if value}
+
+
+class AlgoliaSearchClient:
+    """
+    کلاینت ساده REST برای API جستجوی Algolia
+    """
+
+    def __init__(self, app_id, api_key, index_name, endpoint=None, hits_per_page=DEFAULT_HITS_PER_PAGE,
+                 timeout=20, session=None, record_dir=None):
+        """
+        مقداردهی اولیه کلاینت
+
+        پارامترها:
+            app_id (str): شناسه برنامه Algolia
+            api_key (str): کلید جستجوی عمومی (search-only)
+            index_name (str): نام ایندکس محصولات
+            endpoint (str, optional): آدرس سرور. اگر None باشد، سرور اصلی Algolia استفاده می‌شود
+            hits_per_page (int): تعداد محصولات در هر درخواست
+            timeout (int): حداکثر زمان هر درخواست (ثانیه)
+            session (requests.Session, optional): Session مشترک برای استفاده مجدد از اتصال‌ها
+            record_dir (str, optional): پوشه ذخیره پاسخ‌ها برای بازپخش در تست
+        """
+        self.app_id = app_id
+        self.api_key = api_key
+        self.index_name = index_name
+        self.endpoint = (endpoint or f"https://{app_id}-dsn.algolia.net").rstrip('/')
+        self.hits_per_page = hits_per_page
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.record_dir = record_dir
+
+    def search(self, page=0, query='', facet_filters=None, filters=None):
+        """
+        اجرای یک جستجو
+
+        پارامترها:
+            page (int): شماره صفحه نتایج (از 0)
+            query (str): متن جستجو
+            facet_filters (list, optional): فیلترهای facet، مثل فیلتر دسته‌بندی
+            filters (str, optional): فیلتر متنی Algolia
+
+        Returns:
+            dict: پاسخ API شامل hits، nbHits و nbPages
+        """
+        params = {'query': query, 'hitsPerPage': self.hits_per_page, 'page': page}
+        if facet_filters:
+            params['facetFilters'] = json.dumps(facet_filters)
+        if filters:
+            params['filters'] = filters
+
+        start_time = time.time()
+        response = self.session.post(
+            f"{self.endpoint}/1/indexes/{quote(self.index_name, safe='')}/query",
+            json={'params': urlencode(params)},
+            headers={
+                'X-Algolia-Application-Id': self.app_id,
+                'X-Algolia-API-Key': self.api_key
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        logger.info(f"Search API page {page} returned {len(result.get('hits', []))} hits "
+                    f"in {time.time() - start_time:.2f}s")
+
+        if self.record_dir:
+            os.makedirs(self.record_dir, exist_ok=True)
+            with open(os.path.join(self.record_dir, f"page_{page}.json"), 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+        return result
+
+
+def reachable_hit_count(response, hits_per_page):
+    """
+    تعداد نتایجی که با صفحه‌بندی API قابل دریافت هستند
+
+    Algolia فقط paginationLimitedTo نتیجه اول (پیش‌فرض 1000) را صفحه‌بندی می‌کند و nbPages را
+    بر همین اساس کوتاه می‌کند، در حالی که nbHits تعداد واقعی نتایج را برمی‌گرداند.
+
+    پارامترها:
+        response (dict): پاسخ API شامل nbHits و nbPages
+        hits_per_page (int): تعداد محصولات در هر درخواست
+
+    Returns:
+        int: حداکثر تعداد محصولات قابل دریافت
+    """
+    return min(response.get('nbHits', 0), response.get('nbPages', 0) * hits_per_page)
+
+
+def hit_to_fields(hit, currency='AED'):
+    """
+    تبدیل یک نتیجه جستجو به نام، متن قیمت و آدرس محصول
+
+    پارامترها:
+        hit (dict): یک آیتم از hits
+        currency (str): واحد پول برای قیمت‌های تفکیک شده بر اساس ارز
+
+    Returns:
+        tuple: (نام، متن قیمت، آدرس)
+    """
+    name = hit.get('name') or hit.get('title') or ''
+    if isinstance(name, list):
+        name = name[0] if name else ''
+
+    # افزونه Magento قیمت را به شکل {"AED": {"default": 12.5, "default_formated": "AED 12.50"}} نگه می‌دارد
+    price = hit.get('price')
+    if isinstance(price, dict):
+        price = price.get(currency) or next(iter(price.values()), None)
+    if isinstance(price, dict):
+        price = price.get('default_formated') or price.get('default')
+
+    price_text = ""
+    if isinstance(price, (int, float)) and not isinstance(price, bool):
+        price_text = f"{price:.2f}"
+    elif isinstance(price, str):
+        price_text = price
+
+    return str(name).strip(), price_text, hit.get('url') or ''
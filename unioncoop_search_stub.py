@@ -0,0 +1,87 @@
+"""
+Shelfie - سرور محلی بازپخش پاسخ‌های API جستجوی Union Coop
+پاسخ‌هایی که با SHELFIE_UNIONCOOP_RECORD_DIR ذخیره شده‌اند (page_0.json، page_1.json، ...)
+را به جای Algolia برمی‌گرداند تا حالت API بدون اینترنت قابل تست باشد.
+
+مثال:
+    python unioncoop_search_stub.py --responses recorded/ --port 8900
+
+    SHELFIE_UNIONCOOP_ALGOLIA_ENDPOINT=http://127.0.0.1:8900 \\
+    SHELFIE_UNIONCOOP_ALGOLIA_APP_ID=stub SHELFIE_UNIONCOOP_ALGOLIA_API_KEY=stub \\
+    SHELFIE_UNIONCOOP_ALGOLIA_INDEX=stub_products \\
+    SHELFIE_UNIONCOOP_ALGOLIA_FILTERS='[["categories.level0:Frozen Food"]]' \\
+    python -c "from unioncoop_scraper import UnionCoopMultiPageScraper; \\
+        UnionCoopMultiPageScraper('https://www.unioncoop.ae/frozen-food.html').scrape_all_pages()"
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+def make_handler(responses_dir):
+    """ساخت handler درخواست‌ها برای پوشه پاسخ‌های ذخیره شده"""
+
+    class SearchStubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not re.match(r'^/1/indexes/[^/]+/query$', self.path):
+                self._send_json(404, {'message': 'Not found'})
+                return
+
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+                params = parse_qs(body.get('params', ''))
+                page = int(params.get('page', ['0'])[0])
+            except ValueError:
+                self._send_json(400, {'message': 'Invalid request body'})
+                return
+
+            response_path = os.path.join(responses_dir, f"page_{page}.json")
+            if os.path.exists(response_path):
+                with open(response_path, encoding='utf-8') as f:
+                    self._send_json(200, json.load(f))
+            else:
+                self._send_json(200, {'hits': [], 'nbHits': 0, 'nbPages': 0, 'page': page})
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.info(format % args)
+
+    return SearchStubHandler
+
+
+def create_stub_server(responses_dir, host='127.0.0.1', port=8900):
+    """
+    ساخت سرور بازپخش (port=0 یعنی انتخاب یک پورت آزاد)
+
+    Returns:
+        ThreadingHTTPServer: سرور آماده برای serve_forever
+    """
+    return ThreadingHTTPServer((host, port), make_handler(responses_dir))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='بازپخش پاسخ‌های ذخیره شده API جستجوی Union Coop')
+    parser.add_argument('--responses', required=True, help='پوشه فایل‌های page_N.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+
+    server = create_stub_server(args.responses, args.host, args.port)
+    logger.info(f"Search API stub listening on http://{args.host}:{server.server_port}")
+    server.serve_forever()